@@ -4,106 +4,145 @@ Support for interface with a AnthemAV Receiver.
 For more details about this platform, please refer to the documentation at
 https://home-assistant.io/components/media_player/
 """
+import asyncio
 import logging
-import socket
-import select
-import time
-import re
-import voluptuous as vol
 
+import voluptuous as vol
 
 from homeassistant.components.media_player import (
-    SUPPORT_TURN_OFF, SUPPORT_VOLUME_MUTE, SUPPORT_VOLUME_SET,
-    SUPPORT_SELECT_SOURCE, SUPPORT_VOLUME_STEP, MediaPlayerDevice,
-    PLATFORM_SCHEMA)
+    SUPPORT_TURN_OFF, SUPPORT_TURN_ON, SUPPORT_VOLUME_MUTE,
+    SUPPORT_VOLUME_SET, SUPPORT_SELECT_SOURCE, SUPPORT_VOLUME_STEP,
+    MediaPlayerDevice, PLATFORM_SCHEMA)
 from homeassistant.const import (
-    CONF_HOST, CONF_NAME, STATE_OFF, STATE_ON, STATE_UNKNOWN, CONF_PORT)
+    CONF_HOST, CONF_NAME, CONF_PORT, EVENT_HOMEASSISTANT_STOP, STATE_OFF,
+    STATE_ON)
 import homeassistant.helpers.config_validation as cv
 
+REQUIREMENTS = ['anthemav']
+
 _LOGGER = logging.getLogger(__name__)
 
 DEFAULT_NAME = 'AnthemAV'
+DEFAULT_PORT = 4999
 DEFAULT_MRXZONE = 1
 CONF_MRXZONE = "mrxzone"
 CONF_MINVOL = "minvol"
 CONF_MAXVOL = "maxvol"
 DEFAULT_MINVOL = -60
 DEFAULT_MAXVOL = -30
-# CONF_TIMEOUT = "timeout"
-# CONF_BUFFER_SIZE = "buffer_size"
-# DEFAULT_TIMEOUT = 10
-# DEFAULT_BUFFER_SIZE = 1024
-# mrx_payload = "payload"
 CONF_MRXMODEL = "mrxmodel"
-DEFAULT_MRXMODEL = "x00"
+DEFAULT_MRXMODEL = "auto"
+
+# hass.data key of {hub: start task or None} for every receiver set up.
+DATA_ANTHEMAV = 'anthemav'
 
 SUPPORT_ANTHEMMRX = SUPPORT_SELECT_SOURCE | SUPPORT_VOLUME_STEP | \
-    SUPPORT_VOLUME_SET | SUPPORT_VOLUME_MUTE | SUPPORT_TURN_OFF
+    SUPPORT_VOLUME_SET | SUPPORT_VOLUME_MUTE | SUPPORT_TURN_OFF | \
+    SUPPORT_TURN_ON
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
     vol.Required(CONF_HOST): cv.string,
-    vol.Required(CONF_PORT): cv.port,
+    vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
     vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
-    vol.Optional(CONF_MRXMODEL, default=DEFAULT_MRXMODEL): cv.string,
+    vol.Optional(CONF_MRXMODEL, default=DEFAULT_MRXMODEL):
+        vol.In(['auto', 'x00', 'x10', 'x20']),
     vol.Optional(CONF_MRXZONE, default=DEFAULT_MRXZONE): cv.positive_int,
     vol.Optional(CONF_MINVOL, default=DEFAULT_MINVOL): vol.Coerce(float),
     vol.Optional(CONF_MAXVOL, default=DEFAULT_MAXVOL): vol.Coerce(float),
-    # vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT): cv.positive_int,
 })
 
 
-def setup_platform(hass, config, add_devices, discovery_info=None):
-    """Setup the AnthemAV platform."""
-    add_devices([AnthemAV(hass, config)])
+async def async_setup_platform(hass, config, async_add_devices,
+                               discovery_info=None):
+    """Set up the AnthemAV platform.
+
+    Nothing is sent to the receiver here; the entity connects once it has
+    been added, so a slow or absent receiver does not hold up startup.
+    Zones of one receiver share a single connection.
+    """
+    from anthemav.aio import AsyncAnthemAV
+    from anthemav.hub import get_zone
+
+    zone = get_zone(config[CONF_HOST], config[CONF_PORT],
+                    config[CONF_MRXZONE], model=config[CONF_MRXMODEL],
+                    cls=AsyncAnthemAV, loop=hass.loop)
+    hubs = hass.data.setdefault(DATA_ANTHEMAV, {})
+    if zone.hub not in hubs:
+        # Started by the first of its zones to be added.
+        hubs[zone.hub] = None
+
+        def stop(event):
+            """Close the connection when Home Assistant stops."""
+            zone.hub.stop_listening()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, stop)
+    async_add_devices([AnthemAV(zone, config)])
     return True
 
 
+async def _async_start_hub(hub):
+    """Connect to a receiver, watch it and read its source names."""
+    await hub.listen()
+    try:
+        await hub.discover_sources()
+    except (OSError, asyncio.TimeoutError) as err:
+        _LOGGER.warning("Unable to read the source names: %s", err)
+
+
 class AnthemAV(MediaPlayerDevice):
-    """Representation of a AnthemAV Receiver."""
+    """Representation of a zone of a AnthemAV Receiver.
 
-    def __init__(self, hass, config):
-        """Initialize the AnthemAV device."""
+    The receiver pushes a status line for every change, from Home
+    Assistant or from its front panel and remote; each one triggers a
+    state write, so the entity is never polled.
+    """
 
-        self._name = config.get(CONF_NAME)
-        self._muted = None
-        self._volume = 0
-        self._state = STATE_UNKNOWN
-        self._response = None
-        self._lastupdatetime = None
-        self._selected_source = ''
-        self._source_name_to_number = {v: k for k,
-                                       v in mrx_sources.items()}
-        self._source_number_to_name = mrx_sources
-        self._config = {
-            CONF_NAME: config.get(CONF_NAME),
-            CONF_HOST: config[CONF_HOST],
-            CONF_PORT: config[CONF_PORT],
-            CONF_MRXZONE: config.get(CONF_MRXZONE, DEFAULT_MRXZONE),
-            CONF_MINVOL: config.get(CONF_MINVOL, DEFAULT_MINVOL),
-            CONF_MAXVOL: config.get(CONF_MAXVOL, DEFAULT_MAXVOL),
-            CONF_TIMEOUT: config.get(CONF_TIMEOUT, DEFAULT_TIMEOUT),
-            CONF_BUFFER_SIZE: config.get(
-                CONF_BUFFER_SIZE, DEFAULT_BUFFER_SIZE),
-        }
-        self.update()
-
-    def update(self):
-        """Retrieve the latest data."""
+    def __init__(self, zone, config):
+        """Initialize the AnthemAV device."""
+        self._zone = zone
+        self._name = config[CONF_NAME]
+        self._minvol = config[CONF_MINVOL]
+        self._maxvol = config[CONF_MAXVOL]
+        self._unsubscribe = None
+
+    async def async_added_to_hass(self):
+        """Start watching the receiver once the entity is added."""
+        self._unsubscribe = self._zone.subscribe(self._changed)
+        self.hass.async_add_job(self._async_start())
+
+    async def async_will_remove_from_hass(self):
+        """Stop receiving updates for this entity."""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    async def _async_start(self):
+        """Start the receiver once for all its zones, then read the zone."""
+        hubs = self.hass.data[DATA_ANTHEMAV]
+        hub = self._zone.hub
+        if hubs[hub] is None:
+            hubs[hub] = asyncio.ensure_future(_async_start_hub(hub))
+        await asyncio.shield(hubs[hub])
+        try:
+            await self._zone.update()
+        except (OSError, asyncio.TimeoutError) as err:
+            _LOGGER.warning("Unable to read the status of %s: %s",
+                            self._name, err)
+        self.async_schedule_update_ha_state()
+
+    def _changed(self, field, value):
+        """Write the state when the receiver reports a change."""
+        self.async_schedule_update_ha_state()
 
     @property
-    def source(self):
-        """Return the current input source."""
-        return self._selected_source
+    def should_poll(self):
+        """No polling needed, the receiver reports changes."""
+        return False
 
     @property
-    def source_list(self):
-        """List of available input sources."""
-        return list(self._source_name_to_number.keys())
-
-    def select_source(self, source):
-        """Select input source."""
-        _LOGGER.info("Select Source: %s",
-                     self._source_name_to_number.get(source))
+    def available(self):
+        """Return False while the receiver cannot be reached."""
+        return self._zone.available
 
     @property
     def name(self):
@@ -113,99 +152,80 @@ class AnthemAV(MediaPlayerDevice):
     @property
     def state(self):
         """Return the state of the device."""
-        return self._state
+        power = self._zone.power
+        if power is None:
+            # The x00 zone status only reports power when the zone is off.
+            return STATE_ON if self._zone.volume is not None else None
+        return STATE_ON if power else STATE_OFF
 
     @property
     def volume_level(self):
         """Volume level of the media player (0..1)."""
-        return self._volume
+        volume = self._zone.volume
+        if volume is None:
+            return None
+        level = (volume - self._minvol) / (self._maxvol - self._minvol)
+        return max(min(level, 1), 0)
 
     @property
     def is_volume_muted(self):
         """Boolean if volume is currently muted."""
-        return self._muted
+        return self._zone.mute
+
+    @property
+    def source(self):
+        """Return the current input source."""
+        source = self._zone.source
+        return self._zone.hub.sources.get(source, source)
+
+    @property
+    def source_list(self):
+        """List of available input sources."""
+        return list(self._zone.hub.sources.values())
+
+    @property
+    def device_state_attributes(self):
+        """Return the other fields the receiver reported, decoded."""
+        from anthemav.protocols import decode
+        model = self._zone.hub.model
+        return {field: decode(model, field, value)
+                for field, value in self._zone.extras.items()}
 
     @property
     def supported_media_commands(self):
         """Flag of media commands that are supported."""
         return SUPPORT_ANTHEMMRX
 
-    def turn_off(self):
-        """Turn off media player."""
+    async def async_select_source(self, source):
+        """Select input source, by name."""
+        await self._zone.source_set(source)
 
-    def turn_on(self):
+    async def async_turn_off(self):
         """Turn off media player."""
+        await self._zone.power_set(False)
+
+    async def async_turn_on(self):
+        """Turn on media player."""
+        await self._zone.power_set(True)
 
-    def volume_up(self):
+    async def async_volume_up(self):
         """Volume up the media player."""
+        await self._zone.send_command('VolumeUp')
 
-    def volume_down(self):
+    async def async_volume_down(self):
         """Volume down media player."""
+        await self._zone.send_command('VolumeDown')
 
-    def mute_volume(self, mute):
+    async def async_mute_volume(self, mute):
         """Send mute command."""
+        await self._zone.mute_set(mute)
+
+    async def async_set_volume_level(self, volume):
+        """Set volume level, range 0..1.
 
-    def set_volume_level(self, volume):
-        """Set volume level, range 0..1."""
-        mrxvol = int(((self._config[CONF_MAXVOL]
-                       - self._config[CONF_MINVOL])
-                      * volume) - (0 - self._config[CONF_MINVOL]))
-
-
-
-# new class for mrx control
-
-    # object for each model type with commands and regex
-        # volume_up
-        # volume_down
-        # volume_set
-        # volume_get
-        # power_on
-        # power_off
-        # power_get
-        # mute_on
-        # mute_off
-        # mute_toggle
-        # mute_get
-        # source_set
-        # source_get
-
-# Use regex with named groups
-# >>> m = re.match(r"(?P<first_name>\w+) (?P<last_name>\w+)", "Malcolm Reynolds")
-# >>> m.group('first_name')
-# 'Malcolm'
-# >>> m.group('last_name')
-# 'Reynolds'
-# combine dictionary
-
-# Use format tags
-
-# use server client method like squeezebox to limit polling of mrx
-
-    # # initialise mrx:
-        # mrx.initialise(host, port, model)
-        # mrx.initialise(192.168.2.200, 4998, 'x00')
-        # models: x00, x10, x20
-
-    # # store mrx response in object:
-        # mrx.state.[zone].[state]
-        # mrx.state.[1].volume = -60
-        # mrx.state.[1].mute = 0
-        # mrx.state.[1].source = 3
-        # mrx.state.[1].power = 1
-        # store timestamp of last received command
-
-    # # commands:
-        # mrx.[command](zone, value)
-        # mrx.setvolume(1, -60)
-        # mrx.setsource(1, 1), use source numbers
-        # mrx.setmute(1, 0), options 0, 1, T
-        # mrx.setpower(1, 1), options 0, 1
-
-    # # Update:
-        # mrx.update()
-        # optional: limit to 5 seconds since last complete set of information
-
-    # # Socket connection:
-        # Current: open, send, receive, close every command.
-        # optional: open socket connection and watch all responses.
+        Slider moves go through the volume scheduler of the zone, which
+        sends only the latest level at a limited rate.
+        """
+        zone = self._zone
+        zone.hub.volume_scheduler(zone.zone).set(round(
+            self._minvol + (self._maxvol - self._minvol) * volume))
@@ -0,0 +1,686 @@
+#!/usr/bin/env python
+
+import time
+import socket
+import asyncio
+import logging
+import collections
+
+from anthemav.anthemav import AnthemAV
+from anthemav.commandqueue import BACKGROUND, INTERACTIVE, queueing
+from anthemav.detect import (PROBES, known_model, model_from_responses,
+                             remember_model)
+from anthemav.framer import Framer
+from anthemav.parser import ERROR_RESPONSES
+from anthemav.transport import SerialTransport, TcpTransport
+from anthemav.volume import VolumeSchedule, current_volume
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AnthemProtocol(asyncio.Protocol):
+    """Split the receiver byte stream into responses for the client."""
+
+    def __init__(self, client):
+        self._client = client
+        self._framer = Framer()
+
+    def connection_made(self, transport):
+        self._client._connection_made(transport)
+
+    def data_received(self, data):
+        client = self._client
+        if client._metrics.enabled:
+            client._metrics.inc('anthemav_bytes_received_total', len(data),
+                                host=client._label)
+        for frame in self._framer.feed(data):
+            self._client._frame_received(frame)
+
+    def connection_lost(self, exc):
+        self._client._connection_lost(exc)
+
+
+class AsyncVolumeScheduler():
+    """Send volume changes for one zone from an asyncio task.
+
+    The task runs while there is something to send and ends when idle.
+    """
+
+    def __init__(self, receiver, zone, interval=0.1):
+        self._receiver = receiver
+        self._zone = zone
+        self._schedule = VolumeSchedule(interval)
+        # Created on first use, in the event loop of the caller.
+        self._event = None
+        self._task = None
+
+    def set(self, volume):
+        """Move to volume as soon as the rate limit allows."""
+        self._schedule.set(volume)
+        self._wake()
+
+    def ramp(self, volume, duration, step_commands=False):
+        """Move smoothly to volume over duration seconds."""
+        self._schedule.ramp(current_volume(self._receiver, self._zone),
+                            volume, duration, step_commands)
+        self._wake()
+
+    def close(self):
+        """Cancel the task, dropping what has not been sent yet."""
+        self._schedule.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _wake(self):
+        if self._event is None:
+            self._event = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        self._event.set()
+
+    async def _run(self):
+        while True:
+            command, delay = self._schedule.next(time.time())
+            if command is None:
+                if delay is None:
+                    return
+                self._event.clear()
+                try:
+                    await asyncio.wait_for(self._event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._receiver.send_command(command[0], self._zone,
+                                                  **command[1])
+            except Exception as err:
+                _LOGGER.warning("Unable to send %s to zone %s: %r",
+                                command[0], self._zone, err)
+
+
+class AsyncAnthemAV(AnthemAV):
+    """asyncio representation of a AnthemAV receiver.
+
+    One transport is kept open per receiver and every command is written
+    over it, so a single event loop can drive many receivers. Up to
+    ``pipeline`` commands are written back-to-back without waiting for
+    earlier replies; each reply is matched to its command by zone, mnemonic
+    and argument, and replies that answer no command are unsolicited updates.
+    """
+
+    _volume_scheduler_class = AsyncVolumeScheduler
+
+    def __init__(self, host, port, model='x00', zone='1', loop=None,
+                 pipeline=1, ttl=0, metrics=None, breaker=None, cache=None,
+                 transport=None):
+        super().__init__(host, port, model=model, zone=zone, ttl=ttl,
+                         metrics=metrics, breaker=breaker, cache=cache,
+                         transport=transport)
+        self._loop = loop
+        self._pipeline = pipeline
+        self._transport = None
+        self._connecting = None
+        self._in_flight = 0
+        self._pending = {}
+        self._sequence = 0
+        self._listening = False
+        self._reconnecting = None
+        self._detecting = None
+        self._frame_callbacks = []
+
+    async def _resolve_model(self):
+        """Probe the receiver for its model if it is 'auto'.
+
+        Concurrent callers share one probe. Returns False while the model
+        is not known; a probe that is not answered is tried again on a
+        later use, after the reconnect backoff.
+        """
+        if self._model != 'auto':
+            return True
+        if self._detecting is None:
+            self._detecting = asyncio.ensure_future(self._detect())
+        try:
+            model = await asyncio.shield(self._detecting)
+        finally:
+            if self._detecting is not None and self._detecting.done():
+                self._detecting = None
+        if model is not None and self._model == 'auto':
+            self._use_model(model)
+        return self._model != 'auto'
+
+    async def _detect(self):
+        delay = self._next_connect - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        model = await async_detect_model(self._host, self._port,
+                                         self._timeout, self._cache,
+                                         self._link)
+        if model is None:
+            self._back_off()
+        return model
+
+    async def resolve_model(self):
+        """Return the model, probing the receiver first if it is 'auto'.
+
+        'auto' is returned when the receiver could not be identified.
+        """
+        await self._resolve_model()
+        return self._model
+
+    @property
+    def connected(self):
+        """Return True when the transport is open."""
+        return self._transport is not None
+
+    async def connect(self):
+        """Open the transport, reconnecting with backoff."""
+        if self._transport is not None:
+            return True
+        if not await self._resolve_model():
+            return False
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open())
+        try:
+            return await asyncio.shield(self._connecting)
+        finally:
+            if self._connecting is not None and self._connecting.done():
+                self._connecting = None
+
+    async def _open(self):
+        delay = self._next_connect - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        loop = self._loop or asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                create_connection(loop, self._link,
+                                  lambda: AnthemProtocol(self)),
+                self._timeout)
+        except (OSError, asyncio.TimeoutError) as err:
+            self._back_off()
+            _LOGGER.warning("Unable to connect to %s on port %s: %s",
+                            self._host, self._port, err)
+            self._metrics.inc('anthemav_connect_errors_total',
+                              host=self._label)
+            return False
+        if self._metrics.enabled:
+            self._metrics.observe('anthemav_connect_seconds',
+                                  time.perf_counter() - start,
+                                  host=self._label)
+            if self._connections:
+                self._metrics.inc('anthemav_reconnects_total',
+                                  host=self._label)
+        self._connections += 1
+        self._backoff = 0
+        self._next_connect = 0
+        return True
+
+    async def listen(self):
+        """Keep the transport open and watch all responses.
+
+        Changes reported by the receiver are parsed as they arrive and
+        passed to the subscribers, so no polling is needed. The transport
+        is re-opened with backoff whenever it is lost.
+        """
+        self._listening = True
+        if not await self.connect():
+            self._schedule_reconnect()
+
+    def subscribe_frames(self, callback):
+        """Register callback(frame, answered) for every response read.
+
+        answered is False for the frames that answer no pending command,
+        such as status the receiver reports unprompted. The status has
+        been updated when it is called. Returns a function that removes
+        the subscription again.
+        """
+        self._frame_callbacks.append(callback)
+        return lambda: self._frame_callbacks.remove(callback)
+
+    def stop_listening(self):
+        """Stop watching responses and close the transport."""
+        self.close()
+
+    def _schedule_reconnect(self):
+        if self._reconnecting is None or self._reconnecting.done():
+            self._reconnecting = asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self):
+        while self._listening and not await self.connect():
+            pass
+
+    def close(self):
+        """Stop listening, close the transport and the volume schedulers.
+
+        Listening stops first, so losing the transport does not schedule
+        a reconnect.
+        """
+        self._listening = False
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        for scheduler in self._volume_schedulers.values():
+            scheduler.close()
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def update(self, zone=None, force=False):
+        """Retrieve the latest data, served from the status within the ttl."""
+        if not await self._resolve_model():
+            return self.status
+        zone = zone or self._zone
+        fields = self._stale_fields(zone, force)
+        if fields:
+            check = self._source_check_payloads()
+            payloads = self._query_payloads(zone, fields) + check
+            responses = await self._send_payloads(
+                payloads, BACKGROUND, key=''.join(payloads))
+            if all(responses):
+                self._touch(zone, fields)
+            if check and self._sources_outdated():
+                await self._read_source_names()
+        return self.status
+
+    async def discover_sources(self, force=False):
+        """Read the source names from the receiver (x10/x20)."""
+        if not await self._resolve_model():
+            return self.sources
+        payload = self._source_count_payload()
+        if payload is None:
+            return self.sources
+        self._source_count = None
+        await self._send_payload(payload, BACKGROUND, key=payload)
+        if self._sources_outdated(force):
+            await self._read_source_names()
+        return self.sources
+
+    async def _read_source_names(self):
+        await self._send_payloads(self._source_name_payloads(), BACKGROUND)
+        self._store_sources()
+
+    async def power_set(self, power, zone=None):
+        """Power commands."""
+        cmd = 'PowerOn' if power else 'PowerOff'
+        return await self.send_command(cmd, zone or self._zone)
+
+    async def volume_set(self, volume, zone=None):
+        """Volume commands."""
+        return await self.send_command('VolumeSet', zone or self._zone,
+                                       volume=volume)
+
+    async def mute_set(self, mute, zone=None):
+        """Mute commands."""
+        cmd = 'MuteOn' if mute else 'MuteOff'
+        return await self.send_command(cmd, zone or self._zone)
+
+    async def source_set(self, source, zone=None):
+        """Source commands, using the source number or name."""
+        if not await self._resolve_model():
+            return self.status
+        return await self.send_command('SourceSet', zone or self._zone,
+                                       source=self._source_number(source))
+
+    async def send_command(self, cmd, zone='', **kwargs):
+        """Convert command to payload and send."""
+        if not await self._resolve_model():
+            return self.status
+        payload = self._render(cmd, zone, **kwargs)
+        if payload is None:
+            _LOGGER.error("Command not found: %s", cmd)
+            return self.status
+        await self._send_payload(payload, *queueing(cmd, zone, payload))
+        return self.status
+
+    async def send_commands(self, commands):
+        """Send several (cmd, kwargs) commands in a single write."""
+        if not await self._resolve_model():
+            return self.status
+        payloads = []
+        for cmd, kwargs in commands:
+            kwargs = dict(kwargs)
+            zone = kwargs.pop('zone', self._zone)
+            payload = self._render(cmd, zone, **kwargs)
+            if payload is None:
+                _LOGGER.error("Command not found: %s", cmd)
+                continue
+            payloads.append(payload)
+        if payloads:
+            await self._send_payloads(payloads)
+        return self.status
+
+    async def send_payload(self, payload, priority=INTERACTIVE, key=None):
+        """Send a raw payload, such as 'Z1POW?;', and return its reply.
+
+        The payload is queued like a command; payloads with the same key
+        share one send. Returns None if no reply came, or if the receiver
+        could not be identified.
+        """
+        if not await self._resolve_model():
+            return None
+        return await self._send_payload(payload, priority, key)
+
+    async def _send_payload(self, payload, priority=INTERACTIVE, key=None,
+                            supersede=False):
+        """Send a payload and wait for the response that answers it."""
+        return (await self._send_payloads([payload], priority, key,
+                                          supersede))[0]
+
+    async def _send_payloads(self, payloads, priority=INTERACTIVE, key=None,
+                             supersede=False):
+        """Queue payloads to be written in one go and wait for the responses.
+
+        Queued writes are started by priority, up to pipeline at a time;
+        key and supersede are passed to CommandQueue.push. While the
+        circuit breaker of the receiver is open nothing is written and the
+        responses are None.
+        """
+        entry = self._queue.push(payloads, len(payloads), priority, key,
+                                 supersede)
+        if entry.waiter is None:
+            entry.waiter = asyncio.get_running_loop().create_future()
+        self._dispatch()
+        return await asyncio.shield(entry.waiter)
+
+    def _dispatch(self):
+        """Start queued writes while fewer than pipeline are in flight."""
+        while self._in_flight < self._pipeline and self._queue:
+            self._in_flight += 1
+            asyncio.ensure_future(self._run_queued(self._queue.pop()))
+        self._gauge_queue()
+
+    async def _run_queued(self, job):
+        responses = None
+        try:
+            if not self.breaker.allow():
+                _LOGGER.debug("Circuit to %s is open, not sending %s",
+                              self._label, ''.join(job.payload))
+                responses = [None] * len(job.payload)
+            else:
+                try:
+                    responses = await self._write_payloads(job.payload)
+                finally:
+                    self.breaker.record(responses is not None and
+                                        None not in responses)
+        except Exception as err:
+            job.waiter.set_exception(err)
+            # Retrieved so that callers which gave up are not reported.
+            job.waiter.exception()
+        else:
+            job.waiter.set_result(responses)
+        finally:
+            self._in_flight -= 1
+            self._queue.done(job, responses)
+            self._dispatch()
+
+    async def _write_payloads(self, payloads):
+        """Write payloads in one go and wait for the responses to each."""
+        if not await self.connect():
+            return [None] * len(payloads)
+        loop = asyncio.get_running_loop()
+        entries = []
+        for payload in payloads:
+            key = self._parser.command_key(payload.rstrip(';'))
+            self._sequence += 1
+            entry = (self._sequence, loop.create_future())
+            self._pending.setdefault(key, collections.deque()).append(entry)
+            entries.append((key, entry))
+        data = ''.join(payloads).encode()
+        metrics = self._metrics
+        if metrics.enabled:
+            metrics.inc('anthemav_bytes_sent_total', len(data),
+                        host=self._label)
+        start = time.perf_counter()
+        self._transport.write(data)
+        replies = asyncio.gather(*[entry[1] for _, entry in entries])
+        try:
+            responses = await asyncio.wait_for(replies, self._timeout)
+            if metrics.enabled:
+                metrics.observe('anthemav_round_trip_seconds',
+                                time.perf_counter() - start,
+                                host=self._label)
+            return responses
+        except asyncio.TimeoutError:
+            _LOGGER.warning("Timeout (%s second(s)) waiting for a "
+                            "response after sending %s to %s on port %s.",
+                            self._timeout, ''.join(payloads), self._host,
+                            self._port)
+            metrics.inc('anthemav_timeouts_total', host=self._label)
+        except ConnectionError as err:
+            _LOGGER.warning("Connection to %s on port %s lost: %s",
+                            self._host, self._port, err)
+        finally:
+            if replies.done() and not replies.cancelled():
+                # Retrieved so that a cancelled wait is not reported.
+                replies.exception()
+            for key, entry in entries:
+                self._forget(key, entry)
+        return [self._result(entry[1]) for _, entry in entries]
+
+    @staticmethod
+    def _result(future):
+        """Return the response a future resolved with, None if it failed."""
+        if (future.done() and not future.cancelled() and
+                future.exception() is None):
+            return future.result()
+
+    def _forget(self, key, entry):
+        pending = self._pending.get(key)
+        if pending is not None:
+            if entry in pending:
+                pending.remove(entry)
+            if not pending:
+                del self._pending[key]
+
+    def _resolve(self, frame):
+        """Complete the pending command a response answers, if any."""
+        parser = self._parser
+        standard = parser.standardise(frame)
+        if frame[:1] == '!':
+            # x10/x20 error replies echo the command they answer.
+            key = parser.command_key(frame)
+            zone = key[0]
+            candidates = [key] if self._pending.get(key) else []
+        else:
+            zone = parser.split(standard)[0]
+            candidates = [key for key, pending in self._pending.items()
+                          if pending and parser.answers(standard, key)]
+        if not candidates and (standard != frame or
+                               frame in ERROR_RESPONSES):
+            # Standby and x00 error replies answer the oldest command (for
+            # the zone).
+            candidates = [key for key, pending in self._pending.items()
+                          if (key[0] == zone or frame in ERROR_RESPONSES) and
+                          pending]
+        # The receiver replies in order, so the oldest command is answered.
+        candidates.sort(key=lambda key: self._pending[key][0][0])
+        for key in candidates:
+            entry = self._pending[key].popleft()
+            self._forget(key, entry)
+            if not entry[1].done():
+                entry[1].set_result(frame)
+                return True
+        return False
+
+    def _connection_made(self, transport):
+        self._transport = transport
+
+    def _connection_lost(self, exc):
+        self._transport = None
+        pending, self._pending = self._pending, {}
+        for entries in pending.values():
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(
+                        ConnectionResetError('connection to receiver lost'))
+        if self._listening:
+            self._schedule_reconnect()
+
+    def _frame_received(self, frame):
+        self._lastupdatetime = time.time()
+        self._update_status(frame)
+        answered = self._resolve(frame)
+        if not answered:
+            _LOGGER.debug("Unsolicited response from %s: %s",
+                          self._host, frame)
+        for callback in list(self._frame_callbacks):
+            callback(frame, answered)
+
+
+async def async_detect_model(host, port, timeout=2, cache=None,
+                             transport=None):
+    """Return the model of the receiver at host:port, for asyncio.
+
+    None is returned when no probe is answered, as by detect_model().
+    """
+    model = known_model(host, port, cache)
+    if model is not None:
+        return model
+    transport = transport or TcpTransport(host, port)
+    found = None, False
+    for probe, count in PROBES:
+        try:
+            responses = await _async_probe(transport, probe, count, timeout)
+        except (OSError, asyncio.TimeoutError) as err:
+            _LOGGER.warning("Unable to probe %s on port %s: %s",
+                            host, port, err)
+            break
+        found = model_from_responses(probe, responses)
+        if found[0] is not None:
+            break
+    return remember_model(host, port, found[0], found[1], cache)
+
+
+class _ProbeProtocol(asyncio.Protocol):
+
+    def __init__(self, count):
+        self.framer = Framer()
+        self.responses = []
+        self.count = count
+        self.done = asyncio.get_running_loop().create_future()
+
+    def data_received(self, data):
+        self.responses += self.framer.feed(data)
+        if len(self.responses) >= self.count and not self.done.done():
+            self.done.set_result(None)
+
+    def connection_lost(self, exc):
+        if not self.done.done():
+            self.done.set_result(None)
+
+
+async def _async_probe(transport, probe, count, timeout):
+    link, protocol = await asyncio.wait_for(
+        create_connection(asyncio.get_running_loop(), transport,
+                          lambda: _ProbeProtocol(count)), timeout)
+    try:
+        link.write(probe.encode())
+        try:
+            await asyncio.wait_for(asyncio.shield(protocol.done), timeout)
+        except asyncio.TimeoutError:
+            pass
+    finally:
+        link.close()
+    return protocol.responses
+
+
+async def create_connection(loop, link, protocol_factory):
+    """Connect protocol_factory() to a link like loop.create_connection().
+
+    link is a TcpTransport or a SerialTransport; a serial port without a
+    socket is driven by an FdTransport.
+    """
+    if not isinstance(link, SerialTransport):
+        return await loop.create_connection(protocol_factory, *link.address)
+    connection = link.open(None)
+    if isinstance(connection, socket.socket):
+        return await loop.create_connection(protocol_factory,
+                                            sock=connection)
+    protocol = protocol_factory()
+    return FdTransport(loop, connection, protocol), protocol
+
+
+class FdTransport(asyncio.Transport):
+    """asyncio transport over a SerialConnection, using the loop reader.
+
+    What the port does not take at once is buffered and written when the
+    loop reports it writable, so write() never blocks the loop.
+    """
+
+    def __init__(self, loop, connection, protocol, buffersize=1024):
+        super().__init__()
+        self._loop = loop
+        self._connection = connection
+        self._fd = connection.fileno()
+        self._protocol = protocol
+        self._buffersize = buffersize
+        self._buffer = bytearray()
+        self._closing = False
+        self._closed = False
+        loop.add_reader(self._fd, self._read)
+        loop.call_soon(protocol.connection_made, self)
+
+    def _read(self):
+        try:
+            data = self._connection.recv(self._buffersize)
+        except OSError as err:
+            self._close(err)
+            return
+        if data:
+            self._protocol.data_received(data)
+        elif data is not None:
+            self._close(None)
+
+    def write(self, data):
+        if self._closing:
+            return
+        if not self._buffer:
+            try:
+                sent = self._connection.send(data)
+            except OSError as err:
+                self._close(err)
+                return
+            data = data[sent:]
+            if not data:
+                return
+            self._loop.add_writer(self._fd, self._write_ready)
+        self._buffer += data
+
+    def _write_ready(self):
+        try:
+            sent = self._connection.send(self._buffer)
+        except OSError as err:
+            self._close(err)
+            return
+        del self._buffer[:sent]
+        if not self._buffer:
+            self._loop.remove_writer(self._fd)
+            if self._closing:
+                self._close(None)
+
+    def get_write_buffer_size(self):
+        return len(self._buffer)
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        """Close once the buffered data has been written."""
+        if self._buffer and not self._closing:
+            self._closing = True
+            self._loop.remove_reader(self._fd)
+            return
+        self._close(None)
+
+    def _close(self, exc):
+        if self._closed:
+            return
+        self._closing = self._closed = True
+        self._loop.remove_reader(self._fd)
+        if self._buffer:
+            self._buffer.clear()
+            self._loop.remove_writer(self._fd)
+        self._connection.close()
+        self._loop.call_soon(self._protocol.connection_lost, exc)
@@ -1,109 +1,39 @@
 #!/usr/bin/env python
 
-# import the anthemav dictionaries
-# import anthemav.api as api
-api = {
-    # Commands for the anthemav receiver using named format tags.
-    'cmds': {
-        'x00': {
-            'ZoneQuery': 'P{zone}?;',
-
-            'PowerOn': 'P{zone}P1;',
-            'PowerOff': 'P{zone}P0;',
-            'PowerQuery': 'P{zone}P?;',
+# The anthemav dictionaries, by table and model. They are read from the
+# generated modules in anthemav.protocols (see tools/gen_protocol.py) the
+# first time a model is looked up, so only the models in use are loaded.
+import collections.abc
 
-            'VolumeUp': 'P{zone}VU;',
-            'VolumeDown': 'P{zone}VD;',
-            'VolumeSet': 'P{zone}V{volume};',
-            'VolumeQuery': 'P{zone}V?;',
+from anthemav.protocols import MODELS, get_protocol
 
-            'MuteOn': 'P{zone}M1;',
-            'MuteOff': 'P{zone}M0;',
-            'MuteToggle': 'P{zone}MT;',
-            'MuteQuery': 'P{zone}M?;',
 
-            'DecoderQuery': 'P{zone}D?;',
+class ProtocolTable(collections.abc.Mapping):
+    """One table of every model, loading a model's module on first use."""
 
-            'SourceSet': 'P{zone}S{source};',
-            'SourceQuery': 'P{zone}S?;',
-        },
-        'x10': {
-            'PowerOn': 'Z{zone}POW1;',
-            'PowerOff': 'Z{zone}POW0;',
-            'PowerQuery': 'Z{zone}POW?;',
+    def __init__(self, name):
+        self._name = name
 
-            'VolumeUp': 'Z{zone}VUP;',
-            'VolumeDown': 'Z{zone}VDN;',
-            'VolumeSet': 'Z{zone}VOL{volume};',
-            'VolumeQuery': 'Z{zone}V?;',
+    def __getitem__(self, model):
+        return getattr(get_protocol(model), self._name)
 
-            'MuteOn': 'Z{zone}MUT1;',
-            'MuteOff': 'Z{zone}MUT0;',
-            'MuteToggle': 'Z{zone}MUTt;',
-            'MuteQuery': 'Z{zone}M?;',
+    def __iter__(self):
+        return iter(MODELS)
 
-            'SourceSet': 'Z{zone}INP{source};',
-            'SourceQuery': 'Z{zone}INP?;',
+    def __len__(self):
+        return len(MODELS)
 
-            'SourceActiveQuery': 'ICN?;',
-            'SourceNameShortQuery': 'ISN{source_num}?;',
-            'SourceNameLongQuery': 'ILN{source_num}?;',
 
-            'ModelQuery': 'IDQ?;',
-            'HardwareQuery': 'IDH?;',
-        }
-    },
+api = {
+    # Commands for the anthemav receiver using named format tags.
+    'cmds': ProtocolTable('CMDS'),
     # Regex matches with named groups.
     # Each item will be checked against response.
-    'regex': {
-        'x00': [
-            'P(?P<zone>.).*?P(?P<power>[0-1])',
-            'P(?P<zone>.).*?S(?P<source>[a-zA-Z0-9])',
-            'P(?P<zone>.).*?VM(?P<volume>-[0-9][0-9]|[0-9][0-9]|-[0-9]|[0-9])',
-            'P(?P<zone>.).*?V(?P<volume>-[0-9][0-9]|[0-9][0-9]|-[0-9]|[0-9])',
-            'P(?P<zone>.).*?M(?P<mute>[0-1])',
-            'P(?P<zone>.).*?D(?P<decoder>[a-zA-Z0-9])',
-        ],
-        'x10': [
-            'Z(?P<zone>.).*?POW(?P<power>.)',
-            'Z(?P<zone>.).*?MUT(?P<mute>.)',
-            'Z(?P<zone>.).*?INP(?P<source>.*)',
-        ]
-    },
+    'regex': ProtocolTable('REGEX'),
     # Regex replacement for specific repsonses when reiever is in standby.
     # The structure is ['REGEX', 'REPLACEMENT RESPONSE TO BE PARSED'].
     # x10 and x20 models return "!Z<OriginalMessage>" when in Standby.
-    'response_replace': {
-        'x00': [
-            ['Main.Off', 'P1P0'],
-            ['Zone2.Off', 'P2P0'],
-        ],
-        'x10': [
-            ['!Z.*?Z(?P<zone>.)', 'Z{zone}POW0'],
-        ],
-        'x20': [
-            ['!Z.*?Z(?P<zone>.)', 'Z{zone}POW0'],
-        ]
-    },
+    'response_replace': ProtocolTable('RESPONSE_REPLACE'),
     # Default source list for receiver.
-    'sources': {
-        'x00': {
-            '1': 'BDP',
-            '2': 'CD',
-            '3': 'TV',
-            '4': 'SAT',
-            '5': 'GAME',
-            '6': 'AUX',
-            '7': 'MEDIA',
-            '8': 'AM/FM',
-            '9': 'iPod',
-            'c': 'current main zone source',
-            'd': 'USB',
-            'e': 'Internet Radio'
-        },
-        'x10': {
-        },
-        'x20': {
-        }
-    }
+    'sources': ProtocolTable('SOURCES'),
 }
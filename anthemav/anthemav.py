@@ -1,118 +1,827 @@
 #!/usr/bin/env python
 
-import re
 import time
 import socket
 import select
+import logging
+import threading
+import collections
 
-# import the anthemav dictionaries
-from anthemav.anthem_api import api
+from anthemav.cache import get_cache
+from anthemav.commandqueue import (BACKGROUND, INTERACTIVE, CommandQueue,
+                                   queueing)
+from anthemav.detect import detect_model, known_model
+from anthemav.framer import Framer
+from anthemav.health import OPEN, get_breaker
+from anthemav.metrics import NULL_METRICS
+from anthemav.parser import SOURCE_COUNT, SOURCE_NAME, get_parser
+from anthemav.protocols import get_protocol
+from anthemav.state import ZoneState
+from anthemav.transport import TcpTransport
+from anthemav.volume import VolumeScheduler
+
+# Query command for each status field, in the order update() sends them.
+FIELD_QUERIES = (
+    ('power', 'PowerQuery'),
+    ('volume', 'VolumeQuery'),
+    ('mute', 'MuteQuery'),
+    ('source', 'SourceQuery'),
+    ('decoder', 'DecoderQuery'),
+)
+
+# Query that reads the name of an input, by model.
+SOURCE_NAME_QUERY = {
+    'x10': 'SourceNameLongQuery',
+    'x20': 'SourceNameLongQuery',
+}
+
+# Status fields update() can query, by model.
+_MODEL_FIELDS = {}
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def model_fields(model):
+    """Return the fields of FIELD_QUERIES that model can query."""
+    fields = _MODEL_FIELDS.get(model)
+    if fields is None:
+        cmds = get_protocol(model).CMDS
+        fields = _MODEL_FIELDS[model] = [
+            field for field, query in FIELD_QUERIES if query in cmds]
+    return fields
 
 
 class AnthemAV():
     """Representation of a AnthemAV receiver."""
 
-    def __init__(self, host, port, model='x00', zone='1'):
+    _volume_scheduler_class = VolumeScheduler
+
+    def __init__(self, host, port, model='x00', zone='1', persistent=False,
+                 ttl=0, metrics=None, breaker=None, cache=None,
+                 transport=None):
+        # The link to the receiver: TCP to host:port unless a transport,
+        # such as a SerialTransport, is given.
+        self._link = transport or TcpTransport(host, port)
+        if host is None:
+            host, port = self._link.address
         self._host = host
         self._port = port
         self._model = model
         self._timeout = 2
-        self._buffersize = 32
+        self._buffersize = 1024
         self._zone = zone
-        self._api_regex = api['regex'][model]
-        self._api_cmds = api['cmds'][model]
-        self._api_response_replace = api['response_replace'][model]
-        self._api_sources = api['sources'][model]
+        self._persistent = persistent or self._link.exclusive
+        self._sock = None
+        self._framer = Framer()
+        self._lock = threading.Lock()
+        self._backoff_min = 0.5
+        self._backoff_max = 30
+        self._backoff = 0
+        self._next_connect = 0
+        self._callbacks = []
+        # Time the last response was read, 0 before the first.
+        self._lastupdatetime = 0
+        self._listener = None
+        self._stop_listener = threading.Event()
+        # Notified by the listener for every batch of frames it reads; the
+        # latest are kept so senders can pick up their replies.
+        self._frames_read = threading.Condition()
+        self._frames_seen = 0
+        self._frames = collections.deque(maxlen=256)
+        self._ttl = ttl
+        self._volume_schedulers = {}
+        self._metrics = metrics or NULL_METRICS
+        self._label = self._link.label
+        # Shared by every client of the receiver unless one is given.
+        self.breaker = breaker or get_breaker(*self._link.address)
+        self._connections = 0
+        self._queue = CommandQueue()
+        self._queued = threading.Condition()
+        self._sending = False
+        # ZoneState of every zone seen, by zone; changed under _status_lock
+        # as the listener thread parses responses.
         self.status = {}
+        self._status_lock = threading.Lock()
+        self._cache = cache or get_cache()
+        self._source_count = None
+        self._discovered = {}
+        self._sources = {}
+        self._source_s2l = {}
+        self._source_l2s = {}
+        self._api_cmds = {}
+        self._parser = None
+        self._model_lock = threading.Lock()
+        model = self._initial_model(model)
+        if model != 'auto':
+            self._use_model(model)
+
+    def _initial_model(self, model):
+        """Return the model to use; 'auto' is probed on first use."""
+        if model != 'auto':
+            return model
+        return known_model(self._host, self._port, self._cache) or model
+
+    def _resolve_model(self):
+        """Probe the receiver for its model if it is 'auto'.
+
+        Returns False while the model is not known. A probe that is not
+        answered is tried again on a later use, after the reconnect backoff.
+        """
+        if self._model != 'auto':
+            return True
+        with self._model_lock:
+            if self._model == 'auto' and time.time() >= self._next_connect:
+                model = detect_model(self._host, self._port, self._timeout,
+                                     self._cache, self._link)
+                if model is None:
+                    self._back_off()
+                else:
+                    self._use_model(model)
+        return self._model != 'auto'
+
+    def _use_model(self, model):
+        """Select the command and response tables of model.
+
+        The tables are loaded and compiled once per model and shared by
+        every client.
+        """
+        protocol = get_protocol(model)
+        self._model = model
+        self._api_cmds = protocol.CMDS
+        self._api_sources = protocol.SOURCES
+        self._parser = get_parser(model)
+        self._fields = model_fields(model)
+        self._cache_section = '{}/{}'.format(self._label, model)
+        # Read from the cache when first needed.
+        self._sources = None
+        self._sources_checked = (SOURCE_NAME_QUERY.get(model) not in
+                                 self._api_cmds)
+
+    @property
+    def model(self):
+        """Return the model, 'auto' until the receiver has been probed."""
+        return self._model
+
+    @property
+    def parser(self):
+        """Return the ResponseParser of the model, None until it is known."""
+        return self._parser
+
+    @property
+    def label(self):
+        """Return the receiver as 'host:port', or the serial device."""
+        return self._label
+
+    def supports(self, cmd):
+        """Return True if the protocol of the model has the command cmd."""
+        return cmd in self._api_cmds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def available(self):
+        """Return False while commands would not reach the receiver.
+
+        That is while the circuit breaker is open, or after a failed
+        connection attempt until the reconnect backoff has passed.
+        """
+        return (self.breaker.state != OPEN and
+                time.time() >= self._next_connect)
+
+    def connect(self):
+        """Open the persistent connection to the receiver."""
+        if not self._resolve_model():
+            return False
+        with self._lock:
+            return self._connect() is not None
+
+    def close(self):
+        """Close the persistent connection if it is open.
+
+        The listener and the volume schedulers are stopped first, so the
+        connection is not reopened.
+        """
+        self.stop_listening()
+        for scheduler in self._volume_schedulers.values():
+            scheduler.close()
+        with self._lock:
+            self._disconnect()
+
+    def subscribe(self, callback):
+        """Register callback(zone, field, value) for every changed field.
 
-    def update(self, zone=None):
-        """Retrieve the latest data."""
-        if zone is None:
-            zone = self._zone
-            self.send_command('ZoneQuery', zone)
+        Returns a function that removes the subscription again.
+        """
+        self._callbacks.append(callback)
+        return lambda: self._callbacks.remove(callback)
+
+    def listen(self):
+        """Keep a persistent connection open and watch all responses.
+
+        The receiver reports changes made from the front panel or remote,
+        so with a listener running the status is kept current without
+        polling. Commands sent while listening are answered through the
+        listener. The connection is closed again by stop_listening().
+        """
+        if self._listener is not None:
+            return
+        self._stop_listener.clear()
+        self._listener = threading.Thread(target=self._listen,
+                                          name='anthemav-listener',
+                                          daemon=True)
+        self._listener.start()
+
+    def stop_listening(self):
+        """Stop the listener thread."""
+        self._stop_listener.set()
+        listener = self._listener
+        if listener is not None and listener is not threading.current_thread():
+            listener.join()
+            self._listener = None
+
+    def update(self, zone=None, force=False):
+        """Retrieve the latest data.
+
+        Fields read less than ttl seconds ago are served from the status
+        unless force is set, so several callers polling the same receiver
+        share one query per ttl window.
+        """
+        if not self._resolve_model():
+            return self.status
+        zone = zone or self._zone
+        fields = self._stale_fields(zone, force)
+        if fields:
+            check = self._source_check_payloads()
+            payloads = self._query_payloads(zone, fields) + check
+            payload = ''.join(payloads)
+            if self._send_payload(payload, count=len(payloads),
+                                  priority=BACKGROUND, key=payload):
+                self._touch(zone, fields)
+            if check and self._sources_outdated():
+                self._read_source_names()
         return self.status
 
-    def volume_set(self, volume):
+    def _stale_fields(self, zone, force=False):
+        """Return the fields of zone that are older than the ttl."""
+        if force:
+            return list(self._fields)
+        state = self.status.get(zone)
+        if state is None:
+            return list(self._fields)
+        expired = time.time() - self._ttl
+        return [field for field in self._fields
+                if state.updated(field) <= expired]
+
+    def _query_payloads(self, zone, fields):
+        """Return the payloads that query fields of zone."""
+        if 'ZoneQuery' in self._api_cmds:
+            return [self._render('ZoneQuery', zone)]
+        queries = dict(FIELD_QUERIES)
+        return [self._render(queries[field], zone) for field in fields]
+
+    def _touch(self, zone, fields):
+        """Mark fields of zone as read now."""
+        with self._status_lock:
+            self._zone_state(zone).touch(fields, time.time())
+
+    def _zone_state(self, zone):
+        """Return the ZoneState of zone, creating it on first use.
+
+        Called with _status_lock held.
+        """
+        state = self.status.get(zone)
+        if state is None:
+            state = self.status[zone] = ZoneState(zone)
+        return state
+
+    def _invalidate(self, zone, cmd):
+        """Mark the field a set command changes as stale."""
+        state = self.status.get(zone)
+        if state is None or cmd.endswith('Query'):
+            return
+        with self._status_lock:
+            for field, query in FIELD_QUERIES:
+                if cmd.startswith(query[:-len('Query')]):
+                    state.invalidate(field)
+
+    def power_set(self, power, zone=None):
+        """Power commands."""
+        cmd = 'PowerOn' if power else 'PowerOff'
+        return self.send_command(cmd, zone or self._zone)
+
+    def volume_set(self, volume, zone=None):
         """Volume commands."""
-        self.send_command('ZoneQuery')
-        return
+        return self.send_command('VolumeSet', zone or self._zone,
+                                 volume=volume)
+
+    def volume_scheduler(self, zone=None, interval=0.1):
+        """Return the rate limited volume scheduler for a zone.
+
+        Use it for volume sliders: scheduler.set(volume) coalesces bursts
+        and scheduler.ramp(volume, duration) fades to a level.
+        """
+        zone = zone or self._zone
+        if zone not in self._volume_schedulers:
+            self._volume_schedulers[zone] = self._volume_scheduler_class(
+                self, zone, interval)
+        return self._volume_schedulers[zone]
+
+    def mute_set(self, mute, zone=None):
+        """Mute commands."""
+        cmd = 'MuteOn' if mute else 'MuteOff'
+        return self.send_command(cmd, zone or self._zone)
+
+    def source_set(self, source, zone=None):
+        """Source commands, using the source number or name."""
+        if not self._resolve_model():
+            return self.status
+        return self.send_command('SourceSet', zone or self._zone,
+                                 source=self._source_number(source))
+
+    @property
+    def sources(self):
+        """Return the source names by source number."""
+        self._source_names()
+        return self._source_s2l
+
+    def _source_names(self):
+        """Return {number: name}, read from the cache on first use."""
+        if self._sources is None:
+            self._sources = (
+                self._cache.get(self._cache_section, 'sources') or
+                dict(self._api_sources))
+            self.sourcelist_create()
+        return self._sources
+
+    def _source_number(self, source):
+        """Return the number of a source name, or source itself."""
+        self._source_names()
+        return self._source_l2s.get(source, source)
 
     def sourcelist_create(self):
-        """Create a reverse dictionary for the sources."""
-        self._source_s2l = self._api_sources
-        self._source_l2s = {v: k for k, v in self._api_source.items()}
-        return
+        """Create the source dictionaries, by number and by name."""
+        sources = self._source_names()
+        self._source_s2l = dict(sources)
+        self._source_l2s = {v: k for k, v in sources.items()}
+        return self._source_s2l
+
+    def sourcelist_set(self, sources):
+        """Set the source list {number: name}, overriding default list."""
+        self._sources = {str(k): v for k, v in sources.items()}
+        self._sources_checked = True
+        return self.sourcelist_create()
+
+    def discover_sources(self, force=False):
+        """Read the source names from the receiver (x10/x20).
+
+        Names are cached on disk by host and model. Only the number of
+        inputs (ICN?) is asked to check the cache, and the names are read
+        again when it differs or with force. Returns the source names by
+        number.
+        """
+        if not self._resolve_model():
+            return self.sources
+        payload = self._source_count_payload()
+        if payload is None:
+            return self.sources
+        self._source_count = None
+        self._send_payload(payload, priority=BACKGROUND, key=payload)
+        if self._sources_outdated(force):
+            self._read_source_names()
+        return self.sources
+
+    def _read_source_names(self):
+        payloads = self._source_name_payloads()
+        self._send_payload(''.join(payloads), count=len(payloads),
+                           priority=BACKGROUND)
+        self._store_sources()
 
-    def sourcelist_set(self, source):
-        """Set the source list, overriding default list."""
-        return
+    def _source_count_payload(self):
+        """Return the ICN? payload, None if the model has no input table."""
+        if SOURCE_NAME_QUERY.get(self._model) in self._api_cmds:
+            return self._render('SourceActiveQuery')
+
+    def _source_check_payloads(self):
+        """Return [ICN?] the first time, to check the cached source names."""
+        if self._sources_checked:
+            return []
+        self._sources_checked = True
+        self._source_count = None
+        return [self._source_count_payload()]
+
+    def _sources_outdated(self, force=False):
+        """Return True when the source names must be read again.
+
+        Called once the reply to ICN? is in; without one the check is
+        repeated on the next update.
+        """
+        if self._source_count is None:
+            self._sources_checked = False
+            return False
+        return force or self._source_count != len(self._source_names())
+
+    def _source_name_payloads(self):
+        self._discovered = {}
+        query = SOURCE_NAME_QUERY[self._model]
+        return [self._render(query, source_num='{:02d}'.format(number))
+                for number in range(1, self._source_count + 1)]
+
+    def _store_sources(self):
+        """Adopt and cache the source names read, if all of them were."""
+        if len(self._discovered) != self._source_count:
+            _LOGGER.warning("Read %s of %s source names from %s",
+                            len(self._discovered), self._source_count,
+                            self._label)
+            return
+        self._sources = self._discovered
+        self._cache.set(self._cache_section, 'sources', self._sources)
+        self.sourcelist_create()
+
+    def _update_sources(self, response):
+        """Record an input count or name; return False for other responses."""
+        m = SOURCE_COUNT.match(response)
+        if m:
+            self._source_count = int(m.group('count'))
+            return True
+        m = SOURCE_NAME.match(response)
+        if m:
+            self._discovered[str(int(m.group('number')))] = \
+                m.group('name').strip()
+            return True
+        return False
 
     def _update_status(self, response):
-        """Convert the response into a command reponse using api."""
-        response = self._standarise_response(response)
-        for regex in self._api_regex:
-            m = re.search(r'{}'.format(regex), response)
-            if m:
-                for k, v in m.groupdict().items():
-                    if m.group('zone') not in self.status:
-                        self.status[m.group('zone')] = {}
-                    self.status[m.group('zone')][k] = v
-        return
-
-    def send_command(self, cmd, zone='', volume='', source=''):
+        """Parse a response into the ZoneState of its zone.
+
+        Subscribers are called for the fields whose value changed, once the
+        status has been updated.
+        """
+        if not response:
+            return
+        if response[:1] == 'I' and self._update_sources(response):
+            return
+        parsed = self._parser.parse(response)
+        if not parsed and self._metrics.enabled:
+            self._metrics.inc('anthemav_parse_misses_total', host=self._label,
+                              regex=self._parser.dispatch_pattern(response)
+                              or '')
+        now = time.time()
+        changes = []
+        with self._status_lock:
+            for groups in parsed:
+                zone = groups.get('zone')
+                changed = self._zone_state(zone).apply(groups, now)
+                changes += [(zone, field, value)
+                            for field, value in changed.items()]
+        for zone, field, value in changes:
+            self._notify(zone, field, value)
+
+    def _notify(self, zone, field, value):
+        """Call the subscribers for a changed field."""
+        for callback in list(self._callbacks):
+            callback(zone, field, value)
+
+    def send_command(self, cmd, zone='', **kwargs):
         """Convert command to payload and send."""
-        if cmd in self._api_cmds:
-            payload = self._api_cmds[cmd].format(zone=zone,
-                                                 volume=volume,
-                                                 source=source)
-            print('Payload convert:', payload)
-            response = self._send_payload(payload)
+        if not self._resolve_model():
+            return self.status
+        payload = self._render(cmd, zone, **kwargs)
+        if payload is not None:
+            priority, key, supersede = queueing(cmd, zone, payload)
+            self._send_payload(payload, priority=priority, key=key,
+                               supersede=supersede)
         else:
-            print('Command not found.')
-            response = 'failed'
-        self._update_status(response)
+            _LOGGER.error("Command not found: %s", cmd)
+        return self.status
+
+    def send_commands(self, commands):
+        """Send several commands in a single write.
+
+        commands is a list of (cmd, kwargs) entries, e.g.
+        [('PowerOn', {}), ('VolumeSet', {'volume': -35})]; the zone defaults
+        to the receiver zone. The status is returned once every reply has
+        been parsed.
+        """
+        self.command_replies(commands)
         return self.status
 
+    def command_replies(self, commands):
+        """Send (cmd, kwargs) commands like send_commands(); return replies.
+
+        Returns the replies read after the write, one per command sent, or
+        None when they did not all come in time or nothing was sent.
+        Commands the protocol does not have are left out.
+        """
+        if not self._resolve_model():
+            return None
+        payloads = []
+        for cmd, kwargs in commands:
+            kwargs = dict(kwargs)
+            zone = kwargs.pop('zone', self._zone)
+            payload = self._render(cmd, zone, **kwargs)
+            if payload is None:
+                _LOGGER.error("Command not found: %s", cmd)
+                continue
+            payloads.append(payload)
+        if not payloads:
+            return None
+        return self._send_payload(''.join(payloads), count=len(payloads))
+
+    def _render(self, cmd, zone='', **kwargs):
+        """Convert a command name into a payload, None if not supported.
+
+        The status field the command changes is marked as stale.
+        """
+        if cmd not in self._api_cmds:
+            return
+        self._invalidate(zone, cmd)
+        # Tags that are not given render empty.
+        values = collections.defaultdict(str, kwargs, zone=zone)
+        return self._api_cmds[cmd].format_map(values)
+
+    def _back_off(self):
+        """Delay the next connection attempt, doubling the backoff."""
+        self._backoff = min(max(self._backoff * 2, self._backoff_min),
+                            self._backoff_max)
+        self._next_connect = time.time() + self._backoff
+        _LOGGER.warning("Retrying %s on port %s in %ss",
+                        self._host, self._port, self._backoff)
+
     def _standarise_response(self, response):
         """Convert the response into a standard response.
         Responses for standby are different.
         """
-        # add x10 and x20 support with zone insertion
-        for regex in self._api_response_replace:
-            # print(regex[0], regex[1])
-            # print(response)
-            m = re.search(r'{}'.format(regex[0]), response)
-            if m:
-                response = regex[1]
-                print("Updated response: %s" % response)
-        return response
+        return self._parser.standardise(response)
 
-    def _send_payload(self, payload):
-        """Send a command to the AnthemAV receiver and return the response."""
-        print("Payload: %s" % payload)
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            sock.settimeout(self._timeout)
-            try:
-                sock.connect((self._host, self._port))
-            except socket.error as err:
-                print("Unable to connect to %s on port %s: %s" %
-                      self._host, self._post, err)
+    def _connect(self):
+        """Return the persistent socket, reconnecting with backoff."""
+        if self._sock is not None:
+            return self._sock
+        if time.time() < self._next_connect:
+            return
+        sock = self._open_socket()
+        if sock is None:
+            self._back_off()
+            return
+        if self._connections and self._metrics.enabled:
+            self._metrics.inc('anthemav_reconnects_total', host=self._label)
+        self._connections += 1
+        self._backoff = 0
+        self._next_connect = 0
+        self._sock = sock
+        return sock
+
+    def _open_socket(self):
+        """Return a connection to the receiver, None on failure.
+
+        A socket for TCP; other transports return an object with the same
+        fileno, sendall, recv and close methods.
+        """
+        start = time.perf_counter()
+        try:
+            sock = self._link.open(self._timeout)
+        except socket.error as err:
+            _LOGGER.warning("Unable to connect to %s on port %s: %s",
+                            self._host, self._port, err)
+            self._metrics.inc('anthemav_connect_errors_total',
+                              host=self._label)
+            return
+        if self._metrics.enabled:
+            self._metrics.observe('anthemav_connect_seconds',
+                                  time.perf_counter() - start,
+                                  host=self._label)
+        return sock
+
+    def _disconnect(self):
+        """Drop the persistent socket."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            self._framer.clear()
+
+    def _drain(self, sock):
+        """Consume status lines the receiver sent since the last command."""
+        while True:
+            readable, _, _ = select.select([sock], [], [], 0)
+            if not readable:
                 return
+            self._receive(sock)
+
+    def _receive(self, sock):
+        """Read from the socket and parse every complete response."""
+        value = sock.recv(self._buffersize)
+        if value is None:
+            # A serial port with nothing to read after all.
+            return []
+        if not value:
+            raise ConnectionResetError('connection closed by receiver')
+        if self._metrics.enabled:
+            self._metrics.inc('anthemav_bytes_received_total', len(value),
+                              host=self._label)
+        frames = self._framer.feed(value)
+        if frames:
+            self._lastupdatetime = time.time()
+        for frame in frames:
+            self._update_status(frame)
+        return frames
 
+    def _exchange(self, sock, payload, count=1):
+        """Write the payload to an open socket and read count replies.
+
+        Every response read is parsed. Returns the count replies, None if
+        they did not all come in time.
+        """
+        data = payload.encode()
+        start = time.perf_counter()
+        sock.sendall(data)
+        self._count_sent(data)
+        deadline = time.time() + self._timeout
+        frames = []
+        while len(frames) < count:
+            remaining = deadline - time.time()
+            readable, _, _ = select.select([sock], [], [], max(remaining, 0))
+            if not readable:
+                _LOGGER.warning("Timeout (%s second(s)) waiting for a "
+                                "response after sending %s to %s on port %s.",
+                                self._timeout, payload, self._host,
+                                self._port)
+                self._metrics.inc('anthemav_timeouts_total', host=self._label)
+                return
+            frames += self._receive(sock)
+        if self._metrics.enabled:
+            self._metrics.observe('anthemav_round_trip_seconds',
+                                  time.perf_counter() - start,
+                                  host=self._label)
+        _LOGGER.debug("Response: %s", frames[0])
+        return frames[:count]
+
+    def _listen(self):
+        """Read responses until stop_listening is called."""
+        while not self._stop_listener.is_set():
+            sock = self._sock
+            if sock is None and self._resolve_model():
+                with self._lock:
+                    sock = self._connect()
+            if sock is None:
+                self._stop_listener.wait(
+                    max(self._next_connect - time.time(), self._backoff_min))
+                continue
             try:
-                sock.send(payload.encode())
+                readable, _, _ = select.select([sock], [], [], self._timeout)
+                if not readable:
+                    continue
+                frames = self._receive(sock)
+            except (socket.error, ValueError) as err:
+                _LOGGER.warning("Listener lost connection to %s on port %s: "
+                                "%s", self._host, self._port, err)
+                with self._lock:
+                    if self._sock is sock:
+                        self._disconnect()
+                continue
+            if frames:
+                with self._frames_read:
+                    self._frames_seen += len(frames)
+                    self._frames.extend(frames)
+                    self._frames_read.notify_all()
+        with self._lock:
+            self._disconnect()
+
+    def _send_listening(self, payload, count=1):
+        """Write a payload and wait for the listener to read count replies.
+
+        Returns the replies once they have been read; the listener parses
+        them.
+        The connection lock is only held for the write, so the listener can
+        drop and reopen the connection while the reply is awaited.
+        """
+        data = payload.encode()
+        with self._lock:
+            sock = self._connect()
+            if sock is None:
+                return
+            with self._frames_read:
+                seen = self._frames_seen + count
+            start = time.perf_counter()
+            try:
+                sock.sendall(data)
+                self._count_sent(data)
             except socket.error as err:
-                print("Unable to send payload %s to %s on port %s: %s" %
-                      payload, self._host, self._port, err)
+                _LOGGER.warning("Unable to send payload %s to %s on port %s: "
+                                "%s", payload, self._host, self._port, err)
+                self._disconnect()
                 return
+        with self._frames_read:
+            answered = self._frames_read.wait_for(
+                lambda: self._frames_seen >= seen, self._timeout)
+            # The replies are the count frames read from seen - count on.
+            first = seen - count - (self._frames_seen - len(self._frames))
+            frames = list(self._frames)[max(first, 0):][:count]
+        if not answered:
+            _LOGGER.warning("Timeout (%s second(s)) waiting for a "
+                            "response after sending %s to %s on port %s.",
+                            self._timeout, payload, self._host, self._port)
+            self._metrics.inc('anthemav_timeouts_total', host=self._label)
+            return
+        if self._metrics.enabled:
+            self._metrics.observe('anthemav_round_trip_seconds',
+                                  time.perf_counter() - start,
+                                  host=self._label)
+        return frames
 
-            readable, _, _ = select.select([sock], [], [], self._timeout)
-            if not readable:
-                print("Timeout (%s second(s)) waiting for a response after "
-                      "sending %s to %s on port %s." %
-                      self._timeout, payload, self._host, self._port)
+    def _count_sent(self, data):
+        """Count bytes written, whether or not they are answered."""
+        if self._metrics.enabled:
+            self._metrics.inc('anthemav_bytes_sent_total', len(data),
+                              host=self._label)
+
+    def _send_persistent(self, payload, count=1):
+        """Send a payload over the long-lived connection.
+
+        A socket the receiver has closed while idle is only noticed on use,
+        so a failed send is retried once on a fresh connection.
+        """
+        with self._lock:
+            for attempt in range(2):
+                sock = self._connect()
+                if sock is None:
+                    return
+                try:
+                    self._drain(sock)
+                    return self._exchange(sock, payload, count)
+                except socket.error as err:
+                    _LOGGER.warning("Unable to send payload %s to %s on port "
+                                    "%s: %s", payload, self._host, self._port,
+                                    err)
+                    self._disconnect()
+
+    def _send_payload(self, payload, count=1, priority=INTERACTIVE, key=None,
+                      supersede=False):
+        """Send a command to the AnthemAV receiver and return the replies.
+
+        payload may hold several commands, in which case count is the
+        number of replies to wait for. None is returned when they did not
+        all come. Payloads go through the command
+        queue: the calling thread sends queued payloads, highest priority
+        first, until its own has been answered, or waits while another
+        thread does so. key and supersede are passed to CommandQueue.push.
+        """
+        with self._queued:
+            entry = self._queue.push(payload, count, priority, key, supersede)
+            self._gauge_queue()
+        while True:
+            with self._queued:
+                self._queued.wait_for(
+                    lambda: entry.done or not self._sending)
+                if entry.done:
+                    return entry.result
+                job = self._queue.pop()
+                self._gauge_queue()
+                self._sending = True
+            response = None
+            try:
+                response = self._send_queued(job.payload, job.count)
+            finally:
+                with self._queued:
+                    self._sending = False
+                    self._queue.done(job, response)
+                    self._queued.notify_all()
+
+    def _gauge_queue(self):
+        if self._metrics.enabled:
+            self._metrics.gauge('anthemav_queue_depth', len(self._queue),
+                                host=self._label)
+
+    def _send_queued(self, payload, count):
+        """Send a payload taken from the queue, unless the circuit is open."""
+        _LOGGER.debug("Payload: %s", payload)
+        if not self.breaker.allow():
+            _LOGGER.debug("Circuit to %s is open, not sending %s",
+                          self._label, payload)
+            return
+        response = None
+        try:
+            response = self._send(payload, count)
+        finally:
+            self.breaker.record(response is not None)
+        return response
+
+    def _send(self, payload, count=1):
+        if self._listener is not None:
+            return self._send_listening(payload, count)
+        if self._persistent:
+            return self._send_persistent(payload, count)
+        self._framer.clear()
+        sock = self._open_socket()
+        if sock is None:
+            return
+        with sock:
+            try:
+                return self._exchange(sock, payload, count)
+            except socket.error as err:
+                _LOGGER.warning("Unable to send payload %s to %s on port %s: "
+                                "%s", payload, self._host, self._port, err)
                 return
-            self._lastupdatetime = time.time()
-            value = sock.recv(self._buffersize).decode().rstrip()
-            print("Response: %s" % value)
-        return value
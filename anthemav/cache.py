@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import os
+import json
+import logging
+import threading
+
+_LOGGER = logging.getLogger(__name__)
+
+# Set to a file path to move the default cache, or to '' to keep it in
+# memory only.
+CACHE_ENV = 'ANTHEMAV_CACHE'
+
+
+def default_path():
+    """Return the path of the default cache file."""
+    path = os.environ.get(CACHE_ENV)
+    if path is not None:
+        return path or None
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'anthemav', 'receivers.json')
+
+
+class DiskCache():
+    """Small JSON file of what has been learned about receivers.
+
+    Values are grouped in sections, one per receiver (e.g. 'host:port/x10'),
+    so what a restart would otherwise have to ask the receiver again is
+    available at once. The file is read on first use and rewritten
+    atomically on every change; with path None nothing is written.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def get(self, section, key, default=None):
+        """Return a cached value."""
+        with self._lock:
+            return self._load().get(section, {}).get(key, default)
+
+    def set(self, section, key, value):
+        """Cache a JSON serialisable value."""
+        with self._lock:
+            data = self._load()
+            if data.get(section, {}).get(key) == value:
+                return
+            data.setdefault(section, {})[key] = value
+            self._save(data)
+
+    def delete(self, section, key=None):
+        """Forget a value, or a whole section when key is None."""
+        with self._lock:
+            data = self._load()
+            if key is None:
+                data.pop(section, None)
+            else:
+                data.get(section, {}).pop(key, None)
+            self._save(data)
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path) as handle:
+                        self._data = json.load(handle)
+                except (OSError, ValueError) as err:
+                    _LOGGER.warning("Ignoring unreadable cache %s: %s",
+                                    self.path, err)
+        return self._data
+
+    def _save(self, data):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Unique to the process and thread that writes it.
+            temp = '{}.{}.{}.tmp'.format(self.path, os.getpid(),
+                                         threading.get_ident())
+            with open(temp, 'w') as handle:
+                json.dump(data, handle, indent=1, sort_keys=True)
+            os.replace(temp, self.path)
+        except OSError as err:
+            _LOGGER.warning("Unable to write cache %s: %s", self.path, err)
+
+
+_CACHE = None
+
+
+def get_cache():
+    """Return the DiskCache at default_path(), shared by every client."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = DiskCache(default_path())
+    return _CACHE
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+"""Control an Anthem receiver from the command line.
+
+    anthemav --host 192.168.1.50 power on --zone 2
+    anthemav --host 192.168.1.50 volume -35
+    anthemav --host 192.168.1.50 status
+    anthemav --host 192.168.1.50 batch commands.txt
+    anthemav --host 192.168.1.50 watch
+    anthemav --host 192.168.1.50
+
+Every run keeps one connection to the receiver. A batch file holds one
+command per line, in the same words as on the command line; commands are
+written several at a time (--window) and their replies read together.
+Without a command, or with batch - on a terminal, commands are read at a
+prompt and sent as they are entered. watch prints every change the
+receiver reports as a JSON line.
+
+The exit status is 1 when a command cannot be parsed, is refused by the
+receiver or is not answered in time.
+"""
+import sys
+import json
+import time
+import shlex
+import logging
+import argparse
+
+from anthemav.anthemav import AnthemAV, model_fields
+from anthemav.parser import is_error
+from anthemav.protocols import MODELS
+from anthemav.transport import SerialTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMANDS = """commands:
+  power on|off            switch the zone on or off
+  volume LEVEL|up|down    set the volume in dB, or step it
+  mute on|off|toggle      mute or unmute the zone
+  source NUMBER|NAME      select an input
+  send NAME [TAG=VALUE]   send any command of the protocol tables
+  status                  print the status of the zone as JSON
+  sources                 print the input names as JSON
+  batch FILE              run the commands in FILE, - for stdin
+  watch [SECONDS]         print status changes as JSON lines
+
+Without a command, commands are read at a prompt.
+"""
+
+# Commands that are not sent as they are, with their numbers of arguments.
+LOCAL_COMMANDS = {
+    'status': (0,),
+    'sources': (0,),
+    'batch': (1,),
+    'watch': (0, 1),
+}
+
+# Arguments of the commands that switch something, by command word.
+SWITCHES = {
+    'power': {'on': 'PowerOn', 'off': 'PowerOff'},
+    'mute': {'on': 'MuteOn', 'off': 'MuteOff', 'toggle': 'MuteToggle'},
+    'volume': {'up': 'VolumeUp', 'down': 'VolumeDown'},
+}
+
+
+class CommandError(ValueError):
+    """A command line that cannot be sent."""
+
+
+def split_zone(words, zone):
+    """Return (words, zone) with a '--zone N' option taken out of words."""
+    rest = []
+    words = iter(words)
+    for word in words:
+        if word in ('--zone', '-z'):
+            zone = next(words, None)
+            if zone is None:
+                raise CommandError('--zone needs a value')
+        elif word.startswith('--zone='):
+            zone = word[len('--zone='):]
+        else:
+            rest.append(word)
+    return rest, str(zone)
+
+
+def translate(mrx, words):
+    """Return the (cmd, kwargs) of command words such as ['power', 'on'].
+
+    Source names are looked up on the receiver, so mrx must be connected.
+    """
+    if not words:
+        raise CommandError('no command given')
+    name, args = words[0].lower(), words[1:]
+    if name == 'send' and args:
+        cmd, kwargs = args[0], {}
+        for arg in args[1:]:
+            tag, sep, value = arg.partition('=')
+            if not sep:
+                raise CommandError('expected TAG=VALUE, not {!r}'.format(arg))
+            kwargs[tag] = value
+    elif len(args) == 1 and args[0].lower() in SWITCHES.get(name, ()):
+        cmd, kwargs = SWITCHES[name][args[0].lower()], {}
+    elif name == 'volume' and len(args) == 1:
+        try:
+            volume = float(args[0])
+        except ValueError:
+            raise CommandError('not a volume: {!r}'.format(args[0]))
+        cmd = 'VolumeSet'
+        kwargs = {'volume': int(volume) if volume.is_integer() else volume}
+    elif name == 'source' and args:
+        source = ' '.join(args)
+        sources = mrx.sources
+        if source not in sources and source not in sources.values():
+            sources = mrx.discover_sources()
+        numbers = {v: k for k, v in sources.items()}
+        cmd, kwargs = 'SourceSet', {'source': numbers.get(source, source)}
+    else:
+        raise CommandError('unknown command: {}'.format(' '.join(words)))
+    if not mrx.supports(cmd):
+        raise CommandError('{} is not a command of the {} protocol'.format(
+            cmd, mrx.model))
+    return cmd, kwargs
+
+
+def print_json(value):
+    print(json.dumps(value, sort_keys=True), flush=True)
+
+
+def print_status(mrx, zone):
+    """Query and print the status of zone; return False if not answered."""
+    start = time.time()
+    mrx.update(zone, force=True)
+    state = mrx.status.get(zone)
+    print_json(dict(state.as_dict() if state else {}, zone=zone))
+    return state is not None and all(state.updated(field) >= start
+                                     for field in model_fields(mrx.model))
+
+
+def send(mrx, commands, places):
+    """Send (cmd, kwargs) commands in one write; return how many failed.
+
+    A command fails when the receiver refuses it or the replies do not
+    all come. Failures are reported on stderr at the place (file and
+    line) of their command.
+    """
+    replies = mrx.command_replies(commands)
+    if replies is None:
+        for place in places:
+            print('{}: no reply from the receiver'.format(place),
+                  file=sys.stderr)
+        return len(commands)
+    errors = 0
+    for place, reply in zip(places, replies):
+        if is_error(reply):
+            print('{}: refused by the receiver: {}'.format(place, reply),
+                  file=sys.stderr)
+            errors += 1
+    return errors
+
+
+def run_batch(mrx, lines, zone, window=16, name='-', start=1):
+    """Run the command lines of a batch; returns the number of errors.
+
+    Commands are sent window at a time in one write each; 'status' and
+    'sources' lines first wait for the commands before them. Lines that
+    cannot be parsed, commands the receiver refuses or does not answer,
+    and status queries left unanswered are errors. Lines are numbered from
+    start in error messages.
+    """
+    errors = 0
+    pending = []
+    places = []
+
+    def flush():
+        failed = 0
+        if pending:
+            failed = send(mrx, pending, places)
+            del pending[:]
+            del places[:]
+        return failed
+
+    for number, line in enumerate(lines, start):
+        try:
+            words, line_zone = split_zone(shlex.split(line, comments=True),
+                                          zone)
+            if not words:
+                continue
+            if words[0] in ('status', 'sources') and len(words) == 1:
+                errors += flush()
+                if words[0] == 'status':
+                    if not print_status(mrx, line_zone):
+                        print('{}:{}: no reply from the receiver'.format(
+                            name, number), file=sys.stderr)
+                        errors += 1
+                else:
+                    print_json(mrx.discover_sources())
+                continue
+            cmd, kwargs = translate(mrx, words)
+        except (CommandError, ValueError) as err:
+            print('{}:{}: {}'.format(name, number, err), file=sys.stderr)
+            errors += 1
+            continue
+        pending.append((cmd, dict(kwargs, zone=line_zone)))
+        places.append('{}:{}'.format(name, number))
+        if len(pending) >= window:
+            errors += flush()
+    errors += flush()
+    return errors
+
+
+def interactive(mrx, zone, prompt='anthemav> '):
+    """Read commands at a prompt and send each one as it is entered.
+
+    Stops at end of input or on Ctrl-C; returns the number of errors.
+    """
+    try:
+        import readline  # noqa: F401
+    except ImportError:
+        pass
+    errors = number = 0
+    while True:
+        try:
+            line = input(prompt)
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return errors
+        number += 1
+        errors += run_batch(mrx, [line], zone, window=1, name='<stdin>',
+                            start=number)
+
+
+def watch(mrx, zone, seconds=None):
+    """Print every status change as a JSON line, for seconds or forever."""
+    def changed(zone, field, value):
+        print_json({'time': round(time.time(), 3), 'zone': zone,
+                    'field': field, 'value': value})
+
+    mrx.subscribe(changed)
+    mrx.listen()
+    try:
+        # The first reply reports the current status as changes.
+        mrx.update(zone, force=True)
+        deadline = time.time() + seconds if seconds else None
+        while deadline is None or time.time() < deadline:
+            time.sleep(min(1, deadline - time.time()) if deadline else 1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mrx.stop_listening()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='anthemav', description=__doc__.splitlines()[0],
+        epilog=COMMANDS, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', help='receiver or serial bridge address')
+    parser.add_argument('--port', type=int, default=4999)
+    parser.add_argument('--serial', metavar='DEVICE',
+                        help='serial port of the receiver, instead of --host')
+    parser.add_argument('--model', default='auto',
+                        choices=('auto',) + MODELS)
+    parser.add_argument('--zone', '-z', default='1')
+    parser.add_argument('--window', type=int, default=16,
+                        help='batch commands sent in one write')
+    parser.add_argument('--verbose', '-v', action='store_true')
+    parser.add_argument('command', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_intermixed_args(argv)
+    if not args.host and not args.serial:
+        parser.error('one of --host or --serial is required')
+    if args.window < 1:
+        parser.error('--window must be at least 1')
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else
+                        logging.WARNING)
+    transport = SerialTransport(args.serial) if args.serial else None
+    mrx = AnthemAV(args.host, args.port, model=args.model, zone=args.zone,
+                   persistent=True, transport=transport)
+    words = args.command or ['batch', '-']
+    name, rest = words[0].lower(), words[1:]
+    seconds = None
+    if name in LOCAL_COMMANDS and len(rest) not in LOCAL_COMMANDS[name]:
+        parser.error('wrong number of arguments for {}'.format(name))
+    if name == 'watch' and rest:
+        try:
+            seconds = float(rest[0])
+        except ValueError as err:
+            parser.error(err)
+
+    if not mrx.connect():
+        print('anthemav: unable to connect to {}'.format(
+            args.serial or '{}:{}'.format(args.host, args.port)),
+            file=sys.stderr)
+        return 1
+    errors = 0
+    try:
+        if name not in LOCAL_COMMANDS:
+            try:
+                cmd, kwargs = translate(mrx, words)
+            except CommandError as err:
+                parser.error(err)
+            errors = send(mrx, [(cmd, dict(kwargs, zone=args.zone))],
+                          ['anthemav'])
+        elif name == 'status':
+            if not print_status(mrx, args.zone):
+                print('anthemav: no reply from the receiver', file=sys.stderr)
+                errors = 1
+        elif name == 'sources':
+            print_json(mrx.discover_sources())
+        elif name == 'watch':
+            watch(mrx, args.zone, seconds)
+        elif rest[0] == '-' and sys.stdin.isatty():
+            interactive(mrx, args.zone)
+        elif rest[0] == '-':
+            errors = run_batch(mrx, sys.stdin, args.zone, args.window)
+        else:
+            with open(rest[0]) as lines:
+                errors = run_batch(mrx, lines, args.zone, args.window,
+                                   rest[0])
+    except BrokenPipeError:
+        pass
+    except OSError as err:
+        print('anthemav: {}'.format(err), file=sys.stderr)
+        return 1
+    finally:
+        mrx.close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import heapq
+
+# Priorities, lowest first out.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Set commands of which only the latest queued one per zone is worth sending.
+SUPERSEDED = ('VolumeSet', 'SourceSet')
+
+
+def queueing(cmd, zone, payload):
+    """Return the (priority, key, supersede) to queue a command with.
+
+    Queries are background work and identical ones share one send; a
+    VolumeSet or SourceSet replaces the one still queued for its zone;
+    other commands are interactive and always sent.
+    """
+    if cmd.endswith('Query'):
+        return BACKGROUND, payload, False
+    if cmd in SUPERSEDED:
+        return INTERACTIVE, (cmd, zone), True
+    return INTERACTIVE, None, False
+
+
+class QueuedCommand():
+    """A payload waiting in, or taken from, a CommandQueue."""
+
+    __slots__ = ('payload', 'count', 'priority', 'key', 'sent', 'done',
+                 'result', 'waiter')
+
+    def __init__(self, payload, count, priority, key):
+        self.payload = payload
+        self.count = count
+        self.priority = priority
+        self.key = key
+        self.sent = False
+        self.done = False
+        self.result = None
+        self.waiter = None
+
+
+class CommandQueue():
+    """Payloads waiting to be written to one receiver connection.
+
+    Entries leave by priority, then in the order they were queued, so a
+    mute press overtakes a backlog of polls. Entries with a key are
+    coalesced: pushing a key that is queued or in flight returns that
+    entry, and the caller shares its result, unless supersede is set, in
+    which case a still queued entry is sent with the new payload instead.
+
+    The queue does no locking or waiting of its own; the client does.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._keys = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, payload, count=1, priority=INTERACTIVE, key=None,
+             supersede=False):
+        """Queue payload and return the entry whose result to wait for."""
+        entry = self._keys.get(key) if key is not None else None
+        if entry is not None:
+            if not supersede:
+                return entry
+            if not entry.sent:
+                entry.payload = payload
+                entry.count = count
+                return entry
+        entry = QueuedCommand(payload, count, priority, key)
+        self._sequence += 1
+        heapq.heappush(self._heap, (priority, self._sequence, entry))
+        if key is not None:
+            self._keys[key] = entry
+        return entry
+
+    def pop(self):
+        """Return the next entry to send, None when the queue is empty."""
+        if not self._heap:
+            return None
+        entry = heapq.heappop(self._heap)[2]
+        entry.sent = True
+        return entry
+
+    def done(self, entry, result):
+        """Record the result of a sent entry."""
+        entry.result = result
+        entry.done = True
+        if self._keys.get(entry.key) is entry:
+            del self._keys[entry.key]
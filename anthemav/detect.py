@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+import re
+import time
+import socket
+import select
+import logging
+
+from anthemav.cache import get_cache
+from anthemav.framer import Framer
+from anthemav.transport import TcpTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+# Probes in the order they are tried, with the number of replies to expect:
+# the x10/x20 model and hardware queries, then an x00 zone status query.
+PROBES = (
+    ('IDQ?;IDH?;', 2),
+    ('P1?;', 1),
+)
+
+# 'IDQMRX 710 US 1.1.9, Apr 16 2014', 'IDQAVM 60 ...'
+MODEL_NUMBER = re.compile(r'(?P<line>MRX|AVM)\s*(?P<number>[0-9]+)')
+
+_MODELS = {}
+
+
+def model_from_responses(probe, responses):
+    """Return (model, certain) for the replies to a probe.
+
+    The model number identifies the x10/x20 generation; an x10/x20 error
+    reply ('!Z...' while in standby) only tells the protocol family, so
+    it is not certain. Any reply to the x00 probe means x00.
+    """
+    for response in responses:
+        m = MODEL_NUMBER.search(response)
+        if m:
+            if m.group('line') == 'AVM':
+                return 'x20', True
+            number = m.group('number')
+            if len(number) < 2:
+                continue
+            model = 'x{}0'.format(number[-2])
+            if model in ('x00', 'x10', 'x20'):
+                return model, True
+    if probe == PROBES[0][0]:
+        if any(response[:1] == '!' for response in responses):
+            return 'x10', False
+        return None, False
+    if responses:
+        return 'x00', True
+    return None, False
+
+
+def known_model(host, port, cache=None):
+    """Return the model found earlier for host:port, None if not probed."""
+    model = _MODELS.get((host, port))
+    if model is None:
+        model = (cache or get_cache()).get('{}:{}'.format(host, port),
+                                           'model')
+        if model is not None:
+            _MODELS[(host, port)] = model
+    return model
+
+
+def remember_model(host, port, model, certain, cache=None):
+    """Return the model found by a probe, keeping it if it is certain."""
+    if model is None:
+        _LOGGER.warning("Unable to identify the receiver at %s on port %s",
+                        host, port)
+        return None
+    _LOGGER.debug("Receiver at %s on port %s is an %s", host, port, model)
+    if certain:
+        _MODELS[(host, port)] = model
+        (cache or get_cache()).set('{}:{}'.format(host, port), 'model',
+                                   model)
+    return model
+
+
+def detect_model(host, port, timeout=2, cache=None, transport=None):
+    """Return the model of the receiver at host:port.
+
+    The receiver is probed once; the answer is kept for the process and
+    in the disk cache, so reconnects and restarts do not probe again.
+    None is returned when no probe is answered, to be tried again later.
+    Pass transport to probe over another link, such as a serial port.
+    """
+    model = known_model(host, port, cache)
+    if model is not None:
+        return model
+    transport = transport or TcpTransport(host, port)
+    found = None, False
+    for probe, count in PROBES:
+        try:
+            responses = _probe(transport, probe, count, timeout)
+        except socket.error as err:
+            _LOGGER.warning("Unable to probe %s on port %s: %s",
+                            host, port, err)
+            break
+        found = model_from_responses(probe, responses)
+        if found[0] is not None:
+            break
+    return remember_model(host, port, found[0], found[1], cache)
+
+
+def _probe(transport, probe, count, timeout):
+    framer = Framer()
+    responses = []
+    with transport.open(timeout) as sock:
+        sock.sendall(probe.encode())
+        deadline = time.time() + timeout
+        while len(responses) < count:
+            remaining = deadline - time.time()
+            readable, _, _ = select.select([sock], [], [], max(remaining, 0))
+            if not readable:
+                break
+            data = sock.recv(1024)
+            if data is None:
+                continue
+            if not data:
+                break
+            responses += framer.feed(data)
+    return responses
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+"""Emulator of an Anthem MRX receiver for testing without hardware.
+
+The emulator accepts the command grammar of the protocol tables of a model,
+keeps per-zone state and answers the way the receivers do, including the
+standby responses that RESPONSE_REPLACE handles ('Main Off' on x00, '!Z'
+prefixed echoes on x10/x20). Latency, jitter, dropped responses and
+unsolicited status reports can be configured to reproduce a slow bridge.
+
+    python -m anthemav.emulator --model x10 --port 4999 --latency 0.03
+
+With --pty the emulator answers on a pseudo terminal instead, standing in
+for a receiver on a serial port.
+"""
+import os
+import re
+import random
+import string
+import asyncio
+import logging
+import argparse
+
+try:
+    import pty
+    import tty
+except ImportError:
+    pty = None
+
+from anthemav.aio import FdTransport
+from anthemav.framer import Framer
+from anthemav.protocols import get_protocol
+from anthemav.transport import SerialConnection
+
+_LOGGER = logging.getLogger(__name__)
+
+# Value patterns for the format tags used in CMDS; other tags take any
+# value.
+FIELD_PATTERNS = {
+    'zone': '[0-9]',
+    'volume': '[-+]?[0-9]+(?:\\.[0-9]+)?',
+    'source': '[0-9a-zA-Z]+',
+    'source_num': '[0-9]+',
+    'step': '[0-9]+(?:\\.[0-9]+)?',
+}
+OTHER_PATTERN = '[^?]+?'
+
+FORMATTER = string.Formatter()
+
+SOURCE_NAMES = ['Blu-ray', 'Cable/Sat', 'Game', 'Media Player', 'TV',
+                'CD', 'Phono', 'Tuner', 'Aux']
+
+VOLUME_MIN = -90
+VOLUME_MAX = 10
+
+
+def compile_grammar(model):
+    """Return [(regex, cmd)] matching the commands of model.
+
+    Commands with more fixed text come first, so 'Z1MUT1' is MuteOn rather
+    than MuteSet.
+    """
+    grammar = []
+    for cmd, template in get_protocol(model).CMDS.items():
+        pattern = ''
+        fixed = 0
+        for literal, field, _, _ in FORMATTER.parse(template.rstrip(';')):
+            pattern += re.escape(literal)
+            fixed += len(literal)
+            if field:
+                pattern += '(?P<{}>{})'.format(
+                    field, FIELD_PATTERNS.get(field, OTHER_PATTERN))
+        grammar.append((fixed, re.compile(pattern + '$'), cmd))
+    grammar.sort(key=lambda item: -item[0])
+    return [(regex, cmd) for _, regex, cmd in grammar]
+
+
+class EmulatedZone():
+    """State of one emulated zone."""
+
+    def __init__(self, zone):
+        self.zone = zone
+        self.power = 1 if zone == '1' else 0
+        self.volume = -35
+        self.mute = 0
+        self.source = '1'
+        self.decoder = '0'
+
+
+class AnthemEmulator():
+    """asyncio TCP server that behaves like an Anthem receiver."""
+
+    def __init__(self, model='x00', host='127.0.0.1', port=0, zones=2,
+                 latency=0, jitter=0, drop_rate=0, event_rate=0, seed=None):
+        self.model = model
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.event_rate = event_rate
+        self.zones = {str(z): EmulatedZone(str(z))
+                      for z in range(1, zones + 1)}
+        self.sources = list(SOURCE_NAMES)
+        self.commands = 0
+        self._x00 = model == 'x00'
+        self._terminator = '\n' if self._x00 else ';'
+        self._grammar = compile_grammar(model)
+        self._random = random.Random(seed)
+        self._clients = []
+        self._server = None
+        self._events = None
+        self._pty = None
+
+    async def start(self):
+        """Start listening and return the (host, port) in use."""
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _EmulatorProtocol(self), self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.event_rate:
+            self._events = asyncio.ensure_future(self._emit_events())
+        return self.host, self.port
+
+    async def start_pty(self):
+        """Answer on a new pseudo terminal and return its device path."""
+        if pty is None:
+            raise OSError('pseudo terminals are not supported here')
+        master, self._pty = pty.openpty()
+        tty.setraw(self._pty)
+        os.set_blocking(master, False)
+        FdTransport(asyncio.get_running_loop(),
+                    SerialConnection(master, lambda: os.close(master)),
+                    _EmulatorProtocol(self))
+        if self.event_rate and self._events is None:
+            self._events = asyncio.ensure_future(self._emit_events())
+        return os.ttyname(self._pty)
+
+    async def stop(self):
+        """Stop listening and disconnect every client."""
+        if self._events is not None:
+            self._events.cancel()
+        for client in list(self._clients):
+            client.transport.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pty is not None:
+            os.close(self._pty)
+            self._pty = None
+
+    def handle(self, command):
+        """Apply a command and return the responses to it."""
+        self.commands += 1
+        for regex, cmd in self._grammar:
+            m = regex.match(command)
+            if m:
+                return self._execute(command, cmd, m.groupdict())
+        return ['Invalid Command' if self._x00 else '!I' + command]
+
+    def _execute(self, command, cmd, values):
+        zone = self.zones.get(values.get('zone'))
+        if 'zone' in values and zone is None:
+            return [self._out_of_range(command)]
+        if cmd.startswith('Power'):
+            if cmd in ('PowerOn', 'PowerOff'):
+                zone.power = 1 if cmd == 'PowerOn' else 0
+            elif cmd == 'PowerSet':
+                return [self._out_of_range(command)]
+            return [self._report(zone, 'power')]
+        if zone is not None and not zone.power:
+            return [self._standby(zone, command)]
+        if zone is None:
+            return [self._system(command, cmd, values)]
+        if cmd == 'ZoneQuery':
+            return [self._report(zone, 'status')]
+        if cmd.startswith('Volume'):
+            if cmd == 'VolumeUp':
+                zone.volume += 1
+            elif cmd == 'VolumeDown':
+                zone.volume -= 1
+            elif cmd == 'VolumeUpBy':
+                zone.volume += int(round(float(values['step'])))
+            elif cmd == 'VolumeDownBy':
+                zone.volume -= int(round(float(values['step'])))
+            elif cmd == 'VolumeSet':
+                zone.volume = int(round(float(values['volume'])))
+            zone.volume = max(VOLUME_MIN, min(VOLUME_MAX, zone.volume))
+            return [self._report(zone, 'volume')]
+        if cmd.startswith('Mute'):
+            if cmd == 'MuteToggle':
+                zone.mute = 1 - zone.mute
+            elif cmd in ('MuteOn', 'MuteOff'):
+                zone.mute = 1 if cmd == 'MuteOn' else 0
+            elif cmd == 'MuteSet':
+                return [self._out_of_range(command)]
+            return [self._report(zone, 'mute')]
+        if cmd in ('SourceQuery', 'SourceSet'):
+            if cmd == 'SourceSet':
+                zone.source = values['source']
+            return [self._report(zone, 'source')]
+        if cmd == 'DecoderQuery':
+            return [self._report(zone, 'decoder')]
+        return ['Invalid Command' if self._x00 else '!I' + command]
+
+    def _out_of_range(self, command):
+        return 'Parameter Out-of-range' if self._x00 else '!R' + command
+
+    def _standby(self, zone, command):
+        """The response of a zone that is switched off."""
+        if not self._x00:
+            return '!Z' + command
+        return 'Main Off' if zone.zone == '1' else 'Zone{} Off'.format(
+            zone.zone)
+
+    def _system(self, command, cmd, values):
+        """Responses to commands that are not for a zone (x10/x20)."""
+        if cmd == 'SourceActiveQuery':
+            return 'ICN{}'.format(len(self.sources))
+        if cmd in ('SourceNameShortQuery', 'SourceNameLongQuery'):
+            number = int(values['source_num'])
+            if not 0 < number <= len(self.sources):
+                return self._out_of_range(command)
+            name = self.sources[number - 1]
+            if cmd == 'SourceNameShortQuery':
+                return 'ISN{:02d}{}'.format(number, name[:8])
+            return 'ILN{:02d}{}'.format(number, name[:16])
+        if cmd == 'ModelQuery':
+            return 'IDQMRX {} US 1.1.9, Apr 16 2014'.format(
+                self.model.replace('x', '7'))
+        if cmd == 'HardwareQuery':
+            return 'IDH1'
+        return 'Invalid Command' if self._x00 else '!I' + command
+
+    def _report(self, zone, field):
+        """The status line for a field of a zone."""
+        z = zone.zone
+        if self._x00:
+            if field == 'status':
+                if z == '1':
+                    return 'P1S{}V{}M{}D{}'.format(
+                        zone.source, zone.volume, zone.mute, zone.decoder)
+                return 'P{}S{}V{}M{}'.format(z, zone.source, zone.volume,
+                                             zone.mute)
+            if field == 'power':
+                return 'P{}P{}'.format(z, zone.power)
+            if field == 'volume':
+                return 'P{}V{}{}'.format(z, 'M' if z == '1' else '',
+                                         zone.volume)
+            if field == 'mute':
+                return 'P{}M{}'.format(z, zone.mute)
+            if field == 'source':
+                return 'P{}S{}'.format(z, zone.source)
+            return 'P{}D{}'.format(z, zone.decoder)
+        mnemonic = {'power': 'POW', 'volume': 'VOL', 'mute': 'MUT',
+                    'source': 'INP'}[field]
+        return 'Z{}{}{}'.format(z, mnemonic, getattr(zone, field))
+
+    def respond(self, client, command):
+        """Schedule the responses to command for client."""
+        responses = self.handle(command)
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            return
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        data = ''.join(r + self._terminator for r in responses).encode()
+        client.send_later(delay, data)
+
+    def broadcast(self, response, exclude=None):
+        """Send an unsolicited status line to every client."""
+        data = (response + self._terminator).encode()
+        for client in self._clients:
+            if client is not exclude:
+                client.send_later(self.latency, data)
+
+    async def _emit_events(self):
+        """Change a zone now and then as the front panel or a remote would."""
+        while True:
+            await asyncio.sleep(self._random.expovariate(self.event_rate))
+            zones = [zone for zone in self.zones.values() if zone.power]
+            if not zones:
+                continue
+            zone = self._random.choice(zones)
+            field = self._random.choice(['volume', 'mute', 'source'])
+            if field == 'volume':
+                zone.volume = max(VOLUME_MIN, min(
+                    VOLUME_MAX, zone.volume + self._random.choice([-1, 1])))
+            elif field == 'mute':
+                zone.mute = 1 - zone.mute
+            else:
+                zone.source = str(self._random.randint(1, 9))
+            self.broadcast(self._report(zone, field))
+
+
+class _EmulatorProtocol(asyncio.Protocol):
+    """One client connection of the emulator."""
+
+    def __init__(self, emulator):
+        self._emulator = emulator
+        self._framer = Framer()
+        self._ready = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._emulator._clients.append(self)
+
+    def connection_lost(self, exc):
+        self._emulator._clients.remove(self)
+
+    def data_received(self, data):
+        for command in self._framer.feed(data):
+            self._emulator.respond(self, command)
+
+    def send_later(self, delay, data):
+        """Write data after delay, never ahead of earlier responses."""
+        loop = asyncio.get_running_loop()
+        self._ready = max(loop.time() + delay, self._ready)
+        loop.call_at(self._ready, self._write, data)
+
+    def _write(self, data):
+        if not self.transport.is_closing():
+            self.transport.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='x00', choices=['x00', 'x10',
+                                                           'x20'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4999)
+    parser.add_argument('--zones', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds before each response')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='random extra seconds, up to this value')
+    parser.add_argument('--drop-rate', type=float, default=0,
+                        help='probability that a response is lost')
+    parser.add_argument('--event-rate', type=float, default=0,
+                        help='unsolicited status changes per second')
+    parser.add_argument('--pty', action='store_true',
+                        help='answer on a pseudo terminal instead of TCP')
+    args = parser.parse_args(argv)
+
+    emulator = AnthemEmulator(args.model, args.host, args.port, args.zones,
+                              args.latency, args.jitter, args.drop_rate,
+                              args.event_rate)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    if args.pty:
+        device = loop.run_until_complete(emulator.start_pty())
+        print('Emulating MRX {} on {}'.format(args.model, device))
+    else:
+        host, port = loop.run_until_complete(emulator.start())
+        print('Emulating MRX {} on {}:{}'.format(args.model, host, port))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(emulator.stop())
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
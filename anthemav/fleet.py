@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+
+import time
+import asyncio
+import logging
+import collections
+import concurrent.futures
+
+from anthemav.aio import AsyncAnthemAV
+from anthemav.health import OPEN, CircuitOpenError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeviceResult(collections.namedtuple('DeviceResult',
+                                          'name result error')):
+    """Outcome of an operation on one receiver of a fleet.
+
+    result is what the operation returned (the status for refresh and
+    commands) and error the exception it failed with, None on success.
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """Return True when the operation succeeded."""
+        return self.error is None
+
+
+class Fleet():
+    """A set of receivers refreshed and commanded concurrently.
+
+    At most concurrency receivers are worked on at once and each gets
+    timeout seconds, so an unreachable bridge costs one timeout in parallel
+    with the rest rather than one per device in turn, and receivers whose
+    circuit breaker is open fail at once with CircuitOpenError. Every
+    operation returns a DeviceResult per receiver, successes and failures
+    together.
+
+    Receivers are AsyncAnthemAV by default; with cls=AnthemAV the blocking
+    calls run on concurrency threads of the fleet's own. A blocking call
+    cannot be interrupted, so one that times out keeps its thread and its
+    slot until it returns.
+    """
+
+    def __init__(self, concurrency=16, timeout=5, cls=AsyncAnthemAV,
+                 **kwargs):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._cls = cls
+        self._kwargs = kwargs
+        self._receivers = collections.OrderedDict()
+        self._zones = {}
+        self._slots = None
+        self._executor = None
+
+    def add(self, host, port, model='x00', zones=('1',), name=None,
+            **kwargs):
+        """Register a receiver and return its name (host:port by default).
+
+        zones are the zones refresh() updates.
+        """
+        name = name or '{}:{}'.format(host, port)
+        if name in self._receivers:
+            raise ValueError('receiver {} is already registered'.format(name))
+        options = dict(self._kwargs, **kwargs)
+        if not self._async:
+            options.setdefault('persistent', True)
+        self._receivers[name] = self._cls(host, port, model=model, **options)
+        self._zones[name] = [str(zone) for zone in zones]
+        return name
+
+    def remove(self, name):
+        """Close and forget a receiver."""
+        self._zones.pop(name)
+        self._receivers.pop(name).close()
+
+    def close(self):
+        """Close every receiver."""
+        for receiver in self._receivers.values():
+            receiver.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def __getitem__(self, name):
+        return self._receivers[name]
+
+    def __iter__(self):
+        return iter(self._receivers)
+
+    def __len__(self):
+        return len(self._receivers)
+
+    @property
+    def _async(self):
+        return issubclass(self._cls, AsyncAnthemAV)
+
+    async def refresh(self, names=None, force=False):
+        """Update the registered zones of receivers.
+
+        Returns {name: DeviceResult} with the status of each receiver.
+        """
+        def refresh(name, receiver):
+            if self._async:
+                return asyncio.gather(*[
+                    receiver.update(zone, force=force)
+                    for zone in self._zones[name]])
+            for zone in self._zones[name]:
+                receiver.update(zone, force=force)
+
+        def stale(name, receiver):
+            return any(receiver._stale_fields(zone, force)
+                       for zone in self._zones[name])
+        return await self._gather(refresh, names, stale)
+
+    async def send_command(self, cmd, zone='1', names=None, **kwargs):
+        """Send a command to a zone of receivers.
+
+        Returns {name: DeviceResult} with the status of each receiver.
+        """
+        return await self._gather(
+            lambda name, receiver: receiver.send_command(cmd, str(zone),
+                                                         **kwargs),
+            names, lambda name, receiver: True)
+
+    async def run(self, func, names=None):
+        """Call func(name, receiver) for receivers, all at once.
+
+        func returns an awaitable for asyncio receivers. A receiver fails
+        with ConnectionError when it cannot be reached, TimeoutError when
+        func takes longer than the timeout and with whatever func raises;
+        its DeviceResult holds the status otherwise.
+        """
+        return await self._gather(func, names,
+                                  lambda name, receiver: False)
+
+    async def _gather(self, func, names, expect_reply):
+        """Run func on receivers; expect_reply(name, receiver) tells
+        whether the receiver must have answered."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        names = list(self._receivers) if names is None else list(names)
+        results = await asyncio.gather(*[
+            self._run(name, func, expect_reply) for name in names])
+        return collections.OrderedDict(zip(names, results))
+
+    async def _run(self, name, func, expect_reply):
+        receiver = self._receivers[name]
+        await self._slots.acquire()
+        call = asyncio.ensure_future(self._call(
+            name, receiver, func, expect_reply(name, receiver)))
+        call.add_done_callback(self._release)
+        try:
+            await asyncio.wait_for(asyncio.shield(call), self.timeout)
+        except asyncio.TimeoutError:
+            if self._async:
+                call.cancel()
+            error = TimeoutError('no response within {} second(s)'.format(
+                self.timeout))
+        except Exception as err:
+            error = err
+        else:
+            return DeviceResult(name, receiver.status, None)
+        _LOGGER.warning("Receiver %s failed: %r", name, error)
+        return DeviceResult(name, None, error)
+
+    def _release(self, call):
+        """Free the slot of a call once it has ended."""
+        self._slots.release()
+        if not call.cancelled():
+            # Retrieved so that calls that timed out are not reported.
+            call.exception()
+
+    async def _call(self, name, receiver, func, expect_reply):
+        if receiver.breaker.state == OPEN:
+            raise CircuitOpenError('circuit to {} is open'.format(name))
+        start = time.time()
+        if self._async:
+            connected = await receiver.connect()
+        else:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    self.concurrency, thread_name_prefix='anthemav-fleet')
+            loop = asyncio.get_running_loop()
+            connected = await loop.run_in_executor(self._executor,
+                                                   receiver.connect)
+        if not connected:
+            receiver.breaker.record(False)
+            raise ConnectionError('unable to connect to ' + name)
+        if self._async:
+            await func(name, receiver)
+        else:
+            await loop.run_in_executor(self._executor, func, name, receiver)
+        if expect_reply and receiver._lastupdatetime < start:
+            raise TimeoutError('no response from ' + name)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+import re
+
+# Responses are terminated by ';' (x10/x20) or a line ending (x00).
+TERMINATORS = b';\r\n'
+
+
+class Framer():
+    """Split a received byte stream into complete responses.
+
+    Bytes are accumulated in one bytearray that is reused for the life of
+    the connection; a partial response stays buffered until its terminator
+    arrives, and any number of responses in one read are split in a single
+    pass.
+    """
+
+    def __init__(self, terminators=TERMINATORS, max_size=4096):
+        self._terminators = terminators
+        self._frame = re.compile(b'[^' + re.escape(terminators) + b']+')
+        self._max_size = max_size
+        self._buffer = bytearray()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def clear(self):
+        """Discard any partial response, e.g. after a reconnect."""
+        del self._buffer[:]
+
+    def feed(self, data):
+        """Add received bytes and return the completed responses."""
+        buffer = self._buffer
+        start = len(buffer)
+        buffer += data
+        end = -1
+        for terminator in self._terminators:
+            end = max(end, buffer.rfind(terminator, start))
+        if end < 0:
+            if len(buffer) > self._max_size:
+                # No terminator in sight, the stream is not a protocol one.
+                del buffer[:]
+            return []
+        frames = self._frame.findall(buffer, 0, end)
+        del buffer[:end + 1]
+        return [frame.decode('ascii', 'replace') for frame in frames]
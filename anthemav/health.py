@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import time
+import logging
+import threading
+
+_LOGGER = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of contacting a receiver whose circuit is open."""
+
+
+class CircuitBreaker():
+    """Health of one receiver.
+
+    After threshold consecutive failures the circuit opens and calls are
+    refused without touching the network. Once cooldown seconds have
+    passed it is half open: a single call is let through as a probe, and
+    its outcome closes the circuit or opens it for another cooldown.
+    """
+
+    def __init__(self, threshold=3, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened = None
+        self._probing = False
+
+    @property
+    def state(self):
+        """Return CLOSED, OPEN or HALF_OPEN."""
+        if self._opened is None:
+            return CLOSED
+        if time.monotonic() - self._opened < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    @property
+    def failures(self):
+        """Return the number of consecutive failures."""
+        return self._failures
+
+    def allow(self):
+        """Return True when a call may go ahead.
+
+        In the half open state only the first caller is allowed, as the
+        probe.
+        """
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, success):
+        """Record the outcome of an allowed call."""
+        with self._lock:
+            self._probing = False
+            if success:
+                self._failures = 0
+                self._opened = None
+                return
+            self._failures += 1
+            if self._failures >= self.threshold:
+                if self._opened is None:
+                    _LOGGER.warning("Circuit opened after %s failures",
+                                    self._failures)
+                self._opened = time.monotonic()
+
+    def reset(self):
+        """Close the circuit."""
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._probing = False
+
+
+def get_breaker(host, port, **kwargs):
+    """Return a circuit breaker shared by every caller for host:port.
+
+    This is the default breaker of the clients, so every client of one
+    receiver shares it. Pass a CircuitBreaker to a client to give it one
+    of its own.
+    """
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get((host, port))
+        if breaker is None:
+            breaker = _BREAKERS[(host, port)] = CircuitBreaker(**kwargs)
+    return breaker
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+import threading
+
+from anthemav.anthemav import AnthemAV
+from anthemav.state import ZoneState
+
+_HUBS = {}
+# Model and options each shared receiver was created with.
+_OPTIONS = {}
+_HUBS_LOCK = threading.Lock()
+
+
+def get_hub(host, port, model='x00', cls=AnthemAV, **kwargs):
+    """Return the receiver object shared by every zone of host:port.
+
+    The first call creates it (with a persistent connection for
+    AnthemAV), later calls for the same host and port return the same
+    object, so the number of connections does not grow with the number
+    of zones in use. cls may be AsyncAnthemAV for asyncio callers.
+
+    Raises ValueError when the receiver is already shared with another
+    model or other options.
+    """
+    key = (cls, host, port)
+    options = dict(kwargs, model=model)
+    with _HUBS_LOCK:
+        hub = _HUBS.get(key)
+        if hub is None:
+            if cls is AnthemAV:
+                kwargs.setdefault('persistent', True)
+            hub = _HUBS[key] = cls(host, port, model=model, **kwargs)
+            _OPTIONS[key] = options
+        elif _OPTIONS[key] != options:
+            raise ValueError('{}:{} is already shared with {}'.format(
+                host, port, ', '.join('{}={!r}'.format(*item) for item in
+                                      sorted(_OPTIONS[key].items()))))
+    return hub
+
+
+def get_zone(host, port, zone, model='x00', cls=AnthemAV, **kwargs):
+    """Return a view of one zone of the shared receiver for host:port."""
+    return AnthemZone(get_hub(host, port, model=model, cls=cls, **kwargs),
+                      str(zone))
+
+
+def close_hubs():
+    """Close and forget every shared receiver."""
+    with _HUBS_LOCK:
+        hubs = list(_HUBS.values())
+        _HUBS.clear()
+        _OPTIONS.clear()
+    for hub in hubs:
+        hub.close()
+
+
+class AnthemZone():
+    """A zone of a shared receiver.
+
+    The view holds no connection or state of its own: status is read from
+    the hub, which keeps the ZoneState of every zone, and commands are
+    sent through the hub with the zone filled in. With an AsyncAnthemAV
+    hub the command methods return awaitables.
+    """
+
+    def __init__(self, hub, zone):
+        self.hub = hub
+        self.zone = zone
+
+    @property
+    def status(self):
+        """Return the ZoneState of this zone."""
+        state = self.hub.status.get(self.zone)
+        return state if state is not None else ZoneState(self.zone)
+
+    @property
+    def available(self):
+        """Return False while the receiver is refusing commands."""
+        return self.hub.available
+
+    @property
+    def power(self):
+        """Return the power of this zone."""
+        return self.status.power
+
+    @property
+    def volume(self):
+        """Return the volume of this zone."""
+        return self.status.volume
+
+    @property
+    def mute(self):
+        """Return the mute of this zone."""
+        return self.status.mute
+
+    @property
+    def source(self):
+        """Return the source of this zone."""
+        return self.status.source
+
+    @property
+    def decoder(self):
+        """Return the decoder of this zone."""
+        return self.status.decoder
+
+    @property
+    def extras(self):
+        """Return the other fields reported for this zone, as reported."""
+        return self.status.extras
+
+    def subscribe(self, callback):
+        """Register callback(field, value) for changes in this zone."""
+        def zone_callback(zone, field, value):
+            if zone == self.zone:
+                callback(field, value)
+        return self.hub.subscribe(zone_callback)
+
+    def update(self, force=False):
+        """Retrieve the latest data for this zone."""
+        return self.hub.update(self.zone, force=force)
+
+    def send_command(self, cmd, **kwargs):
+        """Send a command to this zone."""
+        return self.hub.send_command(cmd, self.zone, **kwargs)
+
+    def power_set(self, power):
+        """Power commands."""
+        return self.hub.power_set(power, self.zone)
+
+    def volume_set(self, volume):
+        """Volume commands."""
+        return self.hub.volume_set(volume, self.zone)
+
+    def mute_set(self, mute):
+        """Mute commands."""
+        return self.hub.mute_set(mute, self.zone)
+
+    def source_set(self, source):
+        """Source commands, using the source number."""
+        return self.hub.source_set(source, self.zone)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return '{}{{{}}}'.format(name, ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in sorted(labels.items())))
+
+
+class Metrics():
+    """Counters, gauges and histograms collected by the clients.
+
+    Pass one instance to every AnthemAV of a fleet; series are labelled
+    with the receiver host, so slow receivers stand out. Export with
+    snapshot() or prometheus().
+    """
+
+    enabled = True
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter."""
+        key = (name, _key(name, labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        """Set a gauge."""
+        with self._lock:
+            self._gauges[(name, _key(name, labels))] = value
+
+    def observe(self, name, value, **labels):
+        """Record a value in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [
+                    [0] * (len(self._buckets) + 1), 0, 0]
+            histogram[0][bisect.bisect_left(self._buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self):
+        """Return every series as a dict keyed by name and labels."""
+        with self._lock:
+            result = {
+                'counters': {key: value
+                             for (_, key), value in self._counters.items()},
+                'gauges': {key: value
+                           for (_, key), value in self._gauges.items()},
+                'histograms': {},
+            }
+            for (name, labels), (counts, total, count) in \
+                    self._histograms.items():
+                result['histograms'][_key(name, dict(labels))] = {
+                    'buckets': dict(zip(self._buckets + ('+Inf',),
+                                        counts)),
+                    'sum': total,
+                    'count': count,
+                }
+        return result
+
+    def prometheus(self):
+        """Return every series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self._counters),
+                                 ('gauge', self._gauges)):
+                typed = set()
+                for (name, key), value in sorted(series.items()):
+                    if name not in typed:
+                        typed.add(name)
+                        lines.append('# TYPE {} {}'.format(name, kind))
+                    lines.append('{} {}'.format(key, value))
+            typed = set()
+            for (name, labels), (counts, total, count) in sorted(
+                    self._histograms.items(), key=lambda item: str(item[0])):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append('# TYPE {} histogram'.format(name))
+                labels = dict(labels)
+                cumulative = 0
+                for bound, bucket in zip(self._buckets + ('+Inf',), counts):
+                    cumulative += bucket
+                    lines.append('{} {}'.format(
+                        _key(name + '_bucket', dict(labels, le=bound)),
+                        cumulative))
+                lines.append('{} {}'.format(_key(name + '_sum', labels),
+                                            total))
+                lines.append('{} {}'.format(_key(name + '_count', labels),
+                                            count))
+        return '\n'.join(lines) + '\n'
+
+
+class NullMetrics():
+    """Metrics that are not collected; the default of every client."""
+
+    enabled = False
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def gauge(self, name, value, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def snapshot(self):
+        return {'counters': {}, 'gauges': {}, 'histograms': {}}
+
+    def prometheus(self):
+        return ''
+
+
+NULL_METRICS = NullMetrics()
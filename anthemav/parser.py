@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+import re
+
+from anthemav.protocols import get_protocol
+
+# Regexes in the protocol tables are of the form
+# '<lead>(?P<zone>.).*?<mnemonic>(?P<field>...)', e.g. 'Z(?P<zone>.).*?POW'.
+TABLE_REGEX = re.compile(r'(?P<lead>[A-Za-z])\(\?P<zone>\.\)\.\*\?'
+                         r'(?P<mnemonic>[A-Za-z]+)\(\?P<')
+
+# Leading mnemonic of a command template: after the zone for zone commands
+# ('Z{zone}VOL{volume};', 'Z1ALM?;'), the fixed text before the first tag
+# otherwise ('ILN{source_num}?;', 'IDQ?;').
+ZONE_TEMPLATE = re.compile(
+    r'[PZ](?:\{zone\}|[0-9])(?P<mnemonic>[A-Z]+|[a-z]?)')
+OTHER_TEMPLATE = re.compile(r'(?P<mnemonic>[^{?;]*)')
+
+# Commands answered with the status line of another mnemonic: volume steps
+# report the new volume, the x00 mute toggle the new mute state.
+REPLY_MNEMONICS = {
+    'VUP': 'VOL',
+    'VDN': 'VOL',
+    'VU': 'V',
+    'VD': 'V',
+    'MT': 'M',
+}
+
+# x00 error responses, which do not repeat the command they answer.
+ERROR_RESPONSES = ('Invalid Command', 'Parameter Out-of-range', 'Unit Off')
+
+# x10/x20 input table responses: 'ICN9', 'ISN01Blu-ray', 'ILN01Blu-ray'.
+SOURCE_COUNT = re.compile(r'ICN(?P<count>[0-9]+)$')
+SOURCE_NAME = re.compile(r'I[SL]N(?P<number>[0-9]{2})(?P<name>.*)$')
+
+
+def is_error(response):
+    """Return True for a reply that refuses a command.
+
+    x10/x20 prefix the command with '!' and a reason, x00 replies with
+    one of ERROR_RESPONSES.
+    """
+    return response[:1] == '!' or response in ERROR_RESPONSES
+
+
+class ResponseParser():
+    """The response tables of one model compiled for dispatch.
+
+    Each table regex is keyed on the response lead ('P' or 'Z') and the
+    command mnemonic that follows the zone ('POW', 'MUT', 'VM', ...), so a
+    response costs one dictionary lookup plus a single match. Responses
+    that carry more fields than their leading mnemonic (the x00 zone
+    status 'P1S3V-35M0D0') are checked against the rest of the table, and
+    responses that cannot be keyed against the regexes of their lead.
+    Error replies ('!R', '!I', '!E' and the command they reject) report
+    no status and are not parsed.
+
+    The mnemonics of the command table are compiled as well, to match
+    replies to the commands they answer (see command_key).
+    """
+
+    def __init__(self, model):
+        protocol = get_protocol(model)
+        self.model = model
+        self._dispatch = {}
+        self._lead_regex = {}
+        for pattern in protocol.REGEX:
+            regex = re.compile(pattern)
+            m = TABLE_REGEX.match(pattern)
+            if m:
+                key = (m.group('lead'), m.group('mnemonic'))
+                self._dispatch.setdefault(key, []).append(regex)
+                self._lead_regex.setdefault(m.group('lead'), []).append(regex)
+        mnemonics = sorted({key[1] for key in self._dispatch},
+                           key=len, reverse=True)
+        self._key = re.compile(
+            '.({})'.format('|'.join(mnemonics))) if mnemonics else None
+
+        zone_mnemonics = set()
+        other_mnemonics = set()
+        for template in protocol.CMDS.values():
+            m = ZONE_TEMPLATE.match(template)
+            if m:
+                zone_mnemonics.add(m.group('mnemonic'))
+            else:
+                other_mnemonics.add(OTHER_TEMPLATE.match(template).group(
+                    'mnemonic'))
+        self._zone_mnemonic = self._mnemonic_regex(zone_mnemonics)
+        self._other_mnemonic = self._mnemonic_regex(other_mnemonics)
+
+        self._replace = {}
+        self._replace_any = []
+        for pattern, replacement in protocol.RESPONSE_REPLACE:
+            item = (re.compile(pattern), replacement)
+            if pattern[:1].isalnum() or pattern[:1] == '!':
+                self._replace.setdefault(pattern[0], []).append(item)
+            else:
+                self._replace_any.append(item)
+
+    def standardise(self, response):
+        """Convert a standby response into a standard response."""
+        for regex, replacement in (self._replace.get(response[:1], []) +
+                                   self._replace_any):
+            m = regex.search(response)
+            if m:
+                return replacement.format(**m.groupdict())
+        return response
+
+    def parse(self, response):
+        """Return the named groups of every table regex matching response."""
+        response = self.standardise(response)
+        if response[:1] == '!':
+            return []
+        if self._key is not None:
+            k = self._key.match(response, 1)
+            if k:
+                candidates = self._dispatch.get(
+                    (response[0], k.group(1)), ())
+                for regex in candidates:
+                    m = regex.match(response)
+                    if m:
+                        if m.end() == len(response):
+                            return [m.groupdict()]
+                        return [m.groupdict()] + [
+                            other.groupdict() for other in
+                            self._search(self._lead_regex[response[0]],
+                                         response, regex)]
+        return [m.groupdict() for m in
+                self._search(self._lead_regex.get(response[:1], ()),
+                             response)]
+
+    def dispatch_pattern(self, response):
+        """Return the table regex response is dispatched to, None if unkeyed.
+
+        Used to label responses that parse() could not match.
+        """
+        response = self.standardise(response)
+        if self._key is not None:
+            k = self._key.match(response, 1)
+            if k:
+                candidates = self._dispatch.get((response[0], k.group(1)))
+                if candidates:
+                    return candidates[0].pattern
+
+    @staticmethod
+    def _mnemonic_regex(mnemonics):
+        """Match the longest of mnemonics, else a run of capitals."""
+        mnemonics = sorted(filter(None, mnemonics), key=len, reverse=True)
+        return re.compile('|'.join([re.escape(m) for m in mnemonics] +
+                                   ['[A-Z]*']))
+
+    def split(self, message):
+        """Return (zone, mnemonic, rest) of a command or response.
+
+        zone is None for messages that are not for a zone ('ICN?'). The
+        mnemonic is the longest one of the command table the message
+        starts with, so 'Z1VOL-35' is ('1', 'VOL', '-35') and
+        'ILN01Blu-ray' is (None, 'ILN', '01Blu-ray').
+        """
+        if message[:1] in ('P', 'Z') and message[1:2].isdigit():
+            m = self._zone_mnemonic.match(message, 2)
+            return message[1], m.group(), message[m.end():]
+        m = self._other_mnemonic.match(message)
+        return None, m.group(), message[m.end():]
+
+    def command_key(self, message):
+        """Return the (zone, mnemonic, argument) a command refers to.
+
+        The argument is what a query asks about ('01' in 'ILN01?', '5' in
+        'Z1LEV5?'); set commands have none. A reply answers a command when
+        their zone and mnemonic are equal and the reply continues with the
+        argument (see answers). Volume steps and the x00 mute toggle key as
+        the status line they are answered with, and the x00 zone status
+        query ('P1?') as '?'. x10/x20 error responses ('!Z', '!I', '!R'
+        and '!E' followed by the command) key as the command they echo.
+        """
+        if message[:1] == '!':
+            message = message[2:].lstrip()
+        zone, mnemonic, rest = self.split(message)
+        if zone is not None and not mnemonic:
+            mnemonic = '?'
+        return (zone, REPLY_MNEMONICS.get(mnemonic, mnemonic),
+                rest[:-1] if rest[-1:] == '?' else '')
+
+    def answers(self, response, key):
+        """Return True if response (not an error) answers command key."""
+        zone, mnemonic, rest = self.split(response)
+        return ((zone, mnemonic) == key[:2] and rest.startswith(key[2]) or
+                key == (zone, '?', ''))
+
+    @staticmethod
+    def _search(regexes, response, skip=None):
+        for regex in regexes:
+            if regex is not skip:
+                m = regex.search(response)
+                if m:
+                    yield m
+
+
+_PARSERS = {}
+
+
+def get_parser(model):
+    """Return the compiled ResponseParser for model, building it once."""
+    parser = _PARSERS.get(model)
+    if parser is None:
+        parser = _PARSERS[model] = ResponseParser(model)
+    return parser
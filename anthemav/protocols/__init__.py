@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+"""Command and response tables of each Anthem model family.
+
+The modules are generated from the vendor spreadsheets by
+tools/gen_protocol.py; edit the generator, not the modules.
+"""
+import importlib
+
+# Model families with a generated module.
+MODELS = ('x00', 'x10', 'x20')
+
+_PROTOCOLS = {}
+
+
+def get_protocol(model):
+    """Return the protocol module of model; raises KeyError if unknown."""
+    protocol = _PROTOCOLS.get(model)
+    if protocol is None:
+        if model not in MODELS:
+            raise KeyError(model)
+        protocol = _PROTOCOLS[model] = importlib.import_module(
+            '{}.{}'.format(__name__, model))
+    return protocol
+
+
+def decode(model, field, value):
+    """Return the meaning of a value of a field, or value if not listed."""
+    return get_protocol(model).DECODERS.get(field, {}).get(value, value)
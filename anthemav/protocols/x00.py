@@ -0,0 +1,118 @@
+# Generated by tools/gen_protocol.py from
+# "_anthemav api/anthemMRX_RS-232.xls". Do not edit.
+"""Anthem MRX x00 protocol tables."""
+
+MODEL = 'x00'
+
+# Commands using named format tags.
+CMDS = {
+    'PowerOn': 'P{zone}P1;',
+    'PowerOff': 'P{zone}P0;',
+    'VolumeUp': 'P{zone}VU;',
+    'VolumeDown': 'P{zone}VD;',
+    'MuteOn': 'P{zone}M1;',
+    'MuteOff': 'P{zone}M0;',
+    'DecoderQuery': 'P{zone}D?;',
+    'DynamicRangeQuery': 'P{zone}DV?;',
+    'FactoryReset': 'SfLF;',
+    'FrontPanelBrightness': 'FP{value};',
+    'MediaMenu': 'P{zone}G{value};',
+    'Message': 'P{zone}z{line}{message};',
+    'ModelQuery': '?;',
+    'MuteQuery': 'P{zone}M?;',
+    'MuteSet': 'P{zone}M{value};',
+    'MuteToggle': 'P{zone}MT;',
+    'PowerQuery': 'P{zone}P?;',
+    'PowerSet': 'P{zone}P{value};',
+    'PresetAM': 'TAP{value};',
+    'PresetFM': 'TFP{value};',
+    'ProcessingModeQuery': 'P{zone}Q?;',
+    'RestoreSettings': 'SfLU;',
+    'SaveSettings': 'SfSU;',
+    'SeekDown': 'T-;',
+    'SeekUp': 'T+;',
+    'SetupMenu': 'P{zone}U{value};',
+    'SixChannelModeQuery': 'P{zone}EY?;',
+    'Sleep': 'P{zone}Z{value};',
+    'SourceAnalogInput': 'SCU{source}{value};',
+    'SourceAudioInput': 'SCA{source}{value};',
+    'SourceBassManager': 'SCB{source}{value};',
+    'SourceCinemaReference': 'SCK{source}{value};',
+    'SourceCompositeInput': 'SCC{source}{value};',
+    'SourceDolbyVolume': 'SCE{source}{value};',
+    'SourceQuery': 'P{zone}S?;',
+    'SourceRename': 'SN{source}{name};',
+    'SourceRoomEQ': 'SCQ{source}{value};',
+    'SourceSet': 'P{zone}S{source};',
+    'SourceVideoConfig': 'SCF{source}{value};',
+    'SourceVideoInput': 'SCV{source}{value};',
+    'StereoModeQuery': 'P{zone}MS?;',
+    'StereoModeSet': 'P{zone}MS{source}{value};',
+    'SurroundModeQuery': 'P{zone}MM?;',
+    'SurroundModeSet': 'P{zone}MM{source}{value};',
+    'Trigger': 't1T{value};',
+    'TriggerControl': 't1TC{value};',
+    'TriggerDelay': 't1TD{value};',
+    'TuneDownAM': 'TATD;',
+    'TuneDownFM': 'TFTD;',
+    'TuneUpAM': 'TATU;',
+    'TuneUpFM': 'TFTU;',
+    'TunerAM': 'TAT{value};',
+    'TunerFM': 'TFT{value};',
+    'TunerStationQuery': 'TT?;',
+    'VolumeQuery': 'P{zone}V?;',
+    'VolumeSet': 'P{zone}V{volume};',
+    'ZoneQuery': 'P{zone}?;',
+}
+
+# Regex matches with named groups, checked against every response.
+REGEX = [
+    'P(?P<zone>.).*?P(?P<power>[0-1])',
+    'P(?P<zone>.).*?S(?P<source>[a-zA-Z0-9])',
+    'P(?P<zone>.).*?V(?P<volume>-[0-9][0-9]|[0-9][0-9]|-[0-9]|[0-9])',
+    'P(?P<zone>.).*?M(?P<mute>[0-1])',
+    'P(?P<zone>.).*?D(?P<decoder>[a-zA-Z0-9])',
+    'P(?P<zone>.).*?VM(?P<volume>-[0-9][0-9]|[0-9][0-9]|-[0-9]|[0-9])',
+    'P(?P<zone>.).*?MS(?P<stereo_mode>.+)',
+    'P(?P<zone>.).*?MM(?P<surround_mode>.+)',
+    'P(?P<zone>.).*?EX(?P<six_channel_mode>.+)',
+    'P(?P<zone>.).*?DV(?P<dynamic_range>.+)',
+]
+
+# [regex, standard response] for the responses of a zone that is off.
+RESPONSE_REPLACE = [
+    ['Main.Off', 'P1P0'],
+    ['Zone2.Off', 'P2P0'],
+]
+
+# Default source list.
+SOURCES = {
+    '1': 'BDP',
+    '2': 'CD',
+    '3': 'TV',
+    '4': 'SAT',
+    '5': 'GAME',
+    '6': 'AUX',
+    '7': 'MEDIA',
+    '8': 'AM/FM',
+    '9': 'iPod',
+    'c': 'current main zone source',
+    'd': 'USB',
+    'e': 'Internet Radio',
+}
+
+# Meaning of the values of a field, by field.
+DECODERS = {
+    'decoder': {
+        '0': 'no signal',
+        '1': '1-channel',
+        '2': '2-channel',
+        '3': 'Dolby Digital Surround (2.0)',
+        '4': 'Multi Channel PCM',
+        '5': 'Dolby Digital (5.1)',
+        '6': 'Dolby Digital Surround EX',
+        '7': 'DTS 5.1',
+        '8': 'DTS-ES',
+        '9': '7.1-channel',
+    },
+}
@@ -0,0 +1,230 @@
+# Generated by tools/gen_protocol.py from
+# "_anthemav api/MRX x10 IP RS-232.xls". Do not edit.
+"""Anthem MRX x10 protocol tables."""
+
+MODEL = 'x10'
+
+# Commands using named format tags.
+CMDS = {
+    'PowerOn': 'Z{zone}POW1;',
+    'PowerOff': 'Z{zone}POW0;',
+    'VolumeUp': 'Z{zone}VUP1;',
+    'VolumeDown': 'Z{zone}VDN1;',
+    'MuteOn': 'Z{zone}MUT1;',
+    'MuteOff': 'Z{zone}MUT0;',
+    'MuteToggle': 'Z{zone}MUTt;',
+    'AudioBitRateQuery': 'Z1BRT?;',
+    'AudioChannelsQuery': 'Z1AIC?;',
+    'AudioFormatQuery': 'Z1AIF?;',
+    'AudioNameQuery': 'Z1AIN?;',
+    'AudioRateNameQuery': 'Z1AIR?;',
+    'AudioSampleRateQuery': 'Z1SRT?;',
+    'BalanceLeft': 'Z1BLT{value};',
+    'BalanceQuery': 'Z1BAL?;',
+    'BalanceRight': 'Z1BRT{value};',
+    'BalanceSet': 'Z1BAL{value};',
+    'BuildDateQuery': 'IDB?;',
+    'CenterWidthDown': 'Z1WCD;',
+    'CenterWidthQuery': 'Z1WST?;',
+    'CenterWidthSet': 'Z1WST{value};',
+    'CenterWidthUp': 'Z1WCU;',
+    'DialogNormalizationQuery': 'Z1DIA?;',
+    'DimensionDown': 'Z1DID;',
+    'DimensionQuery': 'Z1DST?;',
+    'DimensionSet': 'Z1DST{value};',
+    'DimensionUp': 'Z1DIU;',
+    'DolbyVolumeLevelerQuery': 'SDVL{input}?;',
+    'DolbyVolumeLevelerSet': 'SDVL{input}{value};',
+    'DolbyVolumeQuery': 'SDVS{input}?;',
+    'DolbyVolumeSet': 'SDVS{input}{value};',
+    'DynamicRangeQuery': 'Z1DYN?;',
+    'DynamicRangeSet': 'Z1DYN{value};',
+    'FrontPanelBrightnessQuery': 'FPB?;',
+    'FrontPanelBrightnessSet': 'FPB{value};',
+    'HardwareQuery': 'IDH?;',
+    'LevelDown': 'Z1LDN{channel}{step};',
+    'LevelQuery': 'Z1LEV{channel}?;',
+    'LevelSet': 'Z1LEV{channel}{value};',
+    'LevelUp': 'Z1LUP{channel}{step};',
+    'LipSyncQuery': 'SLIP{input}?;',
+    'LipSyncSet': 'SLIP{input}{value};',
+    'ListeningModeQuery': 'Z1ALM?;',
+    'ListeningModeSet': 'Z1ALM{value};',
+    'MacAddressQuery': 'IDN?;',
+    'Message': 'Z1MSG{line}{message};',
+    'ModelNameQuery': 'IDM?;',
+    'ModelQuery': 'IDQ?;',
+    'MuteQuery': 'Z{zone}MUT?;',
+    'MuteSet': 'Z{zone}MUT{value};',
+    'PanoramaQuery': 'Z1PST?;',
+    'PanoramaSet': 'Z1PST{value};',
+    'PowerQuery': 'Z{zone}POW?;',
+    'PowerSet': 'Z{zone}POW{value};',
+    'PresetAssignQuery': 'T1PSA?;',
+    'PresetAssignSet': 'T1PSA{preset};',
+    'PresetDown': 'T1PDN;',
+    'PresetRemove': 'T1PRM{preset};',
+    'PresetSelect': 'T1PSL{preset};',
+    'PresetUp': 'T1PUP;',
+    'RegionQuery': 'IDR?;',
+    'RoomCorrectionQuery': 'Z{zone}ARC?;',
+    'RoomCorrectionSet': 'Z{zone}ARC{value};',
+    'SeekDown': 'T1KDN;',
+    'SeekUp': 'T1KUP;',
+    'SetupMenuQuery': 'Z1SMD?;',
+    'SetupMenuSet': 'Z1SMD{value};',
+    'SimulateIR': 'Z{zone}SIM{key};',
+    'SoftwareVersionQuery': 'IDS?;',
+    'SourceActiveQuery': 'ICN?;',
+    'SourceNameLongQuery': 'ILN{source_num}?;',
+    'SourceNameShortQuery': 'ISN{source_num}?;',
+    'SourceQuery': 'Z{zone}INP?;',
+    'SourceSet': 'Z{zone}INP{source};',
+    'StandbyIPControlQuery': 'SIP?;',
+    'StandbyIPControlSet': 'SIP{value};',
+    'StatusReportsQuery': 'ECH?;',
+    'StatusReportsSet': 'ECH{value};',
+    'ToneDown': 'Z1TDN{tone}{step};',
+    'ToneQuery': 'Z1TON{tone}?;',
+    'ToneSet': 'Z1TON{tone}{value};',
+    'ToneUp': 'Z1TUP{tone}{step};',
+    'TriggerControlQuery': 'R{trigger}CTL?;',
+    'TriggerControlSet': 'R{trigger}CTL{value};',
+    'TriggerQuery': 'R{trigger}SET?;',
+    'TriggerSet': 'R{trigger}SET{value};',
+    'TuneDown': 'T1TDN;',
+    'TuneUp': 'T1TUP;',
+    'TunerAM': 'T1AMS{value};',
+    'TunerFM': 'T1FMS{value};',
+    'TunerStationQuery': 'T1STA?;',
+    'TunerStatusQuery': 'Z{zone}TBS?;',
+    'VideoHeightQuery': 'Z1IRV?;',
+    'VideoOutputConfigQuery': 'HOC1?;',
+    'VideoOutputConfigSet': 'HOC1{hdmi1_depth}{hdmi2_depth}{output}{scaling};',
+    'VideoResolutionQuery': 'Z1VIR?;',
+    'VideoWidthQuery': 'Z1IRH?;',
+    'VolumeDownBy': 'Z{zone}VDN{step};',
+    'VolumeQuery': 'Z{zone}VOL?;',
+    'VolumeSet': 'Z{zone}VOL{volume};',
+    'VolumeUpBy': 'Z{zone}VUP{step};',
+}
+
+# Regex matches with named groups, checked against every response.
+REGEX = [
+    'Z(?P<zone>.).*?POW(?P<power>.)',
+    'Z(?P<zone>.).*?INP(?P<source>.*)',
+    'Z(?P<zone>.).*?VOL(?P<volume>[-+]?[0-9]+(?:\\.[0-9]+)?)',
+    'Z(?P<zone>.).*?MUT(?P<mute>.)',
+    'Z(?P<zone>.).*?ARC(?P<room_correction>.+)',
+    'Z(?P<zone>.).*?BAL(?P<balance>.+)',
+    'Z(?P<zone>.).*?LEV(?P<level>.+)',
+    'Z(?P<zone>.).*?TON(?P<tone>.+)',
+    'Z(?P<zone>.).*?TBS(?P<tuner_status>.+)',
+    'Z(?P<zone>.).*?SMD(?P<setup_menu>.+)',
+    'Z(?P<zone>.).*?VIR(?P<video_resolution>.+)',
+    'Z(?P<zone>.).*?IRH(?P<video_width>.+)',
+    'Z(?P<zone>.).*?IRV(?P<video_height>.+)',
+    'Z(?P<zone>.).*?AIC(?P<audio_channels>.+)',
+    'Z(?P<zone>.).*?AIF(?P<audio_format>.+)',
+    'Z(?P<zone>.).*?BRT(?P<audio_bit_rate>.+)',
+    'Z(?P<zone>.).*?SRT(?P<audio_sample_rate>.+)',
+    'Z(?P<zone>.).*?AIN(?P<audio_name>.+)',
+    'Z(?P<zone>.).*?AIR(?P<audio_rate_name>.+)',
+    'Z(?P<zone>.).*?ALM(?P<listening_mode>.+)',
+    'Z(?P<zone>.).*?WST(?P<center_width>.+)',
+    'Z(?P<zone>.).*?DST(?P<dimension>.+)',
+    'Z(?P<zone>.).*?PST(?P<panorama>.+)',
+    'Z(?P<zone>.).*?DYN(?P<dynamic_range>.+)',
+]
+
+# [regex, standard response] for the responses of a zone that is off.
+RESPONSE_REPLACE = [
+    ['!Z.*?Z(?P<zone>.)', 'Z{zone}POW0'],
+]
+
+# Default source list.
+SOURCES = {}
+
+# Meaning of the values of a field, by field.
+DECODERS = {
+    'power': {
+        '0': 'off',
+        '1': 'on',
+    },
+    'mute': {
+        '0': 'unmute',
+        '1': 'mute',
+        't': 'toggle',
+    },
+    'level': {
+        '0': 'subs',
+        '1': 'fronts',
+        '2': 'center',
+        '3': 'surrounds',
+        '4': 'backs',
+        '5': 'LFE',
+    },
+    'setup_menu': {
+        '0': 'close',
+        '1': 'open',
+        't': 'toggle',
+    },
+    'video_resolution': {
+        '0': 'no input',
+        '1': 'other',
+        '2': '1080p60',
+        '3': '1080p50',
+        '4': '1080p24',
+        '5': '1080i60',
+        '6': '1080i50',
+        '7': '720p60',
+        '8': '720p50',
+        '9': '576p50',
+        '10': '576i50',
+        '11': '480p60',
+        '12': '480i60',
+        '13': '3D',
+        '14': '4k',
+    },
+    'audio_channels': {
+        '0': 'no input',
+        '1': 'other',
+        '2': 'mono (center channel only)',
+        '3': '2-channel',
+        '4': '5.1-channel',
+        '5': '6.1-channel',
+        '6': '7.1-channel',
+    },
+    'audio_format': {
+        '0': 'no input',
+        '1': 'Analog',
+        '2': 'PCM',
+        '3': 'Dolby',
+        '4': 'DSD',
+        '5': 'DTS',
+    },
+    'listening_mode': {
+        '00': 'None',
+        '01': 'AnthemLogic-Movie',
+        '02': 'AnthemLogic-Music',
+        '03': 'PLIIx Movie',
+        '04': 'PLIIx Music',
+        '05': 'Neo:6 Cinema',
+        '06': 'Neo:6 Music',
+        '07': 'All Channel Stereo*',
+        '08': 'All-Channel Mono*',
+        '09': 'Mono*',
+        '10': 'Mono-Academy*',
+        '11': 'Mono(L)*',
+        '12': 'Mono(R)*',
+        '13': 'High Blend*',
+        'na': 'cycle to next applicable',
+        'pa': 'cycle to previous applicable',
+    },
+    'dynamic_range': {
+        '0': 'Normal',
+        '1': 'Reduced',
+        '2': 'Late Night',
+        'n': 'cycle to next',
+    },
+}
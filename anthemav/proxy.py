@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""Proxy that shares one receiver connection between many clients.
+
+Receivers and IP to serial bridges accept only a few TCP connections at
+once. The proxy holds the only connection to the receiver and accepts any
+number of clients speaking the receiver protocol, e.g. AnthemAV pointed
+at the proxy instead of the receiver.
+
+    python -m anthemav.proxy --host 192.168.1.50 --listen-port 14999
+"""
+import time
+import asyncio
+import logging
+import argparse
+import collections
+
+from anthemav.aio import AsyncAnthemAV
+from anthemav.commandqueue import BACKGROUND
+from anthemav.framer import Framer
+from anthemav.metrics import NULL_METRICS
+from anthemav.parser import is_error
+from anthemav.protocols import MODELS
+from anthemav.transport import SerialTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AnthemProxy():
+    """asyncio TCP server in front of one receiver.
+
+    Client commands are queued on the upstream connection, an
+    AsyncAnthemAV, and each reply goes back to the client that sent the
+    command. Status the receiver reports unprompted, and the replies to
+    set commands, are sent to every client. Replies to queries are cached
+    for ttl seconds, so a query repeated by several clients is answered
+    without asking the receiver; a status line replaces the cached replies
+    that report the same fields and drops those that report some of them.
+    """
+
+    def __init__(self, host, port, model='auto', listen_host='127.0.0.1',
+                 listen_port=0, ttl=5, pipeline=4, transport=None,
+                 metrics=None, loop=None):
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.ttl = ttl
+        self.upstream = AsyncAnthemAV(host, port, model=model, loop=loop,
+                                      pipeline=pipeline, metrics=metrics,
+                                      transport=transport)
+        self.upstream.subscribe_frames(self._frame_received)
+        self._metrics = metrics or NULL_METRICS
+        self._label = self.upstream.label
+        self._clients = []
+        # Cached replies, {query: (reply, fields, time)}.
+        self._answers = {}
+        self._server = None
+
+    @property
+    def terminator(self):
+        """The end of a reply line: x00 replies are lines, others ';'."""
+        return '\n' if self.upstream.model == 'x00' else ';'
+
+    async def start(self):
+        """Start listening and return the (host, port) in use."""
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _ClientProtocol(self), self.listen_host, self.listen_port)
+        self.listen_port = self._server.sockets[0].getsockname()[1]
+        await self.upstream.listen()
+        return self.listen_host, self.listen_port
+
+    async def stop(self):
+        """Disconnect every client and close the upstream connection."""
+        for client in list(self._clients):
+            client.transport.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.upstream.stop_listening()
+
+    async def handle(self, client, command):
+        """Return the reply to a client command, None if there is none."""
+        upstream = self.upstream
+        if await upstream.resolve_model() == 'auto':
+            return None
+        is_query = command.endswith('?')
+        if is_query:
+            answer = self._answers.get(command)
+            if answer is not None and time.time() - answer[2] < self.ttl:
+                self._count('anthemav_proxy_cache_hits_total')
+                return answer[0]
+        payload = command + ';'
+        self._count('anthemav_proxy_forwarded_total')
+        if is_query:
+            # Clients asking the same query share one send.
+            reply = await upstream.send_payload(payload, BACKGROUND,
+                                                key=payload)
+        else:
+            reply = await upstream.send_payload(payload)
+        if reply is None:
+            return None
+        if not is_query:
+            self.broadcast(reply, exclude=client)
+        elif self._cacheable(reply):
+            self._answers[command] = (reply, self._fields(reply),
+                                      time.time())
+        return reply
+
+    def broadcast(self, reply, exclude=None):
+        """Send a status line to every client."""
+        for client in self._clients:
+            if client is not exclude:
+                client.send(reply)
+
+    def _frame_received(self, frame, answered):
+        """Bring the cached replies up to date with a receiver frame.
+
+        Frames that answer no command are sent to every client.
+        """
+        if not answered:
+            self.broadcast(frame)
+        fields = self._fields(frame)
+        if not fields:
+            return
+        current = self._cacheable(frame)
+        now = time.time()
+        for query, (reply, reply_fields, _) in list(self._answers.items()):
+            if current and reply_fields == fields:
+                self._answers[query] = (frame, fields, now)
+            elif reply_fields & fields:
+                del self._answers[query]
+
+    def _fields(self, frame):
+        """Return the {(zone, field)} a frame reports."""
+        return {(groups.get('zone'), field)
+                for groups in self.upstream.parser.parse(frame)
+                for field in groups if field != 'zone'}
+
+    def _cacheable(self, reply):
+        """Return False for error and standby replies."""
+        return (not is_error(reply) and
+                self.upstream.parser.standardise(reply) == reply)
+
+    def _count(self, name):
+        if self._metrics.enabled:
+            self._metrics.inc(name, host=self._label)
+
+    def _gauge_clients(self):
+        if self._metrics.enabled:
+            self._metrics.gauge('anthemav_proxy_clients', len(self._clients),
+                                host=self._label)
+
+
+class _ClientProtocol(asyncio.Protocol):
+    """One client connection of the proxy.
+
+    Commands are handled concurrently, so a cached reply does not wait for
+    the receiver, but replies are written in the order of the commands.
+    """
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._framer = Framer()
+        self._replies = collections.deque()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._proxy._clients.append(self)
+        self._proxy._gauge_clients()
+
+    def connection_lost(self, exc):
+        self._proxy._clients.remove(self)
+        self._proxy._gauge_clients()
+        for reply in self._replies:
+            reply.cancel()
+
+    def data_received(self, data):
+        for command in self._framer.feed(data):
+            reply = asyncio.ensure_future(self._proxy.handle(self, command))
+            self._replies.append(reply)
+            reply.add_done_callback(self._flush)
+
+    def _flush(self, _):
+        while self._replies and self._replies[0].done():
+            reply = self._replies.popleft()
+            if reply.cancelled():
+                continue
+            if reply.exception() is not None:
+                _LOGGER.error("Unable to handle a command: %s",
+                              reply.exception())
+            elif reply.result() is not None:
+                self.send(reply.result())
+
+    def send(self, reply):
+        if not self.transport.is_closing():
+            self.transport.write((reply + self._proxy.terminator).encode())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', help='receiver or serial bridge address')
+    parser.add_argument('--port', type=int, default=4999)
+    parser.add_argument('--serial', metavar='DEVICE',
+                        help='serial port of the receiver, instead of --host')
+    parser.add_argument('--model', default='auto',
+                        choices=('auto',) + MODELS)
+    parser.add_argument('--listen', default='127.0.0.1',
+                        help='address to accept clients on; 0.0.0.0 for '
+                             'every interface')
+    parser.add_argument('--listen-port', type=int, default=4999)
+    parser.add_argument('--ttl', type=float, default=5,
+                        help='seconds a query reply is answered from cache')
+    parser.add_argument('--pipeline', type=int, default=4,
+                        help='commands in flight to the receiver')
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args(argv)
+    if not args.host and not args.serial:
+        parser.error('one of --host or --serial is required')
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else
+                        logging.INFO)
+    transport = SerialTransport(args.serial) if args.serial else None
+    proxy = AnthemProxy(args.host, args.port, args.model, args.listen,
+                        args.listen_port, args.ttl, args.pipeline, transport)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    host, port = loop.run_until_complete(proxy.start())
+    print('Proxying {} on {}:{}'.format(proxy.upstream.label, host, port))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(proxy.stop())
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
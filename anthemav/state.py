@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+FIELDS = ('power', 'volume', 'mute', 'source', 'decoder')
+
+_INDEX = {field: i for i, field in enumerate(FIELDS)}
+
+
+def _flag(value):
+    return value == '1'
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+# Conversion of the parsed response strings to field values.
+CONVERTERS = {
+    'power': _flag,
+    'volume': _number,
+    'mute': _flag,
+    'source': str,
+    'decoder': str,
+}
+
+
+class ZoneState():
+    """Status of one zone of a receiver.
+
+    Fields are converted once, when a response is parsed: power and mute
+    are bools, volume is a number in dB, source and decoder are the codes
+    the receiver uses. A field that has not been reported yet is None.
+    Each field carries the time it was last read from the receiver.
+
+    Other fields the protocol parses, such as listening_mode or balance,
+    are kept as reported in extras, {field: value string}; use
+    anthemav.protocols.decode() for the meaning of a value.
+    """
+
+    __slots__ = FIELDS + ('zone', 'extras', '_updated')
+
+    def __init__(self, zone):
+        self.zone = zone
+        self.power = None
+        self.volume = None
+        self.mute = None
+        self.source = None
+        self.decoder = None
+        self.extras = {}
+        self._updated = [0] * len(FIELDS)
+
+    def __repr__(self):
+        return 'ZoneState({})'.format(', '.join([repr(self.zone)] + [
+            '{}={!r}'.format(field, value)
+            for field, value in self.as_dict().items()]))
+
+    def __eq__(self, other):
+        if not isinstance(other, ZoneState):
+            return NotImplemented
+        return self.zone == other.zone and not self.diff(other)
+
+    def get(self, field, default=None):
+        """Return a field, or default when it has not been reported."""
+        if field in _INDEX:
+            value = getattr(self, field)
+        else:
+            value = self.extras.get(field)
+        return default if value is None else value
+
+    def as_dict(self):
+        """Return the reported fields, extras included, as a dict."""
+        values = {field: getattr(self, field) for field in FIELDS
+                  if getattr(self, field) is not None}
+        values.update(self.extras)
+        return values
+
+    def copy(self):
+        """Return a copy, timestamps included."""
+        state = ZoneState(self.zone)
+        for field in FIELDS:
+            setattr(state, field, getattr(self, field))
+        state.extras = dict(self.extras)
+        state._updated = list(self._updated)
+        return state
+
+    def apply(self, values, now):
+        """Set fields from parsed response strings, stamped with now.
+
+        Fields other than FIELDS go to extras unconverted. Returns
+        {field: value} of the fields whose value changed.
+        """
+        changed = {}
+        for field, value in values.items():
+            convert = CONVERTERS.get(field)
+            if convert is None:
+                if field != 'zone' and self.extras.get(field) != value:
+                    self.extras[field] = value
+                    changed[field] = value
+                continue
+            value = convert(value)
+            self._updated[_INDEX[field]] = now
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed[field] = value
+        return changed
+
+    def diff(self, other):
+        """Return {field: value} of this state that differ from other.
+
+        An extra field that only other has is returned as None.
+        """
+        changed = {field: getattr(self, field) for field in FIELDS
+                   if getattr(self, field) != getattr(other, field)}
+        for field in set(self.extras).union(other.extras):
+            value = self.extras.get(field)
+            if value != other.extras.get(field):
+                changed[field] = value
+        return changed
+
+    def updated(self, field):
+        """Return the time field was last read, 0 if never."""
+        return self._updated[_INDEX[field]]
+
+    def touch(self, fields, now):
+        """Mark fields as read at now."""
+        for field in fields:
+            self._updated[_INDEX[field]] = now
+
+    def invalidate(self, field):
+        """Mark field as never read, so the next update queries it."""
+        self._updated[_INDEX[field]] = 0
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+import os
+import select
+import socket
+import logging
+import threading
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+try:
+    import termios
+    import tty
+except ImportError:
+    termios = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# Line speed of the MRX x10/x20 RS-232 port (8 data bits, 1 stop bit).
+BAUDRATE = 115200
+
+
+class TcpTransport():
+    """TCP connection to the receiver or to its IP to serial bridge."""
+
+    # Several connections may be open at once.
+    exclusive = False
+
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.label = '{}:{}'.format(host, port)
+
+    def open(self, timeout):
+        """Return a connected socket; raises OSError."""
+        sock = socket.create_connection(self.address, timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+
+class SerialTransport():
+    """Direct RS-232 connection to the receiver, without a bridge.
+
+    pyserial configures the port when it is installed (pip install
+    anthemav[serial]), on any platform; the clients then get a socket
+    that a SerialBridge connects to the port. Otherwise the device is
+    set up with termios, raw 8N1, which also works for a pty pair
+    standing in for the receiver.
+    """
+
+    # A serial port is opened once and kept open.
+    exclusive = True
+
+    def __init__(self, device, baudrate=BAUDRATE):
+        self.device = device
+        self.baudrate = baudrate
+        self.address = (device, None)
+        self.label = device
+
+    def open(self, timeout):
+        """Return an open connection to the port; raises OSError.
+
+        A socket bridged to the port with pyserial, otherwise a
+        SerialConnection.
+        """
+        if serial is not None:
+            port = serial.Serial(self.device, self.baudrate,
+                                 timeout=SerialBridge.poll,
+                                 write_timeout=timeout)
+            return SerialBridge(port).sock
+        if termios is None:
+            raise OSError('serial ports need pyserial on this platform')
+        fd = os.open(self.device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            tty.setraw(fd)
+            attrs = termios.tcgetattr(fd)
+            speed = getattr(termios, 'B{}'.format(self.baudrate))
+            attrs[2] |= termios.CLOCAL | termios.CREAD
+            attrs[4] = attrs[5] = speed
+            termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        except (termios.error, AttributeError) as err:
+            os.close(fd)
+            raise OSError('unable to configure {}: {}'.format(self.device,
+                                                              err))
+        return SerialConnection(fd, lambda: os.close(fd))
+
+
+class SerialBridge():
+    """Copies data between a pyserial port and one end of a socket pair.
+
+    pyserial ports have no file descriptor to select on under Windows,
+    so the clients use the other end, sock, like a TCP connection. The
+    port is closed when sock is closed; sock reads EOF when the port
+    fails.
+    """
+
+    # Seconds a read of the port waits for data.
+    poll = 0.1
+
+    def __init__(self, port):
+        self._port = port
+        self.sock, self._sock = socket.socketpair()
+        self._closed = threading.Event()
+        for target in (self._from_port, self._to_port):
+            threading.Thread(target=target, name='anthemav-serial',
+                             daemon=True).start()
+
+    def _from_port(self):
+        while not self._closed.is_set():
+            try:
+                data = self._port.read(1)
+                if data:
+                    data += self._port.read(self._port.in_waiting)
+                    self._sock.sendall(data)
+            except OSError as err:
+                if not self._closed.is_set():
+                    _LOGGER.warning("Serial port failed: %s", err)
+                break
+        self._close()
+
+    def _to_port(self):
+        while not self._closed.is_set():
+            try:
+                data = self._sock.recv(1024)
+                if not data:
+                    break
+                self._port.write(data)
+            except OSError as err:
+                if not self._closed.is_set():
+                    _LOGGER.warning("Serial port failed: %s", err)
+                break
+        self._close()
+
+    def _close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._port.close()
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class SerialConnection():
+    """An open serial port with the socket methods the clients use."""
+
+    def __init__(self, fd, close):
+        self._fd = fd
+        self._close = close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def fileno(self):
+        return self._fd
+
+    def send(self, data):
+        """Write what the port takes now; return the number of bytes."""
+        try:
+            return os.write(self._fd, data)
+        except BlockingIOError:
+            return 0
+
+    def sendall(self, data):
+        view = memoryview(data)
+        while view:
+            sent = self.send(view)
+            if not sent:
+                select.select([], [self._fd], [])
+            view = view[sent:]
+
+    def recv(self, size):
+        """Return the data read, b'' at EOF or None if there is none yet."""
+        try:
+            return os.read(self._fd, size)
+        except BlockingIOError:
+            return None
+
+    def close(self):
+        if self._fd is not None:
+            self._fd = None
+            self._close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+import time
+import logging
+import threading
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class VolumeSchedule():
+    """Decide which volume command to send next for one zone.
+
+    Requests are coalesced: only the latest target is kept, and commands
+    are spaced at least interval seconds apart. A ramp moves from the
+    current level to the target over a duration, either with stepped
+    VolumeSet commands or one VolumeUp/VolumeDown per step.
+    """
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self._target = None
+        self._ramp = None
+        self._sent = None
+        self._last_send = 0
+
+    @property
+    def idle(self):
+        """Return True when nothing is waiting to be sent."""
+        return self._target is None
+
+    def set(self, volume):
+        """Request volume, replacing any pending request or ramp."""
+        self._ramp = None
+        self._target = int(volume)
+
+    def cancel(self):
+        """Drop any pending request or ramp."""
+        self._ramp = None
+        self._target = None
+
+    def ramp(self, current, volume, duration, step_commands=False):
+        """Request a timed ramp from current to volume."""
+        if current is None:
+            return self.set(volume)
+        self._target = int(volume)
+        self._sent = int(current)
+        self._ramp = (int(current), time.time(), duration, step_commands)
+
+    def next(self, now):
+        """Return (command, delay).
+
+        command is a (cmd, kwargs) entry to send now or None; delay is the
+        time until next() should be called again, None when idle.
+        """
+        if self._target is None:
+            return None, None
+        wait = self._last_send + self.interval - now
+        if wait > 0:
+            return None, wait
+        if self._ramp is None:
+            level, self._target = self._target, None
+            return self._send(now, level), None
+
+        start, began, duration, step_commands = self._ramp
+        progress = min((now - began) / duration, 1) if duration > 0 else 1
+        level = int(round(start + (self._target - start) * progress))
+        if step_commands and level != self._sent:
+            step = 1 if level > self._sent else -1
+            self._sent += step
+            self._last_send = now
+            cmd = 'VolumeUp' if step > 0 else 'VolumeDown'
+            command = (cmd, {})
+        elif level != self._sent:
+            command = self._send(now, level)
+        else:
+            command = None
+        if progress >= 1 and self._sent == self._target:
+            self._ramp = self._target = None
+            return command, None
+        return command, self.interval
+
+    def _send(self, now, level):
+        self._sent = level
+        self._last_send = now
+        return ('VolumeSet', {'volume': level})
+
+
+def current_volume(receiver, zone):
+    """Return the volume of zone in the status of receiver, or None."""
+    state = receiver.status.get(zone)
+    return state.volume if state is not None else None
+
+
+class VolumeScheduler():
+    """Send volume changes for one zone from a background thread.
+
+    set() returns immediately; a burst of calls, such as a slider being
+    dragged, results in the latest level being sent at a bounded rate.
+    A command that fails is logged and the next one is sent as usual.
+    """
+
+    def __init__(self, receiver, zone, interval=0.1):
+        self._receiver = receiver
+        self._zone = zone
+        self._schedule = VolumeSchedule(interval)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stop = None
+
+    def set(self, volume):
+        """Move to volume as soon as the rate limit allows."""
+        with self._condition:
+            self._schedule.set(volume)
+            self._wake()
+
+    def ramp(self, volume, duration, step_commands=False):
+        """Move smoothly to volume over duration seconds."""
+        with self._condition:
+            self._schedule.ramp(current_volume(self._receiver, self._zone),
+                                volume, duration, step_commands)
+            self._wake()
+
+    def close(self):
+        """Stop the thread, dropping what has not been sent yet.
+
+        A later set() or ramp() starts it again.
+        """
+        with self._condition:
+            self._schedule.cancel()
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stop.set()
+                self._condition.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _wake(self):
+        if self._thread is None:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run,
+                                            args=(self._stop,),
+                                            name='anthemav-volume',
+                                            daemon=True)
+            self._thread.start()
+        self._condition.notify()
+
+    def _run(self, stop):
+        while True:
+            with self._condition:
+                if stop.is_set():
+                    return
+                command, delay = self._schedule.next(time.time())
+                if command is None:
+                    self._condition.wait(delay)
+                    continue
+            try:
+                self._receiver.send_command(command[0], self._zone,
+                                            **command[1])
+            except Exception as err:
+                _LOGGER.warning("Unable to send %s to zone %s: %r",
+                                command[0], self._zone, err)
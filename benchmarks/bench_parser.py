@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""Micro-benchmark of response parsing, in frames per second.
+
+Compares the original per-response regex loop with the compiled
+ResponseParser over a mix of x00 and x10 responses.
+
+    python benchmarks/bench_parser.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from anthemav.anthem_api import api  # noqa: E402
+from anthemav.parser import ResponseParser  # noqa: E402
+
+FRAMES = {
+    'x00': ['P1S3V-35M0D0', 'P1VM-35', 'P1P1', 'P1M0', 'P2S1V-50M1D0',
+            'Main.Off', 'Zone2.Off', 'P1S5'],
+    'x10': ['Z1POW1', 'Z1MUT0', 'Z1INP3', 'Z2POW0', '!ZZ1VOL-35',
+            'Z1VOL-35', 'ICN8'],
+}
+
+
+def legacy_parse(model, response):
+    """The parsing loop AnthemAV used before ResponseParser."""
+    for regex in api['response_replace'][model]:
+        m = re.search(r'{}'.format(regex[0]), response)
+        if m:
+            response = regex[1]
+    result = []
+    for regex in api['regex'][model]:
+        m = re.search(r'{}'.format(regex), response)
+        if m:
+            result.append(m.groupdict())
+    return result
+
+
+def compiled_parse(parser, response):
+    return parser.parse(response)
+
+
+def run(number=20000):
+    results = {}
+    for model, frames in sorted(FRAMES.items()):
+        parser = ResponseParser(model)
+        for name, func, arg in (('before', legacy_parse, model),
+                                ('after', compiled_parse, parser)):
+            seconds = min(timeit.repeat(
+                lambda: [func(arg, frame) for frame in frames],
+                number=number // len(frames), repeat=3))
+            count = (number // len(frames)) * len(frames)
+            results[(model, name)] = count / seconds
+    return results
+
+
+if __name__ == '__main__':
+    results = run()
+    for model in sorted(FRAMES):
+        before = results[(model, 'before')]
+        after = results[(model, 'after')]
+        print('{}: before {:>10,.0f} frames/s  after {:>10,.0f} frames/s  '
+              '({:.1f}x)'.format(model, before, after, after / before))
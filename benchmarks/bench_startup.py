@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""Micro-benchmark of start-up: import and construction cost.
+
+In a fresh interpreter, times the import of the client and the creation
+of its first AnthemAV, which loads the protocol tables of its model and
+compiles its parser. The same is timed in a baseline tree exported from
+git, by default the one with the eager api dictionary that per-model
+loading replaced, so both run the same code path. The cost of each
+further AnthemAV is timed as well, and whether the import pulled in
+asyncio, which only the asyncio client needs.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --baseline <git ref>
+"""
+import io
+import os
+import sys
+import timeit
+import tarfile
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+# Keep the benchmark out of the user's receiver cache.
+os.environ.setdefault('ANTHEMAV_CACHE', '')
+
+# Parent of "Load protocol tables per model on first use": the last tree
+# that built the api dictionary of every model at import.
+BASELINE = '4732101^'
+
+# Run in a fresh interpreter; prints the seconds taken by the import and
+# by the first client, and whether asyncio was imported.
+STARTUP = '''
+import sys
+import time
+start = time.perf_counter()
+from anthemav.anthemav import AnthemAV
+imported = time.perf_counter()
+AnthemAV('127.0.0.1', 0, model={model!r})
+print(imported - start, time.perf_counter() - imported,
+      int('asyncio' in sys.modules))
+'''
+
+
+def startup(model, repeat=10, root=ROOT):
+    """Best times in ms for a new interpreter to import, and to create
+    its first client, with the anthemav package of root; and whether the
+    import loaded asyncio.
+    """
+    code = STARTUP.format(model=model)
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=root)
+        samples.append([float(value) for value in output.split()])
+    return (min(sample[0] for sample in samples) * 1000,
+            min(sample[1] for sample in samples) * 1000,
+            bool(samples[0][2]))
+
+
+def export(ref, directory):
+    """Write the anthemav package of the git ref to directory."""
+    data = subprocess.check_output(['git', 'archive', ref, 'anthemav'],
+                                   cwd=ROOT)
+    with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+        archive.extractall(directory)
+
+
+def construct(model, number=2000):
+    """Time in microseconds to create each further AnthemAV."""
+    from anthemav.anthemav import AnthemAV
+    AnthemAV('127.0.0.1', 0, model=model)
+    seconds = min(timeit.repeat(
+        lambda: AnthemAV('127.0.0.1', 0, model=model),
+        number=number, repeat=3))
+    return seconds / number * 1e6
+
+
+def run(models=('x00', 'x10', 'x20'), repeat=10, baseline=BASELINE):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        export(baseline, directory)
+        for model in models:
+            for name, root in (('before', directory), ('after', ROOT)):
+                imported, first, aio = startup(model, repeat, root)
+                results['{}_import_ms_{}'.format(model, name)] = imported
+                results['{}_first_client_ms_{}'.format(model, name)] = first
+                results['{}_imports_asyncio_{}'.format(model, name)] = aio
+            results['{}_each_client_us'.format(model)] = construct(model)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='git ref to compare with (default %(default)s)')
+    parser.add_argument('--models', nargs='+', default=['x00', 'x10', 'x20'],
+                        help='models the baseline supports as well')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    results = run(args.models, args.repeat, args.baseline)
+    print('baseline {}'.format(args.baseline))
+    for model in args.models:
+        values = {name: results['{}_{}'.format(model, name)]
+                  for name in ('import_ms_before', 'import_ms_after',
+                               'first_client_ms_before',
+                               'first_client_ms_after',
+                               'imports_asyncio_after', 'each_client_us')}
+        print('{}: import {import_ms_before:5.1f} -> {import_ms_after:5.1f} '
+              'ms  first client {first_client_ms_before:5.2f} -> '
+              '{first_client_ms_after:5.2f} ms  each further client '
+              '{each_client_us:5.1f} us  asyncio imported: '
+              '{imports_asyncio_after}'.format(model, **values))
+
+
+if __name__ == '__main__':
+    main()
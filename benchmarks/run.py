@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""Benchmark suite for AnthemAV against the local emulator.
+
+Measures send_command latency percentiles, commands per second, full
+refresh time by zone count, response parse throughput and start-up cost,
+and writes the results as JSON. Pass --compare with an earlier results
+file to print the change of every metric.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --compare results.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Keep the emulated receivers out of the user's receiver cache.
+os.environ.setdefault('ANTHEMAV_CACHE', '')
+
+from anthemav.aio import AsyncAnthemAV  # noqa: E402
+from anthemav.anthemav import AnthemAV  # noqa: E402
+from anthemav.emulator import AnthemEmulator  # noqa: E402
+
+from bench_parser import FRAMES  # noqa: E402
+from bench_startup import construct, startup  # noqa: E402
+
+# Metrics where a larger value is better; every other metric is a time.
+HIGHER_IS_BETTER = ('per_second',)
+
+
+def percentiles(samples):
+    """Return p50/p90/p99/max of samples, in milliseconds."""
+    samples = sorted(samples)
+    result = {}
+    for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+        index = min(int(round(fraction * (len(samples) - 1))),
+                    len(samples) - 1)
+        result[name] = samples[index] * 1000
+    result['max'] = samples[-1] * 1000
+    return result
+
+
+class EmulatorThread():
+    """Run an AnthemEmulator on its own event loop thread."""
+
+    def __init__(self, **kwargs):
+        self.emulator = AnthemEmulator(**kwargs)
+        self._loop = asyncio.new_event_loop()
+
+    def __enter__(self):
+        host, port = self._loop.run_until_complete(self.emulator.start())
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        daemon=True)
+        self._thread.start()
+        return host, port
+
+    def __exit__(self, *args):
+        asyncio.run_coroutine_threadsafe(self.emulator.stop(),
+                                         self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def bench_latency(model, latency, count):
+    """Latency of single send_command calls."""
+    results = {}
+    with EmulatorThread(model=model, latency=latency) as (host, port):
+        for mode in ('connect_per_command', 'persistent'):
+            mrx = AnthemAV(host, port, model=model,
+                           persistent=mode == 'persistent')
+            samples = []
+            for i in range(count):
+                start = time.perf_counter()
+                mrx.send_command('VolumeSet', '1', volume=-40 - i % 20)
+                samples.append(time.perf_counter() - start)
+            mrx.close()
+            results['sync_' + mode] = percentiles(samples)
+
+        async def run():
+            mrx = AsyncAnthemAV(host, port, model=model)
+            samples = []
+            for i in range(count):
+                start = time.perf_counter()
+                await mrx.send_command('VolumeSet', '1', volume=-40 - i % 20)
+                samples.append(time.perf_counter() - start)
+            mrx.close()
+            return percentiles(samples)
+        results['async'] = asyncio.run(run())
+    return results
+
+
+def bench_throughput(model, latency, count):
+    """Commands per second, one at a time and pipelined."""
+    results = {}
+    with EmulatorThread(model=model, latency=latency) as (host, port):
+        mrx = AnthemAV(host, port, model=model, persistent=True)
+        start = time.perf_counter()
+        for i in range(count):
+            mrx.send_command('VolumeSet', '1', volume=-40 - i % 20)
+        results['sync_persistent_per_second'] = count / (
+            time.perf_counter() - start)
+
+        batch = [('VolumeSet', {'volume': -40 - i % 20}) for i in range(10)]
+        start = time.perf_counter()
+        for i in range(count // len(batch)):
+            mrx.send_commands(batch)
+        results['sync_batched_per_second'] = (
+            count // len(batch) * len(batch)) / (time.perf_counter() - start)
+        mrx.close()
+
+        async def run(pipeline):
+            mrx = AsyncAnthemAV(host, port, model=model, pipeline=pipeline)
+            start = time.perf_counter()
+            # VolumeSet would be superseded in the queue; these are not.
+            await asyncio.gather(*[
+                mrx.send_command('VolumeUp' if i % 2 else 'VolumeDown', '1')
+                for i in range(count)])
+            elapsed = time.perf_counter() - start
+            mrx.close()
+            return count / elapsed
+        for pipeline in (1, 8):
+            results['async_pipeline_{}_per_second'.format(pipeline)] = \
+                asyncio.run(run(pipeline))
+    return results
+
+
+def bench_refresh(model, latency, zone_counts, repeat):
+    """Time to refresh every zone of a receiver, by number of zones."""
+    results = {}
+    for zones in zone_counts:
+        with EmulatorThread(model=model, latency=latency,
+                            zones=zones) as (host, port):
+            mrx = AnthemAV(host, port, model=model, persistent=True)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for zone in range(1, zones + 1):
+                    mrx.update(str(zone), force=True)
+                samples.append(time.perf_counter() - start)
+            mrx.close()
+            results['sync_{}_zones'.format(zones)] = percentiles(samples)
+
+            async def run():
+                mrx = AsyncAnthemAV(host, port, model=model, pipeline=8)
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await asyncio.gather(*[
+                        mrx.update(str(zone), force=True)
+                        for zone in range(1, zones + 1)])
+                    samples.append(time.perf_counter() - start)
+                mrx.close()
+                return percentiles(samples)
+            results['async_{}_zones'.format(zones)] = asyncio.run(run())
+    return results
+
+
+def bench_parse(count):
+    """Responses parsed per second by _update_status."""
+    results = {}
+    for model, frames in sorted(FRAMES.items()):
+        mrx = AnthemAV('127.0.0.1', 0, model=model)
+        rounds = max(count // len(frames), 1)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for frame in frames:
+                mrx._update_status(frame)
+        elapsed = time.perf_counter() - start
+        results['{}_per_second'.format(model)] = (
+            rounds * len(frames) / elapsed)
+    return results
+
+
+def bench_startup(models, repeat):
+    """Import time and the cost of the first and of each further client."""
+    results = {}
+    for model in models:
+        imported, first, _ = startup(model, repeat)
+        results['{}_import_ms'.format(model)] = imported
+        results['{}_first_client_ms'.format(model)] = first
+        results['{}_each_client_us'.format(model)] = construct(model)
+    return results
+
+
+def run(args):
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'latency': args.latency,
+        },
+    }
+    for model in args.models:
+        results[model] = {
+            'latency_ms': bench_latency(model, args.latency, args.commands),
+            'throughput': bench_throughput(model, args.latency,
+                                           args.commands),
+            'refresh_ms': bench_refresh(model, args.latency, args.zones,
+                                        args.repeat),
+        }
+    results['parse'] = bench_parse(args.frames)
+    results['startup'] = bench_startup(args.models, args.repeat)
+    return results
+
+
+def flatten(results, prefix=''):
+    """Yield (dotted name, value) for every number in results."""
+    for key, value in sorted(results.items()):
+        if key == 'meta':
+            continue
+        name = prefix + key
+        if isinstance(value, dict):
+            yield from flatten(value, name + '.')
+        else:
+            yield name, value
+
+
+def compare(results, baseline):
+    """Print every metric with its change against baseline."""
+    old = dict(flatten(baseline))
+    for name, value in flatten(results):
+        line = '{:<60} {:>12.2f}'.format(name, value)
+        if old.get(name):
+            change = (value - old[name]) / old[name] * 100
+            better = change > 0 if name.endswith(HIGHER_IS_BETTER) \
+                else change < 0
+            line += '  {:+7.1f}% {}'.format(change,
+                                            'better' if better else 'worse')
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='write the results to this file')
+    parser.add_argument('--compare', help='results file to compare with')
+    parser.add_argument('--models', nargs='+', default=['x00', 'x10'])
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='emulated receiver latency in seconds')
+    parser.add_argument('--commands', type=int, default=200)
+    parser.add_argument('--zones', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--frames', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+    compare(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
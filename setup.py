@@ -13,8 +13,15 @@ setup(
     url="https://github.com/tinglis1/anthemav",
     license='BSD',
     author_email='tinglis1@gmail.com',
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests']),
+    python_requires='>=3.7',
     install_requires=['requests'],
+    extras_require={
+        'serial': ['pyserial'],
+    },
+    entry_points={
+        'console_scripts': ['anthemav = anthemav.cli:main'],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -22,8 +29,12 @@ setup(
         "Operating System :: OS Independent",
         "Topic :: Software Development :: Libraries",
         "Topic :: Home Automation",
-        "Programming Language :: Python :: 2.7",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: Implementation :: PyPy"
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11"
     ]
 )
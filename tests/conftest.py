@@ -0,0 +1,48 @@
+import os
+import asyncio
+import threading
+
+import pytest
+
+# Keep the tests out of the user's receiver cache.
+os.environ['ANTHEMAV_CACHE'] = ''
+
+from anthemav import health  # noqa: E402
+from anthemav.emulator import AnthemEmulator  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    """Give every test its own circuit breakers per receiver."""
+    monkeypatch.setattr(health, '_BREAKERS', {})
+
+
+@pytest.fixture
+def loop():
+    """An event loop running on a background thread."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def emulator(loop):
+    """Return start(model, **kwargs), which runs an AnthemEmulator on loop.
+
+    The emulators started are stopped after the test.
+    """
+    emulators = []
+
+    def start(model='x00', **kwargs):
+        emulator = AnthemEmulator(model, **kwargs)
+        asyncio.run_coroutine_threadsafe(emulator.start(), loop).result(5)
+        emulators.append(emulator)
+        return emulator
+
+    yield start
+    for emulator in emulators:
+        asyncio.run_coroutine_threadsafe(emulator.stop(), loop).result(5)
@@ -0,0 +1,128 @@
+import asyncio
+
+from anthemav.aio import AsyncAnthemAV
+from anthemav.emulator import AnthemEmulator
+
+
+def run(scenario, model='x10', **kwargs):
+    """Run scenario(emulator, mrx) against an emulator on a new loop."""
+    async def main():
+        emulator = AnthemEmulator(model)
+        host, port = await emulator.start()
+        mrx = AsyncAnthemAV(host, port, model=model, **kwargs)
+        try:
+            return await scenario(emulator, mrx)
+        finally:
+            mrx.close()
+            await emulator.stop()
+    return asyncio.run(main())
+
+
+def test_update_and_commands():
+    async def scenario(emulator, mrx):
+        await mrx.update()
+        assert mrx.status['1'].power is True
+        assert mrx.status['1'].volume == -35
+        await mrx.volume_set(-30)
+        await mrx.mute_set(True)
+        await mrx.update()
+        return mrx.status['1']
+    state = run(scenario)
+    assert state.volume == -30
+    assert state.mute is True
+
+
+def test_one_transport_for_every_command():
+    async def scenario(emulator, mrx):
+        for volume in range(-40, -30):
+            await mrx.volume_set(volume)
+        assert mrx.connected
+        assert len(emulator._clients) == 1
+        return mrx._connections
+    assert run(scenario) == 1
+
+
+def test_pipelined_commands_are_matched_to_replies():
+    async def scenario(emulator, mrx):
+        await mrx.power_set(True, zone='2')
+        await asyncio.gather(mrx.volume_set(-20, zone='1'),
+                             mrx.volume_set(-50, zone='2'),
+                             mrx.update('1'), mrx.update('2'))
+        await asyncio.gather(mrx.update('1', force=True),
+                             mrx.update('2', force=True))
+        return mrx.status
+    status = run(scenario, pipeline=4)
+    assert status['1'].volume == -20
+    assert status['2'].volume == -50
+
+
+def test_x00():
+    async def scenario(emulator, mrx):
+        await mrx.power_set(True, zone='2')
+        await mrx.update('2')
+        return mrx.status['2']
+    state = run(scenario, model='x00')
+    assert state.power is True
+    assert state.volume == -35
+
+
+def test_connect_failure():
+    async def main():
+        mrx = AsyncAnthemAV('127.0.0.1', 1, model='x10')
+        mrx._timeout = 0.5
+        return await mrx.connect(), await mrx.send_command('PowerOn', '1')
+    connected, status = asyncio.run(main())
+    assert not connected
+    assert status == {}
+
+
+def test_replies_are_matched_by_mnemonic_and_argument():
+    async def scenario(emulator, mrx):
+        return await mrx._send_payloads(
+            ['Z1VIR?;', 'Z1VOL?;', 'ILN02?;', 'ILN01?;', 'Z1VUP1;'])
+    assert run(scenario, model='x20', pipeline=4) == [
+        '!IZ1VIR?', 'Z1VOL-35', 'ILN02Cable/Sat', 'ILN01Blu-ray', 'Z1VOL-34']
+
+
+def test_send_commands():
+    async def scenario(emulator, mrx):
+        writes = []
+        write = mrx._write_payloads
+
+        async def record(payloads):
+            writes.append(payloads)
+            return await write(payloads)
+        mrx._write_payloads = record
+        status = await mrx.send_commands([
+            ('PowerOn', {'zone': '2'}),
+            ('VolumeSet', {'volume': -42, 'zone': '2'})])
+        return writes, status['2']
+    writes, state = run(scenario)
+    assert writes == [['Z2POW1;', 'Z2VOL-42;']]
+    assert state.power is True
+    assert state.volume == -42
+
+
+def test_close_stops_listening():
+    async def scenario(emulator, mrx):
+        await mrx.listen()
+        assert len(emulator._clients) == 1
+        mrx.close()
+        await asyncio.sleep(mrx._backoff_min + 0.2)
+        return mrx.connected, len(emulator._clients)
+    assert run(scenario) == (False, 0)
+
+
+def test_frame_subscribers():
+    async def scenario(emulator, mrx):
+        frames = []
+        unsubscribe = mrx.subscribe_frames(
+            lambda *frame: frames.append(frame))
+        await mrx.send_payload('Z1VOL?;')
+        mrx._frame_received('Z1MUT1')
+        unsubscribe()
+        await mrx.send_payload('Z1POW?;')
+        return frames, mrx.status['1'].mute
+    frames, mute = run(scenario)
+    assert frames == [('Z1VOL-35', True), ('Z1MUT1', False)]
+    assert mute is True
@@ -0,0 +1,261 @@
+import sys
+import time
+import threading
+import subprocess
+
+import pytest
+
+from anthemav.anthemav import AnthemAV
+from anthemav.cache import DiskCache
+
+
+def connected_clients(emulator, count, timeout=2):
+    """Wait until the emulator has count clients; return the number."""
+    deadline = time.time() + timeout
+    while len(emulator._clients) != count and time.time() < deadline:
+        time.sleep(0.01)
+    return len(emulator._clients)
+
+
+def test_connection_per_command(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10')
+    mrx.volume_set(-40)
+    mrx.update()
+    assert mrx.status['1'].volume == -40
+    assert mrx._connections == 0
+    assert connected_clients(em, 0) == 0
+
+
+def test_persistent_connection_is_reused(emulator):
+    em = emulator('x10')
+    with AnthemAV(em.host, em.port, model='x10', persistent=True) as mrx:
+        for volume in (-40, -39, -38):
+            mrx.volume_set(volume)
+        mrx.update()
+        assert mrx.status['1'].volume == -38
+        assert mrx._connections == 1
+        assert connected_clients(em, 1) == 1
+    assert connected_clients(em, 0) == 0
+
+
+def test_persistent_connection_reconnects(emulator, loop):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10', persistent=True)
+    assert mrx.connect()
+    assert connected_clients(em, 1) == 1
+    loop.call_soon_threadsafe(em._clients[0].transport.close)
+    assert connected_clients(em, 0) == 0
+    mrx.update()
+    assert mrx.status['1'].power is True
+    assert mrx._connections == 2
+    mrx.close()
+
+
+def test_persistent_connection_backs_off(emulator):
+    em = emulator('x10')
+    port = em.port
+    mrx = AnthemAV(em.host, port, model='x10', persistent=True)
+    mrx._link.address = (em.host, 1)
+    mrx._timeout = 0.5
+    assert not mrx.connect()
+    assert mrx._backoff == mrx._backoff_min
+    # Within the backoff no connection is attempted.
+    mrx._link.address = (em.host, port)
+    assert not mrx.connect()
+    mrx._next_connect = 0
+    assert mrx.connect()
+    assert mrx._backoff == 0
+    mrx.close()
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_listener_reports_unsolicited_changes(emulator, loop):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10')
+    changes = []
+    mrx.subscribe(lambda zone, field, value: changes.append(
+        (zone, field, value)))
+    mrx.listen()
+    try:
+        mrx.update()
+        assert ('1', 'volume', -35) in changes
+        del changes[:]
+        zone = em.zones['1']
+        zone.volume = -20
+        loop.call_soon_threadsafe(em.broadcast, em._report(zone, 'volume'))
+        assert wait_for(lambda: changes)
+        assert changes == [('1', 'volume', -20)]
+        assert mrx.status['1'].volume == -20
+    finally:
+        mrx.stop_listening()
+
+
+def test_listener_lock_is_free_while_waiting(emulator):
+    em = emulator('x10', latency=0.5)
+    mrx = AnthemAV(em.host, em.port, model='x10')
+    mrx.listen()
+    try:
+        assert wait_for(lambda: mrx._sock is not None)
+        thread = threading.Thread(target=mrx.update)
+        thread.start()
+        assert wait_for(lambda: em.commands)
+        # The reply is awaited without holding the connection lock.
+        assert mrx._lock.acquire(timeout=0.2)
+        mrx._lock.release()
+        thread.join()
+        assert mrx.status['1'].power is True
+    finally:
+        mrx.stop_listening()
+
+
+def test_stop_listening_restores_connection_mode(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10')
+    mrx.listen()
+    mrx.update()
+    assert connected_clients(em, 1) == 1
+    mrx.stop_listening()
+    assert connected_clients(em, 0) == 0
+    mrx.update()
+    assert not mrx._persistent
+    assert connected_clients(em, 0) == 0
+
+
+SCENE = [('PowerOn', {'zone': '2'}),
+         ('SourceSet', {'source': 3, 'zone': '2'}),
+         ('VolumeSet', {'volume': -42, 'zone': '2'}),
+         ('MuteOn', {'zone': '2'})]
+
+
+def test_send_commands_in_one_write(emulator, monkeypatch):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10', persistent=True)
+    writes = []
+    exchange = mrx._exchange
+
+    def record(sock, payload, count=1):
+        writes.append((payload, count))
+        return exchange(sock, payload, count)
+    monkeypatch.setattr(mrx, '_exchange', record)
+    status = mrx.send_commands(SCENE + [('NoSuchCommand', {})])
+    assert writes == [('Z2POW1;Z2INP3;Z2VOL-42;Z2MUT1;', 4)]
+    # Every reply has been parsed when send_commands returns.
+    assert status['2'].as_dict() == {
+        'power': True, 'source': '3', 'volume': -42, 'mute': True}
+    mrx.close()
+
+
+def test_update_within_ttl_is_served_from_status(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10', ttl=60)
+    mrx.update()
+    sent = em.commands
+    assert sent
+    mrx.update()
+    assert em.commands == sent
+    # The reply to a set command refreshes the field it changes.
+    mrx.volume_set(-30)
+    mrx.update()
+    assert em.commands == sent + 1
+    assert mrx.status['1'].volume == -30
+    # A field that is invalidated is queried again, and only that one.
+    mrx.status['1'].invalidate('mute')
+    mrx.update()
+    assert em.commands == sent + 2
+    mrx.update(force=True)
+    assert em.commands == sent + 6
+
+
+def test_update_without_ttl_always_queries(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10')
+    mrx.update()
+    sent = em.commands
+    mrx.update()
+    mrx.update()
+    assert em.commands == sent + 8
+
+
+class CountingCache(DiskCache):
+    """DiskCache that counts its reads."""
+
+    def __init__(self, path=None):
+        super().__init__(path)
+        self.reads = 0
+
+    def get(self, section, key, default=None):
+        self.reads += 1
+        return super().get(section, key, default)
+
+
+@pytest.mark.parametrize('model', ['x10', 'x20'])
+def test_source_names_are_read_and_cached(emulator, model):
+    em = emulator(model)
+    store = CountingCache()
+    mrx = AnthemAV(em.host, em.port, model=model, cache=store)
+    assert store.reads == 0
+    mrx.update()
+    # Long names, not the eight character ones.
+    assert mrx.sources['2'] == 'Cable/Sat'
+    assert mrx.sources['4'] == 'Media Player'
+    mrx.source_set('Media Player')
+    mrx.update(force=True)
+    assert mrx.status['1'].source == '4'
+    # A restart uses the cached names and only checks the input count.
+    sent = em.commands
+    mrx = AnthemAV(em.host, em.port, model=model, cache=store)
+    assert mrx.sources['4'] == 'Media Player'
+    assert mrx.discover_sources() == mrx.sources
+    assert em.commands == sent + 1
+    em.sources.append('Stream')
+    assert mrx.discover_sources()['10'] == 'Stream'
+    assert em.commands == sent + 2 + len(em.sources)
+
+
+def test_close_stops_the_listener(emulator):
+    em = emulator('x10')
+    with AnthemAV(em.host, em.port, model='x10') as mrx:
+        mrx.listen()
+        mrx.update()
+        assert connected_clients(em, 1) == 1
+    assert mrx._listener is None
+    time.sleep(0.6)
+    assert connected_clients(em, 0) == 0
+
+
+def test_rejected_command_leaves_the_status(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10')
+    mrx.update()
+    changes = []
+    mrx.subscribe(lambda *change: changes.append(change))
+    mrx._update_status('!RZ1VOL20')
+    mrx._update_status('!RZ1POW2')
+    assert mrx.status['1'].volume == -35
+    assert mrx.status['1'].power is True
+    assert changes == []
+
+
+def test_other_fields_are_kept_as_extras():
+    mrx = AnthemAV('192.0.2.1', 4999, model='x10')
+    changes = []
+    mrx.subscribe(lambda *change: changes.append(change))
+    mrx._update_status('Z1ALM03')
+    mrx._update_status('Z1ALM03')
+    assert mrx.status['1'].extras == {'listening_mode': '03'}
+    assert mrx.status['1'].get('listening_mode') == '03'
+    assert changes == [('1', 'listening_mode', '03')]
+
+
+def test_import_does_not_load_asyncio():
+    code = ('import sys, anthemav.anthemav, anthemav.cli; '
+            'print("asyncio" in sys.modules)')
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.split() == [b'False']
@@ -0,0 +1,59 @@
+import os
+import json
+
+from anthemav import cache
+from anthemav.cache import DiskCache
+
+
+def test_memory_only():
+    store = DiskCache()
+    assert store.get('a:1/x10', 'sources') is None
+    assert store.get('a:1/x10', 'sources', {}) == {}
+    store.set('a:1/x10', 'sources', {'1': 'TV'})
+    assert store.get('a:1/x10', 'sources') == {'1': 'TV'}
+    store.delete('a:1/x10', 'sources')
+    assert store.get('a:1/x10', 'sources') is None
+
+
+def test_file_is_written_and_read_back(tmp_path):
+    path = str(tmp_path / 'anthemav' / 'receivers.json')
+    store = DiskCache(path)
+    store.set('a:1', 'model', 'x20')
+    store.set('a:1/x20', 'sources', {'1': 'Blu-ray'})
+    with open(path) as handle:
+        assert json.load(handle) == {'a:1': {'model': 'x20'},
+                                     'a:1/x20': {'sources': {'1': 'Blu-ray'}}}
+    assert os.listdir(os.path.dirname(path)) == ['receivers.json']
+    again = DiskCache(path)
+    assert again.get('a:1', 'model') == 'x20'
+    again.delete('a:1/x20')
+    assert DiskCache(path).get('a:1/x20', 'sources') is None
+
+
+def test_file_is_read_on_first_use(tmp_path):
+    path = tmp_path / 'receivers.json'
+    store = DiskCache(str(path))
+    path.write_text('{"a:1": {"model": "x10"}}')
+    assert store.get('a:1', 'model') == 'x10'
+    path.write_text('{"a:1": {"model": "x00"}}')
+    assert store.get('a:1', 'model') == 'x10'
+
+
+def test_unreadable_file_is_ignored(tmp_path):
+    path = tmp_path / 'receivers.json'
+    path.write_text('{not json')
+    store = DiskCache(str(path))
+    assert store.get('a:1', 'model') is None
+    store.set('a:1', 'model', 'x10')
+    assert json.loads(path.read_text()) == {'a:1': {'model': 'x10'}}
+
+
+def test_default_path(monkeypatch, tmp_path):
+    monkeypatch.setenv(cache.CACHE_ENV, '')
+    assert cache.default_path() is None
+    monkeypatch.setenv(cache.CACHE_ENV, '/tmp/receivers.json')
+    assert cache.default_path() == '/tmp/receivers.json'
+    monkeypatch.delenv(cache.CACHE_ENV)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert cache.default_path() == str(
+        tmp_path / 'anthemav' / 'receivers.json')
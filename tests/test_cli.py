@@ -0,0 +1,140 @@
+import io
+import json
+
+import pytest
+
+from anthemav import cli
+from anthemav.anthemav import AnthemAV
+from anthemav.cli import CommandError, main, run_batch, split_zone, translate
+
+
+@pytest.fixture
+def x10(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10', persistent=True)
+    yield em, mrx
+    mrx.close()
+
+
+def args(em, *words):
+    return ['--host', em.host, '--port', str(em.port)] + list(words)
+
+
+def test_split_zone():
+    assert split_zone(['power', 'on', '--zone', '2'], '1') == (
+        ['power', 'on'], '2')
+    assert split_zone(['mute', '--zone=3', 'on'], '1') == (['mute', 'on'], '3')
+    assert split_zone(['status'], 1) == (['status'], '1')
+    with pytest.raises(CommandError):
+        split_zone(['power', 'on', '-z'], '1')
+
+
+@pytest.mark.parametrize('words,expected', [
+    (['power', 'on'], ('PowerOn', {})),
+    (['MUTE', 'Toggle'], ('MuteToggle', {})),
+    (['volume', 'up'], ('VolumeUp', {})),
+    (['volume', '-35'], ('VolumeSet', {'volume': -35})),
+    (['volume', '-35.5'], ('VolumeSet', {'volume': -35.5})),
+    (['source', '3'], ('SourceSet', {'source': '3'})),
+    (['source', 'Media', 'Player'], ('SourceSet', {'source': '4'})),
+    (['send', 'VolumeUpBy', 'step=3'], ('VolumeUpBy', {'step': '3'})),
+])
+def test_translate(x10, words, expected):
+    assert translate(x10[1], words) == expected
+
+
+@pytest.mark.parametrize('words', [
+    [], ['power'], ['volume', 'loud'], ['send', 'VolumeUpBy', '3'],
+    ['send', 'NoSuchCommand'], ['dance'],
+])
+def test_translate_errors(x10, words):
+    with pytest.raises(CommandError):
+        translate(x10[1], words)
+
+
+def test_run_batch(x10, capsys):
+    em, mrx = x10
+    lines = ['# scene', 'power on --zone 2', 'volume -42 --zone 2',
+             'volume loud', 'status --zone 2', 'mute on']
+    assert run_batch(mrx, lines, '1', window=16, name='scene') == 1
+    out, err = capsys.readouterr()
+    assert err == "scene:4: not a volume: 'loud'\n"
+    assert json.loads(out) == {'power': True, 'volume': -42, 'mute': False,
+                               'source': '1', 'zone': '2'}
+    assert em.zones['1'].mute
+
+
+def test_main(emulator, capsys):
+    em = emulator('x10')
+    assert main(args(em, '--model', 'x10', 'volume', '-30')) == 0
+    assert em.zones['1'].volume == -30
+    assert main(args(em, 'status', '--model', 'x10')) == 0
+    assert json.loads(capsys.readouterr()[0])['volume'] == -30
+
+
+def test_source_name_with_auto_model(emulator):
+    em = emulator('x20')
+    assert main(args(em, 'source', 'Cable/Sat')) == 0
+    assert em.zones['1'].source == '2'
+
+
+def test_main_errors(emulator, capsys):
+    em = emulator('x10')
+    with pytest.raises(SystemExit):
+        main(args(em, 'volume', 'loud'))
+    with pytest.raises(SystemExit):
+        main(args(em, 'status', 'now'))
+    assert main(['--host', '127.0.0.1', '--port', '1', '--model', 'x10',
+                 'power', 'on']) == 1
+
+
+def test_unanswered_commands_fail(emulator, capsys):
+    em = emulator('x10', drop_rate=1)
+    assert main(args(em, '--model', 'x10', 'power', 'on')) == 1
+    assert capsys.readouterr()[1] == 'anthemav: no reply from the receiver\n'
+    assert main(args(em, '--model', 'x10', 'status')) == 1
+    mrx = AnthemAV(em.host, em.port, model='x10', persistent=True)
+    try:
+        assert run_batch(mrx, ['power on', 'mute on'], '1', name='b') == 2
+    finally:
+        mrx.close()
+    assert capsys.readouterr()[1].splitlines()[-2:] == [
+        'b:1: no reply from the receiver', 'b:2: no reply from the receiver']
+
+
+def test_refused_commands_fail(emulator, capsys, tmp_path):
+    em = emulator('x10')
+    assert main(args(em, '--model', 'x00', 'power', 'on')) == 1
+    assert 'refused by the receiver: !I' in capsys.readouterr()[1]
+    batch = tmp_path / 'scene'
+    batch.write_text('power on\n')
+    assert main(args(em, '--model', 'x00', 'batch', str(batch))) == 1
+    assert capsys.readouterr()[1].startswith(
+        '{}:1: refused by the receiver: !I'.format(batch))
+    batch.write_text('power on\nstatus\n')
+    assert main(args(em, '--model', 'x10', 'batch', str(batch))) == 0
+
+
+class Terminal(io.StringIO):
+
+    def isatty(self):
+        return True
+
+
+def test_interactive(emulator, monkeypatch, capsys):
+    em = emulator('x10')
+    lines = iter(['power on --zone 2', 'volume loud', 'mute on'])
+    prompts = []
+
+    def read(prompt):
+        prompts.append(prompt)
+        line = next(lines, None)
+        if line is None:
+            raise EOFError
+        return line
+    monkeypatch.setattr(cli, 'input', read, raising=False)
+    monkeypatch.setattr('sys.stdin', Terminal())
+    assert main(args(em, '--model', 'x10')) == 0
+    assert prompts == ['anthemav> '] * 4
+    assert capsys.readouterr()[1] == "<stdin>:2: not a volume: 'loud'\n"
+    assert em.zones['2'].power and em.zones['1'].mute
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from anthemav.anthemav import AnthemAV
+from anthemav.commandqueue import (BACKGROUND, INTERACTIVE, CommandQueue,
+                                   queueing)
+
+
+def test_priority_then_order():
+    queue = CommandQueue()
+    queue.push('Z1POW?;', priority=BACKGROUND)
+    queue.push('Z1VOL?;', priority=BACKGROUND)
+    queue.push('Z1MUT1;')
+    assert len(queue) == 3
+    assert [queue.pop().payload for _ in range(3)] == [
+        'Z1MUT1;', 'Z1POW?;', 'Z1VOL?;']
+    assert queue.pop() is None
+
+
+def test_identical_queries_share_an_entry():
+    queue = CommandQueue()
+    first = queue.push('Z1POW?;', key='Z1POW?;')
+    assert queue.push('Z1POW?;', key='Z1POW?;') is first
+    assert len(queue) == 1
+    # Also while it is in flight.
+    entry = queue.pop()
+    assert queue.push('Z1POW?;', key='Z1POW?;') is entry
+    queue.done(entry, 'Z1POW1')
+    assert entry.done and entry.result == 'Z1POW1'
+    # Once answered, the next push is sent again.
+    assert queue.push('Z1POW?;', key='Z1POW?;') is not entry
+
+
+def test_queued_set_is_superseded():
+    queue = CommandQueue()
+    first = queue.push('Z1VOL-40;', key=('VolumeSet', '1'), supersede=True)
+    assert queue.push('Z1VOL-30;', key=('VolumeSet', '1'),
+                      supersede=True) is first
+    assert len(queue) == 1
+    assert queue.pop().payload == 'Z1VOL-30;'
+    # A set that is in flight is not changed; the new one is queued.
+    second = queue.push('Z1VOL-20;', key=('VolumeSet', '1'),
+                        supersede=True)
+    assert second is not first
+    assert queue.pop().payload == 'Z1VOL-20;'
+
+
+@pytest.mark.parametrize('cmd,zone,payload,expected', [
+    ('PowerQuery', '1', 'Z1POW?;', (BACKGROUND, 'Z1POW?;', False)),
+    ('VolumeSet', '2', 'Z2VOL-30;', (INTERACTIVE, ('VolumeSet', '2'), True)),
+    ('MuteOn', '1', 'Z1MUT1;', (INTERACTIVE, None, False)),
+])
+def test_queueing(cmd, zone, payload, expected):
+    assert queueing(cmd, zone, payload) == expected
+
+
+def test_concurrent_senders(emulator):
+    em = emulator('x10', latency=0.01)
+    mrx = AnthemAV(em.host, em.port, model='x10', persistent=True)
+    threads = [threading.Thread(target=mrx.update) for _ in range(8)]
+    threads += [threading.Thread(target=mrx.volume_set, args=(-30 - i,))
+                for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not mrx._sending and len(mrx._queue) == 0
+    # Polls were shared and volume sets superseded, so fewer went out.
+    assert em.commands < 8 * 4 + 8
+    mrx.close()
+
+
+def test_failed_send_releases_the_queue(emulator, monkeypatch):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10')
+    send = mrx._send_queued
+    calls = []
+
+    def fail_once(payload, count):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise ValueError('broken')
+        return send(payload, count)
+    monkeypatch.setattr(mrx, '_send_queued', fail_once)
+    with pytest.raises(ValueError):
+        mrx.send_command('PowerQuery', '1')
+    assert not mrx._sending
+    mrx.send_command('PowerQuery', '1')
+    assert mrx.status['1'].power is True
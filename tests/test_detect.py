@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from anthemav import detect
+from anthemav.aio import AsyncAnthemAV, async_detect_model
+from anthemav.anthemav import AnthemAV
+from anthemav.cache import DiskCache
+from anthemav.detect import (PROBES, detect_model, known_model,
+                             model_from_responses)
+
+IDQ, P1 = PROBES[0][0], PROBES[1][0]
+
+
+@pytest.fixture(autouse=True)
+def models(monkeypatch):
+    """Forget the models found by other tests."""
+    monkeypatch.setattr(detect, '_MODELS', {})
+
+
+@pytest.mark.parametrize('probe,responses,expected', [
+    (IDQ, ['IDQMRX 710 US 1.1.9, Apr 16 2014', 'IDH1.0'], ('x10', True)),
+    (IDQ, ['IDQMRX 1120 US'], ('x20', True)),
+    (IDQ, ['IDQAVM 60 US'], ('x20', True)),
+    (IDQ, ['!Z1IDQ?'], ('x10', False)),
+    (IDQ, ['IDQMRX 7'], (None, False)),
+    (IDQ, ['IDQMRX 990'], (None, False)),
+    (IDQ, [], (None, False)),
+    (P1, ['P1P1S2V-35.0M0D0E0'], ('x00', True)),
+    (P1, [], (None, False)),
+])
+def test_model_from_responses(probe, responses, expected):
+    assert model_from_responses(probe, responses) == expected
+
+
+@pytest.mark.parametrize('model', ['x00', 'x10', 'x20'])
+def test_detect_model(emulator, model):
+    em = emulator(model)
+    cache = DiskCache()
+    assert detect_model(em.host, em.port, 1, cache) == model
+    assert known_model(em.host, em.port, cache) == model
+    # Known models are not probed again, also after a restart.
+    sent = em.commands
+    detect._MODELS.clear()
+    assert detect_model(em.host, em.port, 1, cache) == model
+    assert em.commands == sent
+
+
+def test_detect_model_unanswered():
+    cache = DiskCache()
+    assert detect_model('127.0.0.1', 1, 0.5, cache) is None
+    assert known_model('127.0.0.1', 1, cache) is None
+
+
+def test_async_detect_model(emulator):
+    em = emulator('x20')
+    model = asyncio.run(async_detect_model(em.host, em.port, 1, DiskCache()))
+    assert model == 'x20'
+
+
+def test_auto_is_probed_on_first_use(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='auto', cache=DiskCache())
+    assert mrx.model == 'auto'
+    assert em.commands == 0
+    mrx.update()
+    assert mrx.model == 'x10'
+    assert mrx.status['1'].power is True
+
+
+def test_auto_is_probed_again_after_a_failure(emulator, monkeypatch):
+    em = emulator('x10')
+    answers = [None, 'x10']
+    monkeypatch.setattr('anthemav.anthemav.detect_model',
+                        lambda *args: answers.pop(0))
+    mrx = AnthemAV(em.host, em.port, model='auto', cache=DiskCache())
+    assert mrx.update() == {}
+    assert mrx.model == 'auto'
+    assert mrx.connect() is False
+    # Not probed again within the backoff.
+    assert answers == ['x10']
+    mrx._next_connect = 0
+    mrx.update()
+    assert mrx.model == 'x10'
+    assert mrx.status['1'].power is True
+
+
+def test_async_auto_stays_auto_when_unanswered():
+    async def run():
+        mrx = AsyncAnthemAV('127.0.0.1', 1, model='auto', cache=DiskCache())
+        mrx._timeout = 0.5
+        assert await mrx.connect() is False
+        assert await mrx.resolve_model() == 'auto'
+        assert mrx._detecting is None
+        assert await mrx.send_payload('Z1POW?;') is None
+
+    asyncio.run(run())
+
+
+def test_auto_uses_a_known_model(emulator):
+    em = emulator('x20')
+    cache = DiskCache()
+    cache.set('{}:{}'.format(em.host, em.port), 'model', 'x20')
+    assert AnthemAV(em.host, em.port, model='auto', cache=cache).model == \
+        'x20'
+    assert AsyncAnthemAV(em.host, em.port, model='auto',
+                         cache=cache).model == 'x20'
@@ -0,0 +1,80 @@
+import asyncio
+import socket
+
+import pytest
+
+from anthemav.emulator import AnthemEmulator, compile_grammar
+
+
+def test_grammar_prefers_fixed_text():
+    grammar = compile_grammar('x10')
+    cmd = next(cmd for regex, cmd in grammar if regex.match('Z1MUT1'))
+    assert cmd == 'MuteOn'
+
+
+@pytest.mark.parametrize('model,commands,responses', [
+    ('x00', ['P1?', 'P1V-40', 'P1V?', 'P2V?', 'P1M?', 'P1X'],
+     ['P1S1V-35M0D0', 'P1VM-40', 'P1VM-40', 'Zone2 Off', 'P1M0',
+      'Invalid Command']),
+    ('x10', ['Z1POW?', 'Z1VOL-40', 'Z1VUP2', 'Z2VOL?', 'Z1VOL99', 'ICN?',
+             'ISN01?', 'IDQ?', 'Z1XYZ?'],
+     ['Z1POW1', 'Z1VOL-40', 'Z1VOL-38', '!ZZ2VOL?', 'Z1VOL10', 'ICN9',
+      'ISN01Blu-ray', 'IDQMRX 710 US 1.1.9, Apr 16 2014', '!IZ1XYZ?']),
+    ('x20', ['ILN04?', 'IDQ?'],
+     ['ILN04Media Player', 'IDQMRX 720 US 1.1.9, Apr 16 2014']),
+])
+def test_responses(model, commands, responses):
+    emulator = AnthemEmulator(model)
+    assert [r for command in commands
+            for r in emulator.handle(command)] == responses
+    assert emulator.commands == len(commands)
+
+
+def exchange(host, port, data, size):
+    with socket.create_connection((host, port), 2) as sock:
+        sock.sendall(data)
+        received = b''
+        while len(received) < size:
+            received += sock.recv(1024)
+    return received
+
+
+def test_serves_tcp(emulator):
+    em = emulator('x10')
+    assert exchange(em.host, em.port, b'Z1POW?;Z1MUT?;', 14) == \
+        b'Z1POW1;Z1MUT0;'
+    em = emulator('x00')
+    assert exchange(em.host, em.port, b'P1P?\n', 5) == b'P1P1\n'
+
+
+def test_dropped_responses():
+    emulator = AnthemEmulator('x10', drop_rate=1)
+
+    async def main():
+        await emulator.start()
+        reader, writer = await asyncio.open_connection(emulator.host,
+                                                       emulator.port)
+        writer.write(b'Z1POW?;')
+        try:
+            return await asyncio.wait_for(reader.read(100), 0.2)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            writer.close()
+            await emulator.stop()
+    assert asyncio.run(main()) is None
+
+
+def test_unsolicited_events():
+    emulator = AnthemEmulator('x10', event_rate=50, seed=1)
+
+    async def main():
+        await emulator.start()
+        reader, writer = await asyncio.open_connection(emulator.host,
+                                                       emulator.port)
+        try:
+            return await asyncio.wait_for(reader.readuntil(b';'), 2)
+        finally:
+            writer.close()
+            await emulator.stop()
+    assert asyncio.run(main())[:2] in (b'Z1', b'Z2')
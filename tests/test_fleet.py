@@ -0,0 +1,110 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from anthemav.anthemav import AnthemAV
+from anthemav.emulator import AnthemEmulator
+from anthemav.fleet import Fleet
+from anthemav.health import CircuitBreaker, CircuitOpenError
+
+
+def run_fleet(scenario, models=('x10', 'x00'), **kwargs):
+    """Run scenario(fleet, emulators) with an emulator per model."""
+    async def main():
+        emulators = [AnthemEmulator(model) for model in models]
+        for emulator in emulators:
+            await emulator.start()
+        fleet = Fleet(**kwargs)
+        try:
+            return await scenario(fleet, emulators)
+        finally:
+            fleet.close()
+            for emulator in emulators:
+                await emulator.stop()
+    return asyncio.run(main())
+
+
+def test_refresh_and_command():
+    async def scenario(fleet, emulators):
+        for emulator in emulators:
+            fleet.add(emulator.host, emulator.port, model=emulator.model,
+                      name=emulator.model)
+        refreshed = await fleet.refresh()
+        commanded = await fleet.send_command('MuteOn', zone=1)
+        return refreshed, commanded
+    refreshed, commanded = run_fleet(scenario)
+    assert list(refreshed) == ['x10', 'x00']
+    assert all(result.ok for result in refreshed.values())
+    assert refreshed['x10'].result['1'].volume == -35
+    assert commanded['x00'].result['1'].mute is True
+
+
+def test_failures_are_reported_per_receiver():
+    async def scenario(fleet, emulators):
+        fleet.add(emulators[0].host, emulators[0].port, model='x10',
+                  name='ok')
+        fleet.add('127.0.0.1', 1, model='x10', name='refused')
+        fleet['refused']._timeout = 0.2
+        fleet.add('127.0.0.1', 2, model='x10', name='open',
+                  breaker=CircuitBreaker(threshold=1))
+        fleet['open'].breaker.record(False)
+        return await fleet.refresh()
+    results = run_fleet(scenario, models=('x10',), timeout=1)
+    assert results['ok'].ok
+    assert isinstance(results['refused'].error, ConnectionError)
+    assert isinstance(results['open'].error, CircuitOpenError)
+
+
+def test_silent_receiver_times_out():
+    async def scenario(fleet, emulators):
+        emulators[0].drop_rate = 1
+        fleet.add(emulators[0].host, emulators[0].port, model='x10')
+        return await fleet.refresh()
+    result, = run_fleet(scenario, models=('x10',), timeout=0.3).values()
+    assert isinstance(result.error, TimeoutError)
+
+
+def test_duplicate_name():
+    fleet = Fleet()
+    fleet.add('192.0.2.1', 4999, model='x10')
+    with pytest.raises(ValueError):
+        fleet.add('192.0.2.1', 4999, model='x10')
+    fleet.remove('192.0.2.1:4999')
+    assert len(fleet) == 0
+
+
+def test_sync_receivers_use_bounded_threads():
+    lock = threading.Lock()
+    running = []
+    threads = set()
+    peak = [0]
+
+    def hang(name, receiver):
+        with lock:
+            running.append(name)
+            threads.add(threading.current_thread().name)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.4)
+        with lock:
+            running.remove(name)
+
+    async def scenario(fleet, emulators):
+        for number in range(3):
+            fleet.add(emulators[0].host, emulators[0].port, model='x10',
+                      name=str(number))
+        return await fleet.run(hang)
+    results = run_fleet(scenario, models=('x10',), cls=AnthemAV,
+                        concurrency=2, timeout=0.2)
+    assert all(isinstance(result.error, TimeoutError)
+               for result in results.values())
+    # Calls that timed out kept their thread and slot until they returned,
+    # so no more than concurrency ran at once.
+    assert peak[0] == 2
+    assert len(threads) == 2
+    assert all(name.startswith('anthemav-fleet') for name in threads)
+
+
+def test_last_response_time():
+    assert AnthemAV('192.0.2.1', 4999, model='x10')._lastupdatetime == 0
@@ -0,0 +1,47 @@
+from anthemav.framer import Framer
+
+
+def test_splits_responses():
+    framer = Framer()
+    assert framer.feed(b'Z1POW1;Z1VOL-35;Z1MUT0;') == [
+        'Z1POW1', 'Z1VOL-35', 'Z1MUT0']
+    assert len(framer) == 0
+
+
+def test_line_endings():
+    framer = Framer()
+    assert framer.feed(b'P1S1V-35M0D0\r\nP2P0\n') == [
+        'P1S1V-35M0D0', 'P2P0']
+
+
+def test_partial_response_is_buffered():
+    framer = Framer()
+    assert framer.feed(b'Z1PO') == []
+    assert len(framer) == 4
+    assert framer.feed(b'W1;Z1V') == ['Z1POW1']
+    assert framer.feed(b'OL-35;') == ['Z1VOL-35']
+    assert len(framer) == 0
+
+
+def test_empty_frames_are_skipped():
+    framer = Framer()
+    assert framer.feed(b';;Z1POW1;\r\n') == ['Z1POW1']
+
+
+def test_clear():
+    framer = Framer()
+    framer.feed(b'Z1PO')
+    framer.clear()
+    assert framer.feed(b'Z1MUT1;') == ['Z1MUT1']
+
+
+def test_overflow_is_discarded():
+    framer = Framer(max_size=8)
+    assert framer.feed(b'0123456789') == []
+    assert len(framer) == 0
+    assert framer.feed(b'Z1POW1;') == ['Z1POW1']
+
+
+def test_undecodable_bytes_are_replaced():
+    framer = Framer()
+    assert framer.feed(b'ILN01Caf\xe9;') == ['ILN01Caf�']
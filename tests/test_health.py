@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from anthemav import health
+from anthemav.aio import AsyncAnthemAV
+from anthemav.anthemav import AnthemAV
+from anthemav.health import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                             get_breaker)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(health.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    breaker.record(False)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.failures == 2
+    assert not breaker.allow()
+
+
+def test_success_resets_failures(clock):
+    breaker = CircuitBreaker(threshold=2)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record(False)
+    clock[0] += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_reset(clock):
+    breaker = CircuitBreaker(threshold=1)
+    breaker.record(False)
+    breaker.reset()
+    assert breaker.state == CLOSED
+
+
+def test_breakers_are_per_receiver_unless_given():
+    first = AnthemAV('192.0.2.1', 4999, model='x10')
+    second = AsyncAnthemAV('192.0.2.1', 4999, model='x10')
+    assert first.breaker is second.breaker
+    assert first.breaker is get_breaker('192.0.2.1', 4999)
+    assert AnthemAV('192.0.2.2', 4999, model='x10').breaker is not \
+        first.breaker
+    own = CircuitBreaker()
+    assert AnthemAV('192.0.2.1', 4999, model='x10',
+                    breaker=own).breaker is own
+
+
+def open_breaker():
+    breaker = CircuitBreaker(threshold=1)
+    breaker.record(False)
+    return breaker
+
+
+def test_clients_refuse_alike_while_open(emulator):
+    em = emulator('x10')
+    mrx = AnthemAV(em.host, em.port, model='x10', breaker=open_breaker())
+    assert not mrx.available
+    assert mrx.send_command('PowerOff', '1') == {}
+    assert mrx.update() == {}
+
+    async def main():
+        mrx = AsyncAnthemAV(em.host, em.port, model='x10',
+                            breaker=open_breaker())
+        status = await mrx.send_command('PowerOff', '1')
+        return status, await mrx.update()
+    assert asyncio.run(main()) == ({}, {})
+    assert em.commands == 0
+
+
+def test_available_during_reconnect_backoff():
+    mrx = AnthemAV('127.0.0.1', 1, model='x10', persistent=True)
+    mrx._timeout = 0.2
+    assert mrx.available
+    assert not mrx.connect()
+    assert mrx.breaker.state == CLOSED
+    assert not mrx.available
+    mrx._next_connect = 0
+    assert mrx.available
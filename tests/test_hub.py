@@ -0,0 +1,60 @@
+import pytest
+
+from anthemav.aio import AsyncAnthemAV
+from anthemav.hub import close_hubs, get_hub, get_zone
+
+
+@pytest.fixture(autouse=True)
+def hubs():
+    yield
+    close_hubs()
+
+
+def test_zones_share_one_receiver(emulator):
+    em = emulator('x10')
+    main = get_zone(em.host, em.port, 1, model='x10')
+    zone2 = get_zone(em.host, em.port, 2, model='x10')
+    assert main.hub is zone2.hub
+    assert main.hub._persistent
+    zone2.power_set(True)
+    zone2.volume_set(-40)
+    main.update()
+    zone2.update()
+    assert main.volume == -35
+    assert zone2.volume == -40
+    assert main.hub._connections == 1
+
+
+def test_zone_subscription(emulator):
+    em = emulator('x10')
+    main = get_zone(em.host, em.port, 1, model='x10')
+    zone2 = get_zone(em.host, em.port, 2, model='x10')
+    changes = []
+    zone2.subscribe(lambda field, value: changes.append((field, value)))
+    main.mute_set(True)
+    zone2.power_set(True)
+    assert ('power', True) in changes
+    assert ('mute', True) not in changes
+
+
+def test_status_of_unseen_zone():
+    zone = get_zone('192.0.2.1', 4999, 3, model='x10')
+    assert zone.status.zone == '3'
+    assert zone.power is None
+
+
+def test_hub_per_class():
+    assert get_hub('192.0.2.1', 4999, model='x10') is \
+        get_hub('192.0.2.1', 4999, model='x10')
+    assert isinstance(get_hub('192.0.2.1', 4999, model='x10',
+                              cls=AsyncAnthemAV), AsyncAnthemAV)
+
+
+def test_other_model_is_refused():
+    get_hub('192.0.2.1', 4999, model='x10')
+    with pytest.raises(ValueError):
+        get_hub('192.0.2.1', 4999, model='x20')
+    with pytest.raises(ValueError):
+        get_zone('192.0.2.1', 4999, 2, model='x10', ttl=5)
+    close_hubs()
+    assert get_hub('192.0.2.1', 4999, model='x20').model == 'x20'
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from anthemav.aio import AsyncAnthemAV
+from anthemav.anthemav import AnthemAV
+from anthemav.emulator import AnthemEmulator
+from anthemav.metrics import NULL_METRICS, Metrics
+
+
+def test_counters_and_gauges():
+    metrics = Metrics()
+    metrics.inc('requests_total', host='a')
+    metrics.inc('requests_total', 2, host='a')
+    metrics.inc('requests_total', host='b"c')
+    metrics.gauge('depth', 3, host='a')
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {'requests_total{host="a"}': 3,
+                                    'requests_total{host="b\\"c"}': 1}
+    assert snapshot['gauges'] == {'depth{host="a"}': 3}
+
+
+def test_histogram():
+    metrics = Metrics(buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 5):
+        metrics.observe('latency_seconds', value, host='a')
+    histogram = metrics.snapshot()['histograms']['latency_seconds{host="a"}']
+    assert histogram['buckets'] == {0.1: 1, 1: 2, '+Inf': 1}
+    assert histogram['count'] == 4
+    assert histogram['sum'] == pytest.approx(6.25)
+    text = metrics.prometheus()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{host="a",le="1"} 3' in text
+    assert 'latency_seconds_bucket{host="a",le="+Inf"} 4' in text
+
+
+def test_series_without_labels():
+    metrics = Metrics(buckets=(1,))
+    metrics.inc('requests_total')
+    metrics.observe('latency_seconds', 0.5)
+    metrics.observe('latency_seconds', 0.5, host='a')
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {'requests_total': 1}
+    assert snapshot['histograms']['latency_seconds']['count'] == 1
+    text = metrics.prometheus()
+    assert 'latency_seconds_bucket{le="1"} 1' in text
+    assert 'latency_seconds_count 1' in text
+    assert 'latency_seconds_count{host="a"} 1' in text
+
+
+def test_null_metrics():
+    assert not NULL_METRICS.enabled
+    NULL_METRICS.inc('x')
+    NULL_METRICS.observe('y', 1)
+    assert NULL_METRICS.snapshot() == {'counters': {}, 'gauges': {},
+                                       'histograms': {}}
+
+
+def counter(metrics, name, label):
+    return metrics.snapshot()['counters'].get(
+        '{}{{host="{}"}}'.format(name, label), 0)
+
+
+@pytest.mark.parametrize('listen', [False, True])
+def test_client_counts(emulator, listen):
+    em = emulator('x10')
+    metrics = Metrics()
+    mrx = AnthemAV(em.host, em.port, model='x10', persistent=True,
+                   metrics=metrics)
+    if listen:
+        mrx.listen()
+    mrx.send_command('PowerQuery', '1')
+    mrx.stop_listening()
+    mrx.close()
+    label = mrx._label
+    assert counter(metrics, 'anthemav_bytes_sent_total', label) == 7
+    assert counter(metrics, 'anthemav_bytes_received_total', label) == 7
+    assert '# TYPE anthemav_round_trip_seconds histogram' in \
+        metrics.prometheus()
+
+
+@pytest.mark.parametrize('listen', [False, True])
+def test_unanswered_writes_are_counted(emulator, listen):
+    em = emulator('x10', drop_rate=1)
+    metrics = Metrics()
+    mrx = AnthemAV(em.host, em.port, model='x10', persistent=True,
+                   metrics=metrics)
+    mrx._timeout = 0.2
+    if listen:
+        mrx.listen()
+    mrx.send_command('PowerQuery', '1')
+    mrx.stop_listening()
+    mrx.close()
+    label = mrx._label
+    assert counter(metrics, 'anthemav_bytes_sent_total', label) == 7
+    assert counter(metrics, 'anthemav_timeouts_total', label) == 1
+
+
+def test_async_unanswered_writes_are_counted():
+    async def main():
+        emulator = AnthemEmulator('x10', drop_rate=1)
+        host, port = await emulator.start()
+        mrx = AsyncAnthemAV(host, port, model='x10', metrics=metrics)
+        mrx._timeout = 0.2
+        await mrx.send_command('PowerQuery', '1')
+        mrx.close()
+        await emulator.stop()
+        return mrx._label
+    metrics = Metrics()
+    label = asyncio.run(main())
+    assert counter(metrics, 'anthemav_bytes_sent_total', label) == 7
+    assert counter(metrics, 'anthemav_timeouts_total', label) == 1
@@ -0,0 +1,115 @@
+import re
+
+import pytest
+
+from anthemav.parser import get_parser
+from anthemav.protocols import get_protocol
+
+RESPONSES = {
+    'x00': ['P1S3V-35M0D0', 'P2S3V-40M1', 'P1VM-35', 'P2V-40', 'P1P1',
+            'P1D2', 'P1M1', 'Main Off', 'Zone2 Off'],
+    'x10': ['Z1POW1', 'Z1VOL-35', 'Z2INP3', 'Z1MUT1', '!ZZ1VOL?'],
+    'x20': ['Z1POW0', 'Z1VOL-20.5', 'Z2INP12', '!Z Z1POW?'],
+}
+
+
+def search_every_regex(model, response):
+    """The named groups of every table regex, as the old loop found them."""
+    parser = get_parser(model)
+    response = parser.standardise(response)
+    return [m.groupdict() for m in
+            (re.search(pattern, response)
+             for pattern in get_protocol(model).REGEX) if m]
+
+
+@pytest.mark.parametrize('model,response', [
+    (model, response) for model, responses in sorted(RESPONSES.items())
+    for response in responses])
+def test_dispatch_matches_every_regex_search(model, response):
+    parsed = get_parser(model).parse(response)
+    assert parsed
+    assert sorted(map(sorted, map(dict.items, parsed))) == sorted(
+        map(sorted, map(dict.items, search_every_regex(model, response))))
+
+
+def test_x00_zone_status():
+    assert get_parser('x00').parse('P1S3V-35M0D0') == [
+        {'zone': '1', 'source': '3'}, {'zone': '1', 'volume': '-35'},
+        {'zone': '1', 'mute': '0'}, {'zone': '1', 'decoder': '0'}]
+
+
+def test_x00_main_volume_is_not_read_as_volume_and_mute():
+    assert get_parser('x00').parse('P1VM-35') == [
+        {'zone': '1', 'volume': '-35'}]
+
+
+def test_standby_responses():
+    assert get_parser('x00').standardise('Main Off') == 'P1P0'
+    assert get_parser('x00').standardise('Zone2 Off') == 'P2P0'
+    assert get_parser('x10').standardise('!ZZ1VOL?') == 'Z1POW0'
+    assert get_parser('x10').parse('!ZZ2VOL?') == [
+        {'zone': '2', 'power': '0'}]
+
+
+def test_unknown_responses():
+    parser = get_parser('x10')
+    assert parser.parse('Z1XYZ') == []
+    assert parser.dispatch_pattern('Z1XYZ') is None
+    assert parser.parse('') == []
+
+
+@pytest.mark.parametrize('model,response', [
+    ('x10', '!RZ1VOL20'), ('x10', '!RZ1POW2'), ('x20', '!IZ1ALM99'),
+    ('x20', '!EZ1INP1'),
+])
+def test_error_replies_report_nothing(model, response):
+    assert get_parser(model).parse(response) == []
+
+
+def test_dispatch_pattern():
+    assert get_parser('x10').dispatch_pattern('Z1MUT1') == \
+        'Z(?P<zone>.).*?MUT(?P<mute>.)'
+
+
+def test_parsers_are_shared():
+    assert get_parser('x10') is get_parser('x10')
+    assert get_parser('x10') is not get_parser('x20')
+
+
+@pytest.mark.parametrize('model,command,key', [
+    ('x10', 'Z1VOL?', ('1', 'VOL', '')),
+    ('x10', 'Z1VOL-35', ('1', 'VOL', '')),
+    ('x10', 'Z1VUP1', ('1', 'VOL', '')),
+    ('x10', 'Z1VIR?', ('1', 'VIR', '')),
+    ('x10', 'Z1LEV5?', ('1', 'LEV', '5')),
+    ('x10', 'ILN01?', (None, 'ILN', '01')),
+    ('x10', 'IDQ?', (None, 'IDQ', '')),
+    ('x10', '!IZ1VIR?', ('1', 'VIR', '')),
+    ('x10', '!ZZ1VOL?', ('1', 'VOL', '')),
+    ('x00', 'P1V?', ('1', 'V', '')),
+    ('x00', 'P1VU', ('1', 'V', '')),
+    ('x00', 'P1MT', ('1', 'M', '')),
+    ('x00', 'P1MS?', ('1', 'MS', '')),
+    ('x00', 'P1?', ('1', '?', '')),
+])
+def test_command_key(model, command, key):
+    assert get_parser(model).command_key(command) == key
+
+
+@pytest.mark.parametrize('model,response,command,answers', [
+    ('x10', 'Z1VOL-35', 'Z1VOL?', True),
+    ('x10', 'Z1VOL-35', 'Z1VUP1', True),
+    ('x10', 'Z1VOL-35', 'Z1VIR?', False),
+    ('x10', 'Z1VOL-35', 'Z2VOL?', False),
+    ('x10', 'ILN01Blu-ray', 'ILN01?', True),
+    ('x10', 'ILN01Blu-ray', 'ILN02?', False),
+    ('x10', 'IDQMRX 710 US', 'IDQ?', True),
+    ('x10', 'IDQMRX 710 US', 'IDH?', False),
+    ('x00', 'P1VM-35', 'P1V?', True),
+    ('x00', 'P1M1', 'P1MT', True),
+    ('x00', 'P1M1', 'P1MS?', False),
+    ('x00', 'P1S1V-35M1D0', 'P1?', True),
+])
+def test_answers(model, response, command, answers):
+    parser = get_parser(model)
+    assert parser.answers(response, parser.command_key(command)) is answers
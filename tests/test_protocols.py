@@ -0,0 +1,70 @@
+import os
+import re
+import sys
+import subprocess
+
+import pytest
+
+from anthemav.anthem_api import api
+from anthemav.protocols import MODELS, decode, get_protocol
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def loaded_models(code):
+    """Return the protocol modules loaded by code in a new interpreter."""
+    output = subprocess.check_output([
+        sys.executable, '-c', code + '\nimport sys\nprint(sorted(\n'
+        '    m for m in sys.modules if m.startswith("anthemav.protocols.")))'
+    ], cwd=ROOT, universal_newlines=True)
+    return output.strip()
+
+
+def test_models_are_loaded_on_first_use():
+    assert loaded_models('import anthemav.anthemav, anthemav.aio, '
+                         'anthemav.anthem_api') == '[]'
+    assert loaded_models('from anthemav.anthem_api import api\n'
+                         'api["cmds"]["x10"]') == "['anthemav.protocols.x10']"
+
+
+def test_get_protocol():
+    assert get_protocol('x20') is get_protocol('x20')
+    assert get_protocol('x20').MODEL == 'x20'
+    with pytest.raises(KeyError):
+        get_protocol('x30')
+    assert list(api['cmds']) == list(MODELS)
+    assert api['cmds']['x00'] is get_protocol('x00').CMDS
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_tables(model):
+    protocol = get_protocol(model)
+    assert all(text.endswith(';') for text in protocol.CMDS.values())
+    for pattern in protocol.REGEX:
+        assert 'zone' in re.compile(pattern).groupindex
+
+
+def test_commands():
+    x10 = get_protocol('x10').CMDS
+    assert x10['VolumeUp'] == 'Z{zone}VUP1;'
+    assert x10['VolumeQuery'] == 'Z{zone}VOL?;'
+    assert x10['MuteQuery'] == 'Z{zone}MUT?;'
+    # Not in the x10 sheet, but answered by x10 receivers.
+    assert x10['SourceNameLongQuery'] == 'ILN{source_num}?;'
+    assert get_protocol('x00').CMDS['MuteQuery'] == 'P{zone}M?;'
+
+
+def test_decode():
+    assert decode('x10', 'listening_mode', '03') == 'PLIIx Movie'
+    assert decode('x10', 'listening_mode', '99') == '99'
+    assert decode('x00', 'volume', '-35') == '-35'
+
+
+def test_generated_modules_are_current():
+    pytest.importorskip('xlrd')
+    sys.path.insert(0, os.path.join(ROOT, 'tools'))
+    try:
+        import gen_protocol
+    finally:
+        sys.path.pop(0)
+    assert gen_protocol.main(['--check']) == 0
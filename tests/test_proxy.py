@@ -0,0 +1,74 @@
+import asyncio
+
+from anthemav.aio import AsyncAnthemAV
+from anthemav.emulator import AnthemEmulator
+from anthemav.metrics import Metrics
+from anthemav.proxy import AnthemProxy
+
+
+def run(scenario, model='x10', clients=2, **kwargs):
+    """Run scenario(emulator, proxy, clients) on a new loop."""
+    async def main():
+        emulator = AnthemEmulator(model)
+        host, port = await emulator.start()
+        proxy = AnthemProxy(host, port, **kwargs)
+        listen_host, listen_port = await proxy.start()
+        mrxs = [AsyncAnthemAV(listen_host, listen_port, model=model)
+                for _ in range(clients)]
+        try:
+            return await scenario(emulator, proxy, mrxs)
+        finally:
+            for mrx in mrxs:
+                mrx.close()
+            await proxy.stop()
+            await emulator.stop()
+    return asyncio.run(main())
+
+
+def test_listens_on_localhost_and_probes_the_model():
+    async def scenario(emulator, proxy, mrxs):
+        await mrxs[0].update()
+        return proxy.listen_host, proxy.upstream.model, mrxs[0].status['1']
+    host, model, state = run(scenario, model='x20', clients=1)
+    assert host == '127.0.0.1'
+    assert model == 'x20'
+    assert state.power is True and state.volume == -35
+
+
+def test_queries_are_answered_from_cache():
+    metrics = Metrics()
+
+    async def scenario(emulator, proxy, mrxs):
+        await mrxs[0].update(force=True)
+        sent = emulator.commands
+        await mrxs[1].update(force=True)
+        return emulator.commands - sent
+    assert run(scenario, model='x10', metrics=metrics) == 0
+    hits = sum(value for key, value in
+               metrics.snapshot()['counters'].items()
+               if key.startswith('anthemav_proxy_cache_hits_total'))
+    assert hits >= 4
+
+
+def test_set_replies_and_reports_go_to_every_client():
+    async def scenario(emulator, proxy, mrxs):
+        await mrxs[0].update(force=True)
+        changes = []
+        mrxs[1].subscribe(lambda zone, field, value: changes.append(
+            (zone, field, value)))
+        await mrxs[1].listen()
+        await mrxs[0].volume_set(-30)
+        await asyncio.sleep(0.1)
+        zone = emulator.zones['1']
+        zone.mute = 1
+        emulator.broadcast(emulator._report(zone, 'mute'))
+        await asyncio.sleep(0.1)
+        # The set reply and the report refreshed the cached replies.
+        sent = emulator.commands
+        replies = [await mrxs[0].send_payload('Z1VOL?;'),
+                   await mrxs[0].send_payload('Z1MUT?;')]
+        return changes, replies, emulator.commands - sent
+    changes, replies, sent = run(scenario)
+    assert changes == [('1', 'volume', -30), ('1', 'mute', True)]
+    assert replies == ['Z1VOL-30', 'Z1MUT1']
+    assert sent == 0
@@ -0,0 +1,86 @@
+import pytest
+
+from anthemav.state import FIELDS, ZoneState
+
+
+def test_new_state_is_empty():
+    state = ZoneState('1')
+    assert all(getattr(state, field) is None for field in FIELDS)
+    assert state.as_dict() == {}
+    assert state.updated('volume') == 0
+    assert repr(state) == "ZoneState('1')"
+
+
+def test_apply_converts_and_reports_changes():
+    state = ZoneState('1')
+    changed = state.apply({'power': '1', 'volume': '-35', 'mute': '0',
+                           'source': '3', 'zone': '1'}, 100)
+    assert changed == {'power': True, 'volume': -35, 'mute': False,
+                       'source': '3'}
+    assert state.updated('power') == 100
+    assert state.updated('decoder') == 0
+    # Only the fields that changed are reported, but all are stamped.
+    assert state.apply({'volume': '-34.5', 'mute': '0'}, 200) == {
+        'volume': -34.5}
+    assert state.updated('mute') == 200
+    assert state.apply({'volume': '?'}, 300) == {'volume': None}
+
+
+def test_get():
+    state = ZoneState('1')
+    state.apply({'mute': '0'}, 1)
+    assert state.get('mute') is False
+    assert state.get('volume', -90) == -90
+    assert state.get('zone', 'x') == 'x'
+    assert state.get('nonsense') is None
+
+
+def test_copy_diff_and_eq():
+    state = ZoneState('1')
+    state.apply({'power': '1', 'volume': '-35'}, 10)
+    copy = state.copy()
+    assert copy == state and copy is not state
+    assert copy.updated('power') == 10
+    copy.apply({'volume': '-30'}, 20)
+    assert state.updated('volume') == 10
+    assert copy != state
+    assert copy.diff(state) == {'volume': -30}
+    other = ZoneState('2')
+    other.apply({'power': '1', 'volume': '-35'}, 10)
+    assert not other.diff(state)
+    assert other != state
+    assert state != {'power': True, 'volume': -35}
+
+
+def test_extras():
+    state = ZoneState('1')
+    assert state.apply({'zone': '1', 'balance': '-2', 'mute': '1'}, 5) == {
+        'balance': '-2', 'mute': True}
+    assert state.extras == {'balance': '-2'}
+    assert state.apply({'balance': '-2'}, 6) == {}
+    assert state.as_dict() == {'mute': True, 'balance': '-2'}
+    assert state.get('balance') == '-2'
+    copy = state.copy()
+    copy.apply({'balance': '0'}, 7)
+    assert state.extras == {'balance': '-2'}
+    assert copy.diff(state) == {'balance': '0'}
+    assert ZoneState('1').diff(state) == {'mute': None, 'balance': None}
+    assert repr(state) == "ZoneState('1', mute=True, balance='-2')"
+
+
+def test_touch_and_invalidate():
+    state = ZoneState('1')
+    state.touch(('power', 'mute'), 50)
+    assert state.updated('power') == state.updated('mute') == 50
+    state.invalidate('power')
+    assert state.updated('power') == 0
+    assert state.updated('mute') == 50
+
+
+def test_slots():
+    state = ZoneState('1')
+    with pytest.raises(AttributeError):
+        state.bass = 3
+    state.apply({'decoder': '2'}, 1)
+    assert state.as_dict() == {'decoder': '2'}
+    assert repr(state) == "ZoneState('1', decoder='2')"
@@ -0,0 +1,158 @@
+import os
+import time
+import asyncio
+import threading
+
+import pytest
+
+from anthemav.aio import AsyncAnthemAV, FdTransport
+from anthemav.anthemav import AnthemAV
+from anthemav.transport import SerialBridge, SerialConnection, SerialTransport
+
+pty = pytest.importorskip('pty')
+tty = pytest.importorskip('tty')
+
+
+@pytest.fixture
+def pair():
+    """A raw pty pair, (master, slave), with a non-blocking master."""
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    yield master, slave
+    for fd in (master, slave):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def device(emulator, loop):
+    """Return start(model), which runs an emulator on a new pty."""
+    def start(model='x10'):
+        em = emulator(model)
+        return asyncio.run_coroutine_threadsafe(em.start_pty(),
+                                                loop).result(5)
+    return start
+
+
+def test_recv_tells_no_data_from_eof(pair):
+    master, slave = pair
+    connection = SerialConnection(master, lambda: None)
+    assert connection.recv(16) is None
+    os.write(slave, b'Z1POW1;')
+    time.sleep(0.05)
+    assert connection.recv(16) == b'Z1POW1;'
+    assert connection.recv(16) is None
+
+
+def test_sync_client_over_pty(device):
+    mrx = AnthemAV(None, None, model='x10',
+                   transport=SerialTransport(device()))
+    assert mrx._persistent
+    mrx.volume_set(-30)
+    mrx.update()
+    assert mrx.status['1'].volume == -30
+    assert mrx.status['1'].power is True
+    mrx.close()
+
+
+def test_async_client_over_pty(device):
+    path = device('x20')
+
+    async def main():
+        mrx = AsyncAnthemAV(None, None, model='x20',
+                            transport=SerialTransport(path))
+        try:
+            await mrx.volume_set(-42)
+            await mrx.update()
+            return mrx.status['1']
+        finally:
+            mrx.close()
+    state = asyncio.run(main())
+    assert state.volume == -42
+
+
+class Protocol(asyncio.Protocol):
+
+    def __init__(self):
+        self.lost = asyncio.get_running_loop().create_future()
+
+    def connection_lost(self, exc):
+        self.lost.set_result(exc)
+
+
+def test_fd_transport_write_does_not_block(pair):
+    master, slave = pair
+    data = b'Z1VOL-35;' * 100000
+    received = bytearray()
+
+    def read():
+        while len(received) < len(data) + 7:
+            received.extend(os.read(slave, 65536))
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        protocol = Protocol()
+        transport = FdTransport(
+            loop, SerialConnection(master, lambda: None), protocol)
+        start = time.perf_counter()
+        transport.write(data)
+        transport.write(b'Z1MUT1;')
+        assert time.perf_counter() - start < 0.5
+        assert transport.get_write_buffer_size()
+        reader = threading.Thread(target=read)
+        reader.start()
+        transport.close()
+        assert transport.is_closing()
+        await asyncio.wait_for(protocol.lost, 5)
+        assert not transport.get_write_buffer_size()
+        reader.join(5)
+    asyncio.run(main())
+    assert received == data + b'Z1MUT1;'
+
+
+class Port():
+    """pyserial-like port on the slave end of a pty."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.closed = threading.Event()
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def read(self, size):
+        if self.closed.is_set():
+            raise OSError('port closed')
+        time.sleep(0.01)
+        try:
+            return os.read(self.fd, size)
+        except BlockingIOError:
+            return b''
+
+    def write(self, data):
+        return os.write(self.fd, data)
+
+    def close(self):
+        self.closed.set()
+
+
+def test_serial_bridge(pair):
+    master, slave = pair
+    os.set_blocking(slave, False)
+    port = Port(slave)
+    sock = SerialBridge(port).sock
+    sock.settimeout(2)
+    sock.sendall(b'Z1POW?;')
+    time.sleep(0.05)
+    assert os.read(master, 64) == b'Z1POW?;'
+    os.write(master, b'Z1POW1;')
+    received = b''
+    while len(received) < 7:
+        received += sock.recv(64)
+    assert received == b'Z1POW1;'
+    sock.close()
+    assert port.closed.wait(2)
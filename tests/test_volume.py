@@ -0,0 +1,144 @@
+import time
+import asyncio
+import threading
+
+from anthemav.aio import AsyncVolumeScheduler
+from anthemav.state import ZoneState
+from anthemav.volume import VolumeSchedule, VolumeScheduler
+
+
+class Receiver():
+    """Records the commands sent; fails those in fail."""
+
+    def __init__(self, fail=()):
+        self.status = {'1': ZoneState('1')}
+        self.status['1'].volume = -40
+        self.sent = []
+        self.fail = list(fail)
+        self.event = threading.Event()
+
+    def send_command(self, cmd, zone, **kwargs):
+        self.sent.append((cmd, kwargs.get('volume')))
+        self.event.set()
+        if cmd in self.fail:
+            self.fail.remove(cmd)
+            raise ConnectionError('receiver unreachable')
+
+
+class AsyncReceiver(Receiver):
+
+    async def send_command(self, cmd, zone, **kwargs):
+        Receiver.send_command(self, cmd, zone, **kwargs)
+
+
+def test_requests_are_coalesced():
+    schedule = VolumeSchedule(interval=0.1)
+    schedule.set(-30)
+    schedule.set(-31)
+    assert schedule.next(100) == (('VolumeSet', {'volume': -31}), None)
+    assert schedule.idle
+    schedule.set(-32)
+    # Within the interval nothing is sent.
+    command, delay = schedule.next(100.05)
+    assert command is None
+    assert 0 < delay <= 0.05
+    assert schedule.next(100.1)[0] == ('VolumeSet', {'volume': -32})
+
+
+def test_ramp():
+    schedule = VolumeSchedule(interval=0.1)
+    schedule.ramp(-40, -30, 1.0)
+    schedule._ramp = (-40, 100, 1.0, False)
+    levels = []
+    now = 100
+    while not schedule.idle:
+        command, _ = schedule.next(now)
+        if command:
+            levels.append(command[1]['volume'])
+        now += 0.1
+    assert levels[-1] == -30
+    assert levels == sorted(levels)
+    assert len(levels) == 10
+
+
+def test_ramp_with_steps():
+    schedule = VolumeSchedule(interval=0)
+    schedule.ramp(-40, -43, 0, step_commands=True)
+    commands = []
+    while not schedule.idle:
+        command, _ = schedule.next(time.time())
+        commands.append(command[0])
+    assert commands == ['VolumeDown'] * 3
+
+
+def test_cancel():
+    schedule = VolumeSchedule()
+    schedule.ramp(-40, -30, 1.0)
+    schedule.cancel()
+    assert schedule.idle
+    assert schedule.next(time.time()) == (None, None)
+
+
+def test_scheduler_survives_errors():
+    receiver = Receiver(fail=['VolumeSet'])
+    scheduler = VolumeScheduler(receiver, '1', interval=0)
+    scheduler.set(-30)
+    assert receiver.event.wait(2)
+    receiver.event.clear()
+    scheduler.set(-25)
+    assert receiver.event.wait(2)
+    assert receiver.sent == [('VolumeSet', -30), ('VolumeSet', -25)]
+    scheduler.close()
+
+
+def test_scheduler_close_stops_the_thread():
+    receiver = Receiver()
+    scheduler = VolumeScheduler(receiver, '1', interval=0.1)
+    scheduler.ramp(-20, 5)
+    thread = scheduler._thread
+    assert receiver.event.wait(2)
+    scheduler.close()
+    assert not thread.is_alive()
+    sent = len(receiver.sent)
+    time.sleep(0.2)
+    assert len(receiver.sent) == sent
+    # The scheduler can be used again.
+    receiver.event.clear()
+    scheduler.set(-30)
+    assert receiver.event.wait(2)
+    assert receiver.sent[-1] == ('VolumeSet', -30)
+    scheduler.close()
+
+
+def test_async_scheduler():
+    receiver = AsyncReceiver(fail=['VolumeSet'])
+    # Created outside of any event loop.
+    scheduler = AsyncVolumeScheduler(receiver, '1', interval=0)
+
+    async def main():
+        scheduler.set(-30)
+        await asyncio.sleep(0.05)
+        scheduler.set(-25)
+        await asyncio.sleep(0.05)
+        # The task ends once there is nothing left to send.
+        return scheduler._task.done()
+    assert asyncio.run(main())
+    assert receiver.sent == [('VolumeSet', -30), ('VolumeSet', -25)]
+
+
+def test_async_scheduler_close():
+    receiver = AsyncReceiver()
+    scheduler = AsyncVolumeScheduler(receiver, '1', interval=0.1)
+
+    async def main():
+        scheduler.ramp(-20, 5)
+        await asyncio.sleep(0.25)
+        task = scheduler._task
+        scheduler.close()
+        await asyncio.wait([task])
+        sent = len(receiver.sent)
+        await asyncio.sleep(0.2)
+        return task.cancelled(), sent
+    cancelled, sent = asyncio.run(main())
+    assert cancelled
+    assert sent and len(receiver.sent) == sent
@@ -0,0 +1,549 @@
+#!/usr/bin/env python
+"""Generate anthemav/protocols/ from the Anthem RS-232 spreadsheets.
+
+Each model family gets a module with its command templates (CMDS), the
+regexes that parse its status responses (REGEX), the replacements for
+standby responses (RESPONSE_REPLACE), the default sources (SOURCES) and
+the meaning of enumerated values (DECODERS). Upper case letters in the
+sheets are the command, lower case letters its parameters.
+
+    python tools/gen_protocol.py
+    python tools/gen_protocol.py --check
+
+Needs xlrd, which is only used here and not by the package.
+"""
+import os
+import re
+import sys
+import argparse
+
+import xlrd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+SHEETS = os.path.join(ROOT, '_anthemav api')
+OUTPUT = os.path.join(ROOT, 'anthemav', 'protocols')
+
+# Spreadsheet of each model family; x20 covers the AVM 60 as well.
+WORKBOOKS = {
+    'x00': 'anthemMRX_RS-232.xls',
+    'x10': 'MRX x10 IP RS-232.xls',
+    'x20': 'MRX-x20-AVM-60-IP-RS-232 (1).xls',
+}
+
+# Command names by lead letter and mnemonic; a key ending in '?' names
+# the query when the set command with the same mnemonic means something
+# else (Z1BRT sets the balance, Z1BRT? reads the bit rate).
+NAMES = {
+    'x00': {
+        'P?': 'Zone',
+        'PP': 'Power',
+        'PS': 'Source',
+        'PM': 'Mute',
+        'PMT': 'MuteToggle',
+        'PV': 'Volume',
+        'PVM': 'Volume',
+        'PMS': 'StereoMode',
+        'PMM': 'SurroundMode',
+        'PEY?': 'SixChannelMode',
+        'PEX': 'SixChannelMode',
+        'PZ': 'Sleep',
+        'Pz': 'Message',
+        'PU': 'SetupMenu',
+        'PG': 'MediaMenu',
+        'PDV': 'DynamicRange',
+        'PD': 'Decoder',
+        'PQ': 'ProcessingMode',
+        'TAT': 'TunerAM',
+        'TATU': 'TuneUpAM',
+        'TATD': 'TuneDownAM',
+        'TFT': 'TunerFM',
+        'TFTU': 'TuneUpFM',
+        'TFTD': 'TuneDownFM',
+        'TAP': 'PresetAM',
+        'TFP': 'PresetFM',
+        'TT': 'TunerStation',
+        'T+': 'SeekUp',
+        'T-': 'SeekDown',
+        't1TC': 'TriggerControl',
+        't1T': 'Trigger',
+        't1TD': 'TriggerDelay',
+        'FP': 'FrontPanelBrightness',
+        'SN': 'SourceRename',
+        'SCF': 'SourceVideoConfig',
+        'SCV': 'SourceVideoInput',
+        'SCC': 'SourceCompositeInput',
+        'SCU': 'SourceAnalogInput',
+        'SCA': 'SourceAudioInput',
+        'SCB': 'SourceBassManager',
+        'SCQ': 'SourceRoomEQ',
+        'SCE': 'SourceDolbyVolume',
+        'SCK': 'SourceCinemaReference',
+        'SfSU': 'SaveSettings',
+        'SfLU': 'RestoreSettings',
+        'SfLF': 'FactoryReset',
+        '?': 'Model',
+    },
+    'x10': {
+        'IDQ': 'Model',
+        'IDM': 'ModelName',
+        'IDS': 'SoftwareVersion',
+        'IDR': 'Region',
+        'IDB': 'BuildDate',
+        'IDH': 'Hardware',
+        'IDN': 'MacAddress',
+        'ECH': 'StatusReports',
+        'FPB': 'FrontPanelBrightness',
+        'HOC1': 'VideoOutputConfig',
+        'SDVS': 'DolbyVolume',
+        'SDVL': 'DolbyVolumeLeveler',
+        'SLIP': 'LipSync',
+        'SIP': 'StandbyIPControl',
+        'SSP': 'SpeakerProfile',
+        'SPN': 'SpeakerProfileName',
+        'ZPOW': 'Power',
+        'ICN': 'SourceActive',
+        'ISN': 'SourceNameShort',
+        'ILN': 'SourceNameLong',
+        'ZINP': 'Source',
+        'ZVUP': 'VolumeUpBy',
+        'ZVDN': 'VolumeDownBy',
+        'ZVOL': 'Volume',
+        'ZMUT': 'Mute',
+        'ZARC': 'RoomCorrection',
+        'ZBLT': 'BalanceLeft',
+        'ZBRT': 'BalanceRight',
+        'ZBAL': 'Balance',
+        'ZLUP': 'LevelUp',
+        'ZLDN': 'LevelDown',
+        'ZLEV': 'Level',
+        'ZTUP': 'ToneUp',
+        'ZTDN': 'ToneDown',
+        'ZTON': 'Tone',
+        'TBND': 'TunerBand',
+        'TTUP': 'TuneUp',
+        'TTDN': 'TuneDown',
+        'TKUP': 'SeekUp',
+        'TKDN': 'SeekDown',
+        'TPUP': 'PresetUp',
+        'TPDN': 'PresetDown',
+        'TAMS': 'TunerAM',
+        'TFMS': 'TunerFM',
+        'ZTBS': 'TunerStatus',
+        'TSTA': 'TunerStation',
+        'TPSA': 'PresetAssign',
+        'TPSL': 'PresetSelect',
+        'TPRM': 'PresetRemove',
+        'ZSIM': 'SimulateIR',
+        'ZMSG': 'Message',
+        'ZSMD': 'SetupMenu',
+        'ZVIR': 'VideoResolution',
+        'ZIRH': 'VideoWidth',
+        'ZIRV': 'VideoHeight',
+        'ZAIC': 'AudioChannels',
+        'ZAIF': 'AudioFormat',
+        'ZBRT?': 'AudioBitRate',
+        'ZSRT': 'AudioSampleRate',
+        'ZAIN': 'AudioName',
+        'ZAIR': 'AudioRateName',
+        'ZALM': 'ListeningMode',
+        'ZWCU': 'CenterWidthUp',
+        'ZWCD': 'CenterWidthDown',
+        'ZWST': 'CenterWidth',
+        'ZDIU': 'DimensionUp',
+        'ZDID': 'DimensionDown',
+        'ZDST': 'Dimension',
+        'ZPST': 'Panorama',
+        'ZDYN': 'DynamicRange',
+        'ZDIA': 'DialogNormalization',
+        'RCTL': 'TriggerControl',
+        'RSET': 'Trigger',
+    },
+}
+NAMES['x20'] = NAMES['x10']
+
+# Parameter names of commands with more than one parameter, or whose one
+# parameter is not just 'value'.
+ARGS = {
+    'Volume': ('volume',),
+    'Source': ('source',),
+    'SourceNameShort': ('source_num',),
+    'SourceNameLong': ('source_num',),
+    'VolumeUpBy': ('step',),
+    'VolumeDownBy': ('step',),
+    'StereoMode': ('source', 'value'),
+    'SurroundMode': ('source', 'value'),
+    'Message': ('line', 'message'),
+    'SourceRename': ('source', 'name'),
+    'SourceVideoConfig': ('source', 'value'),
+    'SourceVideoInput': ('source', 'value'),
+    'SourceCompositeInput': ('source', 'value'),
+    'SourceAnalogInput': ('source', 'value'),
+    'SourceAudioInput': ('source', 'value'),
+    'SourceBassManager': ('source', 'value'),
+    'SourceRoomEQ': ('source', 'value'),
+    'SourceDolbyVolume': ('source', 'value'),
+    'SourceCinemaReference': ('source', 'value'),
+    'VideoOutputConfig': ('hdmi1_depth', 'hdmi2_depth', 'output',
+                          'scaling'),
+    'DolbyVolume': ('input', 'value'),
+    'DolbyVolumeLeveler': ('input', 'value'),
+    'LipSync': ('input', 'value'),
+    'SpeakerProfile': ('input', 'value'),
+    'SpeakerProfileName': ('profile',),
+    'LevelUp': ('channel', 'step'),
+    'LevelDown': ('channel', 'step'),
+    'Level': ('channel', 'value'),
+    'ToneUp': ('tone', 'step'),
+    'ToneDown': ('tone', 'step'),
+    'Tone': ('tone', 'value'),
+    'PresetAssign': ('preset',),
+    'PresetSelect': ('preset',),
+    'PresetRemove': ('preset',),
+    'SimulateIR': ('key',),
+}
+
+# Commands with a fixed parameter, kept under the names the clients use.
+ALIASES = {
+    'x00': (
+        ('PowerOn', 'Power', '1'),
+        ('PowerOff', 'Power', '0'),
+        ('VolumeUp', 'Volume', 'U'),
+        ('VolumeDown', 'Volume', 'D'),
+        ('MuteOn', 'Mute', '1'),
+        ('MuteOff', 'Mute', '0'),
+    ),
+    'x10': (
+        ('PowerOn', 'Power', '1'),
+        ('PowerOff', 'Power', '0'),
+        ('VolumeUp', 'VolumeUpBy', '1'),
+        ('VolumeDown', 'VolumeDownBy', '1'),
+        ('MuteOn', 'Mute', '1'),
+        ('MuteOff', 'Mute', '0'),
+        ('MuteToggle', 'Mute', 't'),
+    ),
+}
+ALIASES['x20'] = ALIASES['x10']
+
+# Status fields that ZoneState keeps, by command name.
+FIELDS = {
+    'Power': 'power',
+    'Volume': 'volume',
+    'Mute': 'mute',
+    'Source': 'source',
+    'Decoder': 'decoder',
+}
+
+# Value patterns of the status fields; other responses take the rest of
+# the line.
+VALUE_PATTERNS = {
+    'x00': {
+        'power': '[0-1]',
+        'source': '[a-zA-Z0-9]',
+        'volume': '-[0-9][0-9]|[0-9][0-9]|-[0-9]|[0-9]',
+        'mute': '[0-1]',
+        'decoder': '[a-zA-Z0-9]',
+    },
+    'x10': {
+        'power': '.',
+        'volume': '[-+]?[0-9]+(?:\\.[0-9]+)?',
+        'mute': '.',
+        'source': '.*',
+    },
+}
+VALUE_PATTERNS['x20'] = VALUE_PATTERNS['x10']
+
+# Responses to commands for a zone that is off, from the notes of the
+# sheets, as [regex, standard response].
+RESPONSE_REPLACE = {
+    'x00': [
+        ['Main.Off', 'P1P0'],
+        ['Zone2.Off', 'P2P0'],
+    ],
+    'x10': [
+        ['!Z.*?Z(?P<zone>.)', 'Z{zone}POW0'],
+    ],
+}
+RESPONSE_REPLACE['x20'] = RESPONSE_REPLACE['x10']
+
+# Queries of the earlier hand-written tables that the sheets do not list.
+# The x10 sheet marks ILN as x20 only, but x10 receivers answer it.
+EXTRA_CMDS = {
+    'x00': {
+        'MuteQuery': 'P{zone}M?',
+    },
+    'x10': {
+        'SourceNameLongQuery': 'ILN{source_num}?',
+    },
+    'x20': {},
+}
+
+# 'n=label' pairs in a description: '0=off, 1=on', '05=Neo:6 Cinema'.
+PAIR = re.compile(r'(?<![\w-])([0-9]{1,2}|[a-z]{1,2})\s?=\s?'
+                  r'((?:[^,;()=]|\([^()=]*\))+?)\s*(?=[,;)]|\.(?:\s|$)|$)')
+
+# Pairs that name a parameter rather than a value ('s = sign: +/-',
+# 'y = 0 bass').
+PLACEHOLDER = re.compile(r'(?:sign|zone)\b|value$|[0-9]+ [a-z]')
+
+# A lower case parameter: one letter repeated, possibly with a decimal
+# point ('xxx.xx').
+PARAMETER = re.compile(r'([a-z])(?:\1|\.(?=\1))*')
+
+RESPONSE = re.compile(r'[Rr]eturns?\s+[\'"]?([A-Z][A-Za-z0-9.]*)')
+
+
+def rows(model):
+    """Yield (command, parameters, description, query) rows of a sheet."""
+    book = xlrd.open_workbook(os.path.join(SHEETS, WORKBOOKS[model]))
+    sheet = book.sheet_by_index(0)
+    header = None
+    for r in range(sheet.nrows):
+        cells = [str(value).strip() for value in sheet.row_values(r)]
+        if cells[0] == 'Command':
+            header = cells
+            continue
+        if model == 'x00' and not cells[0] and 'source n' in cells[2]:
+            # The note that lists the sources.
+            yield '', '', cells[2], ''
+            continue
+        if header is None or not cells[0] or cells[0] == 'comment':
+            continue
+        if cells[0].startswith(('Sample', 'Notes', 'To send')):
+            break
+        if model == 'x00':
+            # Section titles ('Zone 2') have no description.
+            if cells[2]:
+                yield cells[0], cells[1], cells[2], ''
+            continue
+        if 'MRX x10' in header and cells[header.index('MRX x10')] != 'yes':
+            continue
+        if 'not applicable to MRX {}'.format(model) in ' '.join(cells):
+            continue
+        yield cells[0], '', cells[1], cells[2]
+
+
+def split(text):
+    """Return the literal and parameter parts of a command string."""
+    parts = []
+    for m in re.finditer(r'[a-z][a-z.]*|[^a-z]+', text):
+        if not m.group()[0].islower():
+            parts.append(('literal', m.group()))
+            continue
+        for p in PARAMETER.finditer(m.group()):
+            if parts and parts[-1] == ('parameter', 's'):
+                parts[-1] = ('parameter', 's' + p.group())
+            else:
+                parts.append(('parameter', p.group()))
+    return parts
+
+
+def parse_command(model, command, parameters=''):
+    """Return (key, template parts) of a command from the sheet.
+
+    The key is the lead letter and mnemonic used to look up the name;
+    the template parts are literals, 'zone', 'trigger' and parameters.
+    """
+    if model == 'x00':
+        # The command column is literal; the parameters are all variables
+        # except the '+' and '-' of the tuner seek commands. Elsewhere '-'
+        # means no parameters.
+        m = re.match(r'P[12]', command)
+        parts = [('literal', 'P'), ('field', 'zone')] if m else []
+        rest = command[m.end():] if m else command
+        parts.append(('literal', rest))
+        if command == 'T':
+            parts.append(('literal', parameters))
+            rest += parameters
+        elif parameters not in ('', '-'):
+            parts += split(parameters.lower())
+        return ('P' if m else '') + rest.rstrip('?'), parts
+    parts = split(command)
+    if len(parts) > 1 and parts[0][1] in ('Z', 'R') and \
+            parts[1] == ('parameter', 'x'):
+        field = 'zone' if parts[0][1] == 'Z' else 'trigger'
+        parts[1] = ('field', field)
+        key = parts[0][1] + parts[2][1].rstrip('?')
+    else:
+        literal = parts[0][1]
+        key = re.sub(r'^([ZT])1', r'\1', literal).rstrip('?')
+    return key, parts
+
+
+def template(parts, name):
+    """Return the format string of command parts."""
+    parameters = [p for kind, p in parts if kind == 'parameter']
+    # A query takes the leading parameters of its setting (Z1LEVy?).
+    names = ARGS.get(name, ('value',))[:len(parameters)]
+    if len(names) != len(parameters):
+        raise ValueError('no parameter names for {} {}'.format(name, parts))
+    names = iter(names)
+    text = ''
+    for kind, value in parts:
+        if kind == 'literal':
+            text += value
+        elif kind == 'field':
+            text += '{' + value + '}'
+        else:
+            text += '{' + next(names) + '}'
+    return text
+
+
+def snake(name):
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', name).lower()
+
+
+def decoder(description):
+    """Return {code: meaning} of the values listed in a description."""
+    pairs = {}
+    for code, label in PAIR.findall(description):
+        if (re.search('[A-Za-z]', label) and code not in pairs and
+                not PLACEHOLDER.match(label)):
+            pairs[code] = label.strip()
+    return pairs if len(pairs) > 1 else {}
+
+
+def response_regexes(model, response, names):
+    """Yield (field, regex) for a zone status response of the sheet."""
+    m = re.match(r'(?P<lead>[PZ])(?:x|[0-9])', response)
+    if not m:
+        return
+    lead = m.group('lead')
+    segments = re.findall(r'([A-Z]+)([a-z.]*)', response[m.end():])
+    if model != 'x00':
+        segments = segments[:1]
+    for mnemonic, parameters in segments:
+        name = names.get(lead + mnemonic + '?') or names.get(lead + mnemonic)
+        if name is None or not parameters:
+            continue
+        field = FIELDS.get(name, snake(name))
+        pattern = VALUE_PATTERNS[model].get(field, '.+')
+        yield field, '{}(?P<zone>.).*?{}(?P<{}>{})'.format(
+            lead, mnemonic, field, pattern)
+
+
+def build(model):
+    """Return the tables of a model family."""
+    names = NAMES[model]
+    cmds = dict(EXTRA_CMDS[model])
+    settings = {}
+    regex = []
+    decoders = {}
+    sources = {}
+    for command, parameters, description, query in rows(model):
+        if not command:
+            sources = decoder(description)
+            continue
+        if command == ';':
+            continue
+        key, parts = parse_command(model, command, parameters)
+        is_query = command.endswith('?')
+        name = names.get(key + '?' if is_query else key) or names.get(key)
+        if name is None:
+            raise ValueError('no name for {} ({})'.format(command, key))
+        if is_query:
+            cmds.setdefault(name + 'Query', template(parts, name))
+        else:
+            settings.setdefault(name, template(parts, name))
+        m = re.match(r'\s*(\S+\?)\s', query)
+        if m:
+            query_key, query_parts = parse_command(model, m.group(1))
+            query_name = names.get(query_key + '?') or names.get(query_key)
+            cmds.setdefault(query_name + 'Query',
+                            template(query_parts, query_name))
+        for text in (query, description):
+            m = RESPONSE.search(text)
+            if m:
+                for field, pattern in response_regexes(model, m.group(1),
+                                                       names):
+                    if pattern not in regex:
+                        regex.append(pattern)
+                    values = decoder(description)
+                    if values and field not in decoders:
+                        decoders[field] = values
+                break
+    # Settings that can be read back are '<Name>Set', actions keep the
+    # plain name ('VolumeUpBy', 'TuneUp').
+    for name, text in settings.items():
+        cmds[name + 'Set' if name + 'Query' in cmds else name] = text
+    ordered = {}
+    for alias, name, value in ALIASES[model]:
+        ordered[alias] = settings[name].replace(
+            '{' + (ARGS.get(name) or ('value',))[0] + '}', value)
+    ordered.update(sorted(cmds.items()))
+    return {
+        'CMDS': {name: text + ';' for name, text in ordered.items()},
+        'REGEX': regex,
+        'RESPONSE_REPLACE': RESPONSE_REPLACE[model],
+        'SOURCES': sources,
+        'DECODERS': decoders,
+    }
+
+
+def literal(value, indent=0):
+    """Return value as Python source, one item per line."""
+    pad = ' ' * (indent + 4)
+    if isinstance(value, dict) and value:
+        items = ['{}{!r}: {},'.format(pad, k, literal(v, indent + 4))
+                 for k, v in value.items()]
+        return '{\n' + '\n'.join(items) + '\n' + ' ' * indent + '}'
+    if isinstance(value, list) and value and not indent:
+        items = ['{}{},'.format(pad, literal(item, indent + 4))
+                 for item in value]
+        return '[\n' + '\n'.join(items) + '\n' + ' ' * indent + ']'
+    return repr(value)
+
+
+def render(model, tables):
+    """Return the source of the protocol module of a model family."""
+    lines = [
+        '# Generated by tools/gen_protocol.py from',
+        '# "_anthemav api/{}". Do not edit.'.format(WORKBOOKS[model]),
+        '"""Anthem MRX {} protocol tables."""'.format(model),
+        '',
+        'MODEL = {!r}'.format(model),
+    ]
+    comments = {
+        'CMDS': 'Commands using named format tags.',
+        'REGEX': 'Regex matches with named groups, checked against every '
+                 'response.',
+        'RESPONSE_REPLACE': '[regex, standard response] for the responses '
+                            'of a zone that is off.',
+        'SOURCES': 'Default source list.',
+        'DECODERS': 'Meaning of the values of a field, by field.',
+    }
+    for table in ('CMDS', 'REGEX', 'RESPONSE_REPLACE', 'SOURCES',
+                  'DECODERS'):
+        lines += ['', '# ' + comments[table],
+                  '{} = {}'.format(table, literal(tables[table]))]
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true',
+                        help='fail if the generated modules are out of date')
+    args = parser.parse_args(argv)
+
+    stale = []
+    for model in sorted(WORKBOOKS):
+        source = render(model, build(model))
+        path = os.path.join(OUTPUT, model + '.py')
+        current = None
+        if os.path.exists(path):
+            with open(path) as f:
+                current = f.read()
+        if current == source:
+            continue
+        stale.append(path)
+        if not args.check:
+            with open(path, 'w') as f:
+                f.write(source)
+            print('Wrote {}'.format(os.path.relpath(path, ROOT)))
+    if args.check and stale:
+        print('Out of date: {}'.format(', '.join(stale)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())